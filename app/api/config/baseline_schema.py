@@ -0,0 +1,280 @@
+"""The schema of migration 1, frozen.
+
+Written out as it was when migrations were introduced, so the baseline means the same
+thing whatever the models look like later. Never edit it: a schema change is a new
+migration in `app.api.config.migrations`. Every statement is `IF NOT EXISTS`, databases
+created by `create_all` before migrations existed keep what they have.
+"""
+
+BASELINE_STATEMENTS = (
+    """
+    CREATE TABLE IF NOT EXISTS nemo_user_information (
+        google_id VARCHAR NOT NULL,
+        email VARCHAR NOT NULL,
+        given_name VARCHAR NOT NULL,
+        family_name VARCHAR,
+        profile_pic VARCHAR,
+        email_verified BOOLEAN NOT NULL,
+        username VARCHAR NOT NULL,
+        created_at DATETIME NOT NULL,
+        PRIMARY KEY (google_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS nemo_settings (
+        google_id VARCHAR NOT NULL,
+        timer_time VARCHAR NOT NULL,
+        display_time VARCHAR NOT NULL,
+        timer_end_notification BOOLEAN NOT NULL,
+        timer_show_timer_on_browser_tab BOOLEAN NOT NULL,
+        timer_web_notification BOOLEAN NOT NULL,
+        timer_sessions INTEGER NOT NULL,
+        timer_auto_start BOOLEAN NOT NULL,
+        timer_break_end_notification BOOLEAN NOT NULL,
+        preference_shuffle_time INTEGER NOT NULL,
+        preference_background_color VARCHAR NOT NULL,
+        daily_goal INTEGER NOT NULL,
+        PRIMARY KEY (google_id),
+        FOREIGN KEY(google_id) REFERENCES nemo_user_information (google_id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS nemo_analytics (
+        id INTEGER NOT NULL,
+        google_id VARCHAR NOT NULL,
+        created_at DATETIME NOT NULL,
+        duration INTEGER NOT NULL,
+        full_date DATETIME NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(google_id) REFERENCES nemo_user_information (google_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS nemo_analytics_daily (
+        google_id VARCHAR NOT NULL,
+        day DATE NOT NULL,
+        total_duration INTEGER NOT NULL,
+        session_count INTEGER NOT NULL,
+        max_session INTEGER NOT NULL,
+        max_session_at DATETIME NOT NULL,
+        PRIMARY KEY (google_id, day),
+        FOREIGN KEY(google_id) REFERENCES nemo_user_information (google_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS nemo_tasks (
+        id INTEGER NOT NULL,
+        google_id VARCHAR NOT NULL,
+        created_at DATETIME NOT NULL,
+        task_description VARCHAR NOT NULL,
+        duration INTEGER NOT NULL,
+        task_date DATETIME NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(google_id) REFERENCES nemo_user_information (google_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS nemo_deletion_jobs (
+        id VARCHAR NOT NULL,
+        google_id VARCHAR NOT NULL,
+        status VARCHAR NOT NULL,
+        analytics_deleted INTEGER NOT NULL,
+        tasks_deleted INTEGER NOT NULL,
+        error VARCHAR,
+        created_at DATETIME NOT NULL,
+        updated_at DATETIME NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_nemo_deletion_jobs_google_id ON nemo_deletion_jobs (google_id)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS nemo_import_jobs (
+        id VARCHAR NOT NULL,
+        google_id VARCHAR NOT NULL,
+        format VARCHAR NOT NULL,
+        status VARCHAR NOT NULL,
+        records_done INTEGER NOT NULL,
+        analytics_inserted INTEGER NOT NULL,
+        tasks_inserted INTEGER NOT NULL,
+        invalid_rows INTEGER NOT NULL,
+        error VARCHAR,
+        created_at DATETIME NOT NULL,
+        updated_at DATETIME NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(google_id) REFERENCES nemo_user_information (google_id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_nemo_import_jobs_google_id ON nemo_import_jobs (google_id)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS nemo_user_versions (
+        google_id VARCHAR NOT NULL,
+        account INTEGER NOT NULL,
+        settings INTEGER NOT NULL,
+        analytics INTEGER NOT NULL,
+        tasks INTEGER NOT NULL,
+        PRIMARY KEY (google_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS nemo_schema_versions (
+        version INTEGER NOT NULL,
+        description VARCHAR NOT NULL,
+        applied_at DATETIME NOT NULL,
+        PRIMARY KEY (version)
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_nemo_user_information_settings
+    AFTER INSERT ON nemo_user_information
+    BEGIN
+        INSERT OR IGNORE INTO nemo_settings (google_id, timer_time, display_time,
+            timer_end_notification, timer_show_timer_on_browser_tab, timer_web_notification,
+            timer_sessions, timer_auto_start, timer_break_end_notification,
+            preference_shuffle_time, preference_background_color, daily_goal)
+        VALUES (NEW.google_id, '2700', '45 : 00', 0, 0, 0, 4, 0, 0, 10, 'rainbow', 4);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_nemo_user_information_version_insert
+    AFTER INSERT ON nemo_user_information
+    BEGIN
+        INSERT INTO nemo_user_versions (google_id, account, settings, analytics, tasks)
+        VALUES (NEW.google_id, 1, 0, 0, 0)
+        ON CONFLICT (google_id) DO UPDATE SET account = account + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_nemo_user_information_version_update
+    AFTER UPDATE ON nemo_user_information
+    WHEN OLD.google_id IS NOT NEW.google_id
+        OR OLD.email IS NOT NEW.email
+        OR OLD.given_name IS NOT NEW.given_name
+        OR OLD.family_name IS NOT NEW.family_name
+        OR OLD.profile_pic IS NOT NEW.profile_pic
+        OR OLD.email_verified IS NOT NEW.email_verified
+        OR OLD.username IS NOT NEW.username
+        OR OLD.created_at IS NOT NEW.created_at
+    BEGIN
+        INSERT INTO nemo_user_versions (google_id, account, settings, analytics, tasks)
+        VALUES (NEW.google_id, 1, 0, 0, 0)
+        ON CONFLICT (google_id) DO UPDATE SET account = account + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_nemo_user_information_version_delete
+    AFTER DELETE ON nemo_user_information
+    BEGIN
+        INSERT INTO nemo_user_versions (google_id, account, settings, analytics, tasks)
+        VALUES (OLD.google_id, 1, 0, 0, 0)
+        ON CONFLICT (google_id) DO UPDATE SET account = account + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_nemo_settings_version_insert
+    AFTER INSERT ON nemo_settings
+    BEGIN
+        INSERT INTO nemo_user_versions (google_id, account, settings, analytics, tasks)
+        VALUES (NEW.google_id, 0, 1, 0, 0)
+        ON CONFLICT (google_id) DO UPDATE SET settings = settings + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_nemo_settings_version_update
+    AFTER UPDATE ON nemo_settings
+    WHEN OLD.google_id IS NOT NEW.google_id
+        OR OLD.timer_time IS NOT NEW.timer_time
+        OR OLD.display_time IS NOT NEW.display_time
+        OR OLD.timer_end_notification IS NOT NEW.timer_end_notification
+        OR OLD.timer_show_timer_on_browser_tab IS NOT NEW.timer_show_timer_on_browser_tab
+        OR OLD.timer_web_notification IS NOT NEW.timer_web_notification
+        OR OLD.timer_sessions IS NOT NEW.timer_sessions
+        OR OLD.timer_auto_start IS NOT NEW.timer_auto_start
+        OR OLD.timer_break_end_notification IS NOT NEW.timer_break_end_notification
+        OR OLD.preference_shuffle_time IS NOT NEW.preference_shuffle_time
+        OR OLD.preference_background_color IS NOT NEW.preference_background_color
+        OR OLD.daily_goal IS NOT NEW.daily_goal
+    BEGIN
+        INSERT INTO nemo_user_versions (google_id, account, settings, analytics, tasks)
+        VALUES (NEW.google_id, 0, 1, 0, 0)
+        ON CONFLICT (google_id) DO UPDATE SET settings = settings + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_nemo_settings_version_delete
+    AFTER DELETE ON nemo_settings
+    BEGIN
+        INSERT INTO nemo_user_versions (google_id, account, settings, analytics, tasks)
+        VALUES (OLD.google_id, 0, 1, 0, 0)
+        ON CONFLICT (google_id) DO UPDATE SET settings = settings + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_nemo_analytics_version_insert
+    AFTER INSERT ON nemo_analytics
+    BEGIN
+        INSERT INTO nemo_user_versions (google_id, account, settings, analytics, tasks)
+        VALUES (NEW.google_id, 0, 0, 1, 0)
+        ON CONFLICT (google_id) DO UPDATE SET analytics = analytics + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_nemo_analytics_version_update
+    AFTER UPDATE ON nemo_analytics
+    WHEN OLD.id IS NOT NEW.id
+        OR OLD.google_id IS NOT NEW.google_id
+        OR OLD.created_at IS NOT NEW.created_at
+        OR OLD.duration IS NOT NEW.duration
+        OR OLD.full_date IS NOT NEW.full_date
+    BEGIN
+        INSERT INTO nemo_user_versions (google_id, account, settings, analytics, tasks)
+        VALUES (NEW.google_id, 0, 0, 1, 0)
+        ON CONFLICT (google_id) DO UPDATE SET analytics = analytics + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_nemo_analytics_version_delete
+    AFTER DELETE ON nemo_analytics
+    BEGIN
+        INSERT INTO nemo_user_versions (google_id, account, settings, analytics, tasks)
+        VALUES (OLD.google_id, 0, 0, 1, 0)
+        ON CONFLICT (google_id) DO UPDATE SET analytics = analytics + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_nemo_tasks_version_insert
+    AFTER INSERT ON nemo_tasks
+    BEGIN
+        INSERT INTO nemo_user_versions (google_id, account, settings, analytics, tasks)
+        VALUES (NEW.google_id, 0, 0, 0, 1)
+        ON CONFLICT (google_id) DO UPDATE SET tasks = tasks + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_nemo_tasks_version_update
+    AFTER UPDATE ON nemo_tasks
+    WHEN OLD.id IS NOT NEW.id
+        OR OLD.google_id IS NOT NEW.google_id
+        OR OLD.created_at IS NOT NEW.created_at
+        OR OLD.task_description IS NOT NEW.task_description
+        OR OLD.duration IS NOT NEW.duration
+        OR OLD.task_date IS NOT NEW.task_date
+    BEGIN
+        INSERT INTO nemo_user_versions (google_id, account, settings, analytics, tasks)
+        VALUES (NEW.google_id, 0, 0, 0, 1)
+        ON CONFLICT (google_id) DO UPDATE SET tasks = tasks + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_nemo_tasks_version_delete
+    AFTER DELETE ON nemo_tasks
+    BEGIN
+        INSERT INTO nemo_user_versions (google_id, account, settings, analytics, tasks)
+        VALUES (OLD.google_id, 0, 0, 0, 1)
+        ON CONFLICT (google_id) DO UPDATE SET tasks = tasks + 1;
+    END
+    """,
+)
@@ -0,0 +1,243 @@
+"""Response compression, negotiated per request between brotli and gzip.
+
+Bodies are buffered until they reach `COMPRESSION_MIN_SIZE` bytes, smaller responses go
+out as they are. Streamed responses are compressed chunk by chunk, each chunk flushed so
+the client can decode it right away. Only text and JSON content types are compressed.
+Brotli needs the `brotli` (or `brotlicffi`) package, without it only gzip is offered.
+
+Routes tune their own levels with the `compression` dependency, e.g. a cheaper level for
+a large streamed export.
+
+Compressed responses get an ETag of their own (RFC 9110 section 8.8.3), and every response
+that could have been compressed says so with `Vary: Accept-Encoding`, whether it was or not.
+"""
+
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.param_functions import Depends
+
+from app.api.config.settings import get_setting
+from app.api.utils.etag import encoded_etag
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+BROTLI = "br"
+GZIP = "gzip"
+# preferred first when the client weighs them the same
+ENCODINGS = (BROTLI, GZIP) if brotli is not None else (GZIP,)
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "application/problem+json",
+)
+
+# request state attribute set by the `compression` dependency
+ROUTE_OPTIONS_KEY = "compression"
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best supported encoding in an `Accept-Encoding` header, None for identity."""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                continue
+        weights[name.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def is_compressible(headers: List[Tuple[bytes, bytes]]) -> bool:
+    content_type = ""
+    for name, value in headers:
+        name = name.lower()
+        if name == b"content-encoding":
+            return False
+        if name == b"cache-control" and b"no-transform" in value.lower():
+            return False
+        if name == b"content-type":
+            content_type = value.decode("latin-1").lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.split(";")[0].endswith(
+        "+json"
+    )
+
+
+def add_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """`headers` with `Accept-Encoding` added to their `Vary` header."""
+    for i, (name, value) in enumerate(headers):
+        if name.lower() == b"vary":
+            if value.strip() == b"*" or b"accept-encoding" in value.lower():
+                return headers
+            return [*headers[:i], (name, value + b", Accept-Encoding"), *headers[i + 1:]]
+    return [*headers, (b"vary", b"Accept-Encoding")]
+
+
+def _encoded_headers(
+    headers: List[Tuple[bytes, bytes]], encoding: str
+) -> List[Tuple[bytes, bytes]]:
+    """Headers of the compressed representation, without a length, which it no longer matches."""
+    encoded = []
+    for name, value in headers:
+        if name.lower() == b"content-length":
+            continue
+        if name.lower() == b"etag":
+            value = encoded_etag(value.decode("latin-1"), encoding).encode("latin-1")
+        encoded.append((name, value))
+    encoded.append((b"content-encoding", encoding.encode()))
+    return encoded
+
+
+class _Compressor:
+    """Streaming compressor with the same three calls for gzip and brotli."""
+
+    def __init__(self, encoding: str, level: int):
+        if encoding == BROTLI:
+            self._brotli = brotli.Compressor(quality=level)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._brotli.process(data) if self._brotli else self._zlib.compress(data)
+
+    def flush(self) -> bytes:
+        return self._brotli.flush() if self._brotli else self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._brotli.finish() if self._brotli else self._zlib.flush(zlib.Z_FINISH)
+
+
+def compression(
+    gzip_level: Optional[int] = None,
+    brotli_quality: Optional[int] = None,
+    min_size: Optional[int] = None,
+):
+    """Dependency overriding the middleware's levels or size threshold for a route's responses."""
+    options = {"gzip_level": gzip_level, "brotli_quality": brotli_quality, "min_size": min_size}
+    options = {name: value for name, value in options.items() if value is not None}
+
+    async def configure(request: Request) -> None:
+        setattr(request.state, ROUTE_OPTIONS_KEY, options)
+
+    return Depends(configure)
+
+
+class CompressionMiddleware:
+    """Compress responses over `min_size` bytes with the client's preferred encoding."""
+
+    def __init__(
+        self, app, min_size: int = None, gzip_level: int = None, brotli_quality: int = None
+    ):
+        settings = get_setting()
+        self.app = app
+        self.min_size = settings.COMPRESSION_MIN_SIZE if min_size is None else min_size
+        self.gzip_level = settings.COMPRESSION_GZIP_LEVEL if gzip_level is None else gzip_level
+        self.brotli_quality = (
+            settings.COMPRESSION_BROTLI_QUALITY if brotli_quality is None else brotli_quality
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+        encoding = negotiate(accept_encoding)
+
+        start = None
+        buffered: List[bytes] = []
+        buffered_size = 0
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        def route_options() -> Dict:
+            # set by the route's dependencies, which have run by the time the body is sent
+            return scope.get("state", {}).get(ROUTE_OPTIONS_KEY, {})
+
+        async def send_compressed(message):
+            nonlocal start, buffered_size, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                compressible = is_compressible(headers)
+                # a 304 stands in for the response that would have been sent
+                if compressible or message["status"] == 304:
+                    headers = add_vary(headers)
+                start = {**message, "headers": headers}
+                passthrough = encoding is None or not compressible
+                if passthrough:
+                    await send(start)
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                buffered.append(body)
+                buffered_size += len(body)
+                options = route_options()
+                if buffered_size < options.get("min_size", self.min_size):
+                    if more_body:
+                        return
+                    # finished below the threshold, send it as is
+                    passthrough = True
+                    await send(start)
+                    await send({"type": "http.response.body", "body": b"".join(buffered)})
+                    return
+
+                if encoding == BROTLI:
+                    level = options.get("brotli_quality", self.brotli_quality)
+                else:
+                    level = options.get("gzip_level", self.gzip_level)
+                compressor = _Compressor(encoding, level)
+                body = b"".join(buffered)
+                buffered.clear()
+                headers = _encoded_headers(start["headers"], encoding)
+                if not more_body:
+                    compressed = compressor.compress(body) + compressor.finish()
+                    headers.append((b"content-length", str(len(compressed)).encode()))
+                    await send({**start, "headers": headers})
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                await send({**start, "headers": headers})
+
+            if more_body:
+                chunk = compressor.compress(body) + compressor.flush()
+            else:
+                chunk = compressor.compress(body) + compressor.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
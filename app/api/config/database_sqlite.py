@@ -2,8 +2,12 @@ import os
 
 from sqlalchemy import event
 from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from sqlmodel import create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+import app.api.config.sqlitecloud_async  # registers the sqlitecloud+aiosqlite dialect
 from app.api.config.settings import get_setting
 
 settings = get_setting()
@@ -11,12 +15,59 @@ settings = get_setting()
 SQLITE_CLOUD_API_KEY = os.getenv("SQLITE_CLOUD_API_KEY")
 SQLITE_CLOUD_HOST = os.getenv("SQLITE_CLOUD_HOST")
 
+# Pragmas applied to every new connection to a local SQLite file. SQLite Cloud manages
+# journaling and caching on the server, so cloud connections only get `foreign_keys`.
+SQLITE_PRAGMA_PROFILES = {
+    # WAL with full fsync on every commit, conservative memory use
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+        "cache_size": -2000,  # KiB
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+    },
+    # WAL only fsyncs on checkpoints, bigger cache and memory-mapped reads
+    "fast-local": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -16000,
+        "mmap_size": 128 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+    # for replicas / analytics: large cache and mmap, patient readers
+    "read-heavy": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 15000,
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+}
+
 sqlite_url = f"sqlitecloud://{SQLITE_CLOUD_HOST}:8860/{settings.SQLITE_CLOUD_DB}?apikey={SQLITE_CLOUD_API_KEY}"
+async_sqlite_url = sqlite_url.replace("sqlitecloud://", "sqlitecloud+aiosqlite://", 1)
+cloud_pool_options = {
+    "pool_size": settings.SQLITE_CLOUD_POOL_SIZE,
+    "max_overflow": settings.SQLITE_CLOUD_MAX_OVERFLOW,
+    "pool_pre_ping": settings.SQLITE_CLOUD_POOL_PRE_PING,
+    "pool_recycle": settings.SQLITE_CLOUD_POOL_RECYCLE,
+}
+engine_options = {"poolclass": QueuePool, **cloud_pool_options}
+async_engine_options = {"poolclass": AsyncAdaptedQueuePool, **cloud_pool_options}
+is_local_sqlite = False
 
 if os.getenv("ENV") == "running_tests":
     # Local SQLite DB for running pytests 
     sqlite_file_name = os.getenv("TEST_SQLITE_FILE_NAME")
     sqlite_url = f"sqlite:///{sqlite_file_name}"
+    async_sqlite_url = f"sqlite+aiosqlite:///{sqlite_file_name}"
+    engine_options = {}
+    # TestClient starts a new event loop per request, don't share connections between loops
+    async_engine_options = {"poolclass": NullPool}
+    is_local_sqlite = True
 
 # Enable foreign key constraints in SQLite
 @event.listens_for(Engine, "connect")
@@ -25,4 +76,30 @@ def set_sqlite_pragma(dbapi_connection, connection_record):
     cursor.execute("PRAGMA foreign_keys=ON")
     cursor.close()
 
-engine = create_engine(sqlite_url)
+def get_pragma_profile(profile: str) -> dict:
+    if profile not in SQLITE_PRAGMA_PROFILES:
+        raise ValueError(
+            f"Unknown SQLite pragma profile {profile!r}, "
+            f"expected one of {list(SQLITE_PRAGMA_PROFILES)}"
+        )
+    return SQLITE_PRAGMA_PROFILES[profile]
+
+def use_pragma_profile(engine: Engine, profile: str) -> None:
+    """Apply a pragma profile to every new connection of a local SQLite engine."""
+    pragmas = get_pragma_profile(profile)
+
+    @event.listens_for(engine, "connect")
+    def set_pragma_profile(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in pragmas.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
+
+engine = create_engine(sqlite_url, **engine_options)
+
+async_engine = create_async_engine(async_sqlite_url, **async_engine_options)
+async_session = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+if is_local_sqlite:
+    use_pragma_profile(engine, settings.SQLITE_PRAGMA_PROFILE)
+    use_pragma_profile(async_engine.sync_engine, settings.SQLITE_PRAGMA_PROFILE)
@@ -0,0 +1,175 @@
+"""Versioned schema migrations.
+
+Migrations run offline, with `scripts/migrate.py`, and every applied one is recorded in
+`nemo_schema_versions`. On cold start the app only compares the recorded version with
+`LATEST_VERSION`, a single query instead of `create_all`'s round of table introspection,
+and `SCHEMA_VERSION_CHECK=false` skips even that once the deploy runs the migrations.
+
+SQLite has no concurrent index builds and a write transaction locks the whole database,
+so migrations keep their transactions short: an index build is a migration of its own,
+and backfills commit every `MIGRATION_BATCH_SIZE` users so requests can write in between.
+The baseline is frozen in `app.api.config.baseline_schema` and the models are not used to
+create anything here, so every schema change after it needs a migration. Databases created
+by `create_all` before migrations existed may already have some of them, so migrations are
+no-ops where their change already exists (`IF NOT EXISTS`, `IF EXISTS`, rebuilds).
+"""
+
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.api.config.baseline_schema import BASELINE_STATEMENTS
+
+from app.api.config.settings import get_setting
+from app.api.crud.analytics_rollup import rebuild_statements
+from app.api.models.nemo import NemoSchemaVersion, NemoUserInformation
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    # handles its own transactions, see `batched_by_user` for long running ones
+    upgrade: Callable[[Engine], None]
+
+
+def batched_by_user(engine: Engine, step: Callable[[Connection, List[str]], None]) -> None:
+    """Run `step` for every `MIGRATION_BATCH_SIZE` users, one transaction per batch."""
+    batch_size = get_setting().MIGRATION_BATCH_SIZE
+    last_google_id = ""
+    while True:
+        with engine.begin() as connection:
+            google_ids = connection.execute(
+                select(NemoUserInformation.google_id)
+                .where(NemoUserInformation.google_id > last_google_id)
+                .order_by(NemoUserInformation.google_id)
+                .limit(batch_size)
+            ).scalars().all()
+            if not google_ids:
+                return
+            step(connection, google_ids)
+        last_google_id = google_ids[-1]
+
+
+def _baseline(engine: Engine) -> None:
+    with engine.begin() as connection:
+        for statement in BASELINE_STATEMENTS:
+            connection.execute(text(statement))
+
+
+def _create_index(name: str, table: str, columns: str) -> Callable[[Engine], None]:
+    # one statement, the table is locked only for the time of this build
+    def upgrade(engine: Engine) -> None:
+        with engine.begin() as connection:
+            connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+    return upgrade
+
+
+def _drop_single_column_indexes(engine: Engine) -> None:
+    # superseded by the (google_id, created_at) indexes, whose first column serves the same lookups
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX IF EXISTS ix_analytics_google_id"))
+        connection.execute(text("DROP INDEX IF EXISTS ix_tasks_google_id"))
+
+
+def _rebuild_analytics_rollup(connection: Connection, google_ids: List[str]) -> None:
+    for statement in rebuild_statements(google_ids):
+        connection.execute(statement)
+
+
+def _add_deletion_job_failed_attempts(engine: Engine) -> None:
+    with engine.begin() as connection:
+        columns = connection.execute(text("PRAGMA table_info(nemo_deletion_jobs)")).all()
+        if "failed_attempts" not in {column.name for column in columns}:
+            connection.execute(
+                text(
+                    "ALTER TABLE nemo_deletion_jobs "
+                    "ADD COLUMN failed_attempts INTEGER DEFAULT 0 NOT NULL"
+                )
+            )
+
+
+MIGRATIONS = [
+    Migration(1, "baseline: create missing tables, indexes and triggers", _baseline),
+    Migration(
+        2,
+        "index nemo_analytics on (google_id, created_at)",
+        _create_index(
+            "ix_analytics_google_id_created_at", "nemo_analytics", "google_id, created_at"
+        ),
+    ),
+    Migration(
+        3,
+        "index nemo_tasks on (google_id, created_at)",
+        _create_index("ix_tasks_google_id_created_at", "nemo_tasks", "google_id, created_at"),
+    ),
+    Migration(4, "drop the single column google_id indexes", _drop_single_column_indexes),
+    Migration(
+        5,
+        "rebuild nemo_analytics_daily from nemo_analytics",
+        lambda engine: batched_by_user(engine, _rebuild_analytics_rollup),
+    ),
+    Migration(6, "count the failed attempts of deletion jobs", _add_deletion_job_failed_attempts),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def current_version(connection: Connection) -> int:
+    """Latest migration applied to the database, 0 before the first one."""
+    try:
+        return connection.execute(select(func.max(NemoSchemaVersion.version))).scalar() or 0
+    except OperationalError as e:
+        if "no such table" not in str(e):
+            raise
+        return 0
+
+
+def pending_migrations(version: int, target: Optional[int] = None) -> List[Migration]:
+    target = LATEST_VERSION if target is None else target
+    return [migration for migration in MIGRATIONS if version < migration.version <= target]
+
+
+def migrate(engine: Engine, target: Optional[int] = None) -> List[Migration]:
+    """Apply the pending migrations up to `target` (default: all) in order, return them.
+
+    A migration is recorded once it completes. If one fails, the ones before it stay applied
+    and running `migrate` again resumes with it.
+    """
+    with engine.begin() as connection:
+        NemoSchemaVersion.__table__.create(connection, checkfirst=True)
+        version = current_version(connection)
+
+    applied = []
+    for migration in pending_migrations(version, target):
+        migration.upgrade(engine)
+        with engine.begin() as connection:
+            connection.execute(
+                insert(NemoSchemaVersion).values(
+                    version=migration.version,
+                    description=migration.description,
+                    applied_at=datetime.now(),
+                )
+            )
+        applied.append(migration)
+    return applied
+
+
+async def check_schema_version(engine: AsyncEngine) -> int:
+    """Make sure the database has every migration this code relies on, with one query.
+
+    A database ahead of the code is fine, that's a rolled back deploy and migrations keep the
+    schema usable by the code before them. The connection goes back to the pool for the first
+    request.
+    """
+    async with engine.connect() as connection:
+        version = await connection.run_sync(current_version)
+    if version < LATEST_VERSION:
+        raise RuntimeError(
+            f"The database schema is at version {version}, this code needs {LATEST_VERSION}. "
+            "Run `make migrate` against it first."
+        )
+    return version
@@ -0,0 +1,436 @@
+"""Embedded read replica of the SQLite Cloud database.
+
+On cold start a snapshot of the primary is pulled from an object store into
+`SQLITE_LOCAL_PATH` and reads are served from that file. Writes still go to the primary;
+afterwards what changed for the affected user is copied into the replica so the next
+read sees it. Rows written by other instances show up once a user's copy is older than
+`SQLITE_REPLICA_MAX_STALENESS` seconds, at which point that user is re-synced before
+the read.
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+
+from sqlalchemy import delete, func, or_
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api.config.database_sqlite import async_session, use_pragma_profile
+from app.api.config.settings import get_setting
+from app.api.utils.read_cache import invalidate_pending
+from app.api.models.nemo import (
+    NemoAnalytics,
+    NemoAnalyticsDaily,
+    NemoSettings,
+    NemoTasks,
+    NemoUserInformation,
+    NemoUserVersion,
+)
+
+
+class ObjectStore:
+    """Minimal interface of the store that holds database snapshots."""
+
+    def last_modified(self, key: str) -> Optional[float]:
+        """Unix timestamp of the stored object or None if it doesn't exist."""
+        raise NotImplementedError
+
+    def download(self, key: str, path: str) -> None:
+        raise NotImplementedError
+
+    def upload(self, path: str, key: str) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class DirectoryObjectStore(ObjectStore):
+    """Object store backed by a local directory, for development and tests."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def last_modified(self, key: str) -> Optional[float]:
+        path = os.path.join(self.root, key)
+        return os.path.getmtime(path) if os.path.exists(path) else None
+
+    def download(self, key: str, path: str) -> None:
+        shutil.copyfile(os.path.join(self.root, key), path)
+
+    def upload(self, path: str, key: str) -> None:
+        target = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(path, target)
+
+    def delete(self, key: str) -> None:
+        path = os.path.join(self.root, key)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class S3ObjectStore(ObjectStore):
+    """Object store backed by an S3 bucket. boto3 ships with the Lambda runtime."""
+
+    def __init__(self, bucket: str):
+        import boto3
+
+        self.bucket = bucket
+        self.client = boto3.client("s3")
+
+    def last_modified(self, key: str) -> Optional[float]:
+        from botocore.exceptions import ClientError
+
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError:
+            return None
+        return response["LastModified"].timestamp()
+
+    def download(self, key: str, path: str) -> None:
+        self.client.download_file(self.bucket, key, path)
+
+    def upload(self, path: str, key: str) -> None:
+        self.client.upload_file(path, self.bucket, key)
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+
+VERSION_COUNTERS = [name for name in NemoUserVersion.model_fields if name != "google_id"]
+
+
+def _counter(versions, counter: str) -> int:
+    return getattr(versions, counter) if versions is not None else 0
+
+
+class LocalReplica:
+    """Local SQLite copy of the primary database, kept fresh per user."""
+
+    def __init__(self, store: ObjectStore, snapshot_key: str, path: str, max_staleness: float):
+        self.store = store
+        self.snapshot_key = snapshot_key
+        self.path = path
+        self.max_staleness = max_staleness
+        self.snapshot_synced_at: float = 0
+        self._user_synced_at: Dict[str, float] = {}
+
+        self.load_snapshot()
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        use_pragma_profile(self.engine.sync_engine, "read-heavy")
+        self.session = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+
+    @property
+    def synced_at_path(self) -> str:
+        """Sidecar file with the publication time of the snapshot in `path`."""
+        return f"{self.path}.synced_at"
+
+    def load_snapshot(self) -> None:
+        """Pull the latest snapshot unless a warm container already has the file.
+
+        Its rows are as old as the snapshot, not as the download, so freshness counts from the
+        store's timestamp. That's kept in a sidecar file for later processes in a warm container,
+        and is 0, i.e. every user is synced before their first read, when there's no snapshot.
+        """
+        if not os.path.exists(self.path):
+            if os.path.exists(self.synced_at_path):
+                os.remove(self.synced_at_path)
+            snapshot_time = self.store.last_modified(self.snapshot_key)
+            if snapshot_time is not None:
+                tmp_path = f"{self.path}.download"
+                self.store.download(self.snapshot_key, tmp_path)
+                os.replace(tmp_path, self.path)
+            with open(self.synced_at_path, "w") as f:
+                f.write(repr(snapshot_time or 0))
+        # make sure the schema exists even if there's no snapshot yet
+        engine = create_engine(f"sqlite:///{self.path}")
+        SQLModel.metadata.create_all(engine)
+        engine.dispose()
+        try:
+            with open(self.synced_at_path) as f:
+                self.snapshot_synced_at = float(f.read())
+        except (OSError, ValueError):
+            self.snapshot_synced_at = 0
+
+    def is_fresh(self, google_id: str) -> bool:
+        synced_at = self._user_synced_at.get(google_id, self.snapshot_synced_at)
+        return time.time() - synced_at <= self.max_staleness
+
+    async def ensure_fresh(self, google_id: str) -> None:
+        if not self.is_fresh(google_id):
+            await self.sync_user(google_id)
+
+    async def sync_user(self, google_id: str, task_changes: Sequence[int] = ()) -> None:
+        """Pull what changed for the user on the primary since the last sync.
+
+        The replica's `nemo_user_versions` row holds the primary's counters as of the last sync,
+        so only the tables whose counter moved since are read. Analytics are append-only and
+        tasks mostly so: rows past the replica's highest id are pulled, plus the tasks in
+        `task_changes`, one id per edit or delete made by this instance. When that doesn't
+        account for every change the counter saw, e.g. another instance edited a task, the
+        user's rows of that table are replaced instead.
+        """
+        synced_at = time.time()
+        async with self.engine.connect() as conn:
+            synced_versions = (
+                await conn.execute(
+                    select(NemoUserVersion).where(NemoUserVersion.google_id == google_id)
+                )
+            ).first()
+            last_analytics_id = await conn.scalar(
+                select(func.coalesce(func.max(NemoAnalytics.id), 0)).where(
+                    NemoAnalytics.google_id == google_id
+                )
+            )
+            last_task_id = await conn.scalar(
+                select(func.coalesce(func.max(NemoTasks.id), 0)).where(
+                    NemoTasks.google_id == google_id
+                )
+            )
+
+        user_deleted = False
+        # (model, rows pulled from the primary, clause of the replica rows they replace)
+        writes = []
+        async with async_session() as session:
+            # read first, rows changed after it are pulled again by the next sync
+            versions = (
+                await session.exec(
+                    select(NemoUserVersion).where(NemoUserVersion.google_id == google_id)
+                )
+            ).first()
+            changes = {
+                counter: _counter(versions, counter) - _counter(synced_versions, counter)
+                for counter in VERSION_COUNTERS
+            }
+
+            if changes["account"]:
+                user = (
+                    await session.exec(
+                        select(NemoUserInformation).where(
+                            NemoUserInformation.google_id == google_id
+                        )
+                    )
+                ).first()
+                user_deleted = user is None
+                writes.append((NemoUserInformation, [user] if user else [], None))
+
+            if changes["settings"]:
+                settings = (
+                    await session.exec(
+                        select(NemoSettings).where(NemoSettings.google_id == google_id)
+                    )
+                ).all()
+                writes.append((NemoSettings, settings, None))
+
+            if changes["analytics"]:
+                user_analytics = NemoAnalytics.google_id == google_id
+                analytics = (
+                    await session.exec(
+                        select(NemoAnalytics).where(
+                            user_analytics, NemoAnalytics.id > last_analytics_id
+                        )
+                    )
+                ).all()
+                user_days = NemoAnalyticsDaily.google_id == google_id
+                if len(analytics) == changes["analytics"]:
+                    # only the days the new sessions were added to changed
+                    first_day = min(row.created_at for row in analytics).date()
+                    writes.append((NemoAnalytics, analytics, None))
+                    user_days = user_days & (NemoAnalyticsDaily.day >= first_day)
+                else:
+                    analytics = (
+                        await session.exec(select(NemoAnalytics).where(user_analytics))
+                    ).all()
+                    writes.append((NemoAnalytics, analytics, user_analytics))
+                days = (await session.exec(select(NemoAnalyticsDaily).where(user_days))).all()
+                writes.append((NemoAnalyticsDaily, days, user_days))
+
+            if changes["tasks"]:
+                user_tasks = NemoTasks.google_id == google_id
+                changed_ids = set(task_changes)
+                pulled = NemoTasks.id > last_task_id
+                if changed_ids:
+                    pulled = or_(pulled, NemoTasks.id.in_(changed_ids))
+                tasks = (await session.exec(select(NemoTasks).where(user_tasks, pulled))).all()
+                inserted = sum(1 for task in tasks if task.id > last_task_id)
+                if inserted + len(task_changes) == changes["tasks"]:
+                    writes.append((NemoTasks, tasks, user_tasks & NemoTasks.id.in_(changed_ids)))
+                else:
+                    tasks = (await session.exec(select(NemoTasks).where(user_tasks))).all()
+                    writes.append((NemoTasks, tasks, user_tasks))
+
+        async with self.engine.begin() as conn:
+            if user_deleted:
+                await self._delete_user(conn, google_id)
+            else:
+                for model, rows, replaced in writes:
+                    if replaced is not None:
+                        await conn.execute(delete(model).where(replaced))
+                    await self._upsert(conn, model, rows)
+            # last, it overwrites what the replica's own version triggers counted for the
+            # writes above
+            if versions is not None:
+                await self._upsert(conn, NemoUserVersion, [versions])
+        self._user_synced_at[google_id] = synced_at
+
+    async def _upsert(self, conn, model, rows, chunk_size: int = 500) -> None:
+        table = model.__table__
+        primary_keys = [column.name for column in table.primary_key]
+        for i in range(0, len(rows), chunk_size):
+            statement = insert(table).values([row.model_dump() for row in rows[i:i + chunk_size]])
+            statement = statement.on_conflict_do_update(
+                index_elements=primary_keys,
+                set_={
+                    column.name: statement.excluded[column.name]
+                    for column in table.columns
+                    if column.name not in primary_keys
+                },
+            )
+            await conn.execute(statement)
+
+    async def _delete_user(self, conn, google_id: str) -> None:
+        for model in (
+            NemoAnalytics,
+            NemoAnalyticsDaily,
+            NemoTasks,
+            NemoSettings,
+            NemoUserInformation,
+        ):
+            await conn.execute(delete(model).where(model.google_id == google_id))
+
+    async def dispose(self) -> None:
+        await self.engine.dispose()
+
+
+def publish_snapshot(store: ObjectStore, key: str, source_path: str) -> None:
+    """Upload a consistent copy of a SQLite file, including anything still in its WAL."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        snapshot_path = os.path.join(tmp_dir, "snapshot.db")
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(snapshot_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        store.upload(snapshot_path, key)
+
+
+_replica: Optional[LocalReplica] = None
+
+
+def create_object_store_from_settings() -> ObjectStore:
+    settings = get_setting()
+    if settings.SQLITE_SNAPSHOT_STORE == "s3":
+        return S3ObjectStore(settings.SQLITE_S3_BUCKET)
+    return DirectoryObjectStore(settings.SQLITE_SNAPSHOT_STORE)
+
+
+def create_replica_from_settings() -> Optional[LocalReplica]:
+    settings = get_setting()
+    if not settings.SQLITE_REPLICA_ENABLED:
+        return None
+    return LocalReplica(
+        store=create_object_store_from_settings(),
+        snapshot_key=settings.SQLITE_CLOUD_DB,
+        path=settings.SQLITE_LOCAL_PATH,
+        max_staleness=settings.SQLITE_REPLICA_MAX_STALENESS,
+    )
+
+
+def get_replica() -> Optional[LocalReplica]:
+    global _replica
+    if _replica is None:
+        _replica = create_replica_from_settings()
+    return _replica
+
+
+def set_replica(replica: Optional[LocalReplica]) -> None:
+    global _replica
+    _replica = replica
+
+
+# google_ids written through a request-scoped session, refreshed once it commits, with the
+# ids of the tasks edited or deleted for them, see `record_task_changes`
+PENDING_REFRESH_KEY = "replica_pending_refresh"
+
+
+def _pending_refresh(session: AsyncSession) -> Dict[str, List[int]]:
+    return session.info.setdefault(PENDING_REFRESH_KEY, {})
+
+
+def record_task_changes(session: AsyncSession, google_id: str, task_ids: Sequence[int]) -> None:
+    """Note the tasks a `write_session` edited or deleted, one id per changed row.
+
+    The replica refresh pulls just those instead of all of the user's tasks. Inserts don't
+    need to be recorded, they're found past the replica's highest id.
+    """
+    _pending_refresh(session).setdefault(google_id, []).extend(task_ids)
+
+
+@asynccontextmanager
+async def read_session(
+    google_id: str, session: Optional[AsyncSession] = None
+) -> AsyncIterator[AsyncSession]:
+    """Session for reading a user's rows, served from the replica when it's enabled.
+
+    A request-scoped `session` is reused when there's no replica, or when the request
+    already wrote this user's rows and has to read its own uncommitted writes.
+    """
+    replica = get_replica()
+    if session is not None and (replica is None or google_id in _pending_refresh(session)):
+        yield session
+        return
+
+    if replica is None:
+        async with async_session() as session:
+            yield session
+        return
+
+    await replica.ensure_fresh(google_id)
+    async with replica.session() as session:
+        yield session
+
+
+@asynccontextmanager
+async def write_session(
+    google_id: str, session: Optional[AsyncSession] = None
+) -> AsyncIterator[AsyncSession]:
+    """Session for writing a user's rows to the primary.
+
+    Without a request-scoped `session` a new one is opened, committed and the replica
+    refreshed right away. Otherwise the owner of `session` commits, see `refresh_pending`.
+    """
+    if session is not None:
+        _pending_refresh(session).setdefault(google_id, [])
+        yield session
+        # surface constraint errors to the caller instead of at the final commit
+        await session.flush()
+        return
+
+    async with async_session() as session:
+        _pending_refresh(session).setdefault(google_id, [])
+        yield session
+        await session.commit()
+    await invalidate_pending(session)
+    await refresh_pending(session)
+
+
+async def refresh_replica(google_id: str, task_changes: Sequence[int] = ()) -> None:
+    """Bring the replica up to date after writing the user's rows to the primary."""
+    replica = get_replica()
+    if replica is not None:
+        await replica.sync_user(google_id, task_changes)
+
+
+async def refresh_pending(session: AsyncSession) -> None:
+    """Refresh every user written through `session`, after it has been committed."""
+    for google_id, task_changes in session.info.pop(PENDING_REFRESH_KEY, {}).items():
+        await refresh_replica(google_id, task_changes)
@@ -0,0 +1,75 @@
+"""Request-scoped database session and connection checkout instrumentation."""
+
+import logging
+from contextvars import ContextVar
+from typing import AsyncIterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api.config.database_sqlite import async_session
+from app.api.config.replica import refresh_pending
+from app.api.utils.read_cache import invalidate_pending
+
+LOGGER = logging.getLogger(__name__)
+CHECKOUTS_HEADER = "X-DB-Checkouts"
+
+_request_checkouts: ContextVar[Optional[List[int]]] = ContextVar("request_checkouts", default=None)
+
+
+@event.listens_for(Pool, "checkout")
+def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+    checkouts = _request_checkouts.get()
+    if checkouts is not None:
+        checkouts[0] += 1
+
+
+async def get_session() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency with one session per request, committed or rolled back once at the end.
+
+    The session only checks out a connection when it runs its first statement, so requests
+    served entirely from the read replica never touch the primary.
+    """
+    async with async_session() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+    await invalidate_pending(session)
+    await refresh_pending(session)
+
+
+class CheckoutCounterMiddleware:
+    """Count the connection checkouts of every request, across all engines and pools.
+
+    The total is logged and returned in the `X-DB-Checkouts` response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        checkouts = [0]
+        token = _request_checkouts.set(checkouts)
+
+        async def send_with_checkouts(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append(
+                    (CHECKOUTS_HEADER.lower().encode(), str(checkouts[0]).encode())
+                )
+                LOGGER.debug(
+                    "%s %s: %d connection checkouts", scope["method"], scope["path"], checkouts[0]
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_checkouts)
+        finally:
+            _request_checkouts.reset(token)
@@ -8,10 +8,52 @@ class Settings:
     SQLITE_CLOUD_DB = "nemo-prod.sqlite"
     SQLITE_LOCAL_PATH = f"/tmp/{SQLITE_DB_NAME}" if os.getenv("ENV") == "prod" else SQLITE_DB_NAME
     SQLITE_S3_BUCKET = "nemo-app-db"
+    SQLITE_REPLICA_ENABLED = os.getenv("SQLITE_REPLICA_ENABLED", "false") == "true"
+    SQLITE_REPLICA_MAX_STALENESS = float(os.getenv("SQLITE_REPLICA_MAX_STALENESS", 30))  # seconds
+    SQLITE_SNAPSHOT_STORE = os.getenv("SQLITE_SNAPSHOT_STORE", "s3")  # "s3" or a local directory
+    SQLITE_PRAGMA_PROFILE = os.getenv("SQLITE_PRAGMA_PROFILE", "durable")
+    SQLITE_CLOUD_POOL_SIZE = int(os.getenv("SQLITE_CLOUD_POOL_SIZE", 5))
+    SQLITE_CLOUD_MAX_OVERFLOW = int(os.getenv("SQLITE_CLOUD_MAX_OVERFLOW", 10))
+    SQLITE_CLOUD_POOL_PRE_PING = os.getenv("SQLITE_CLOUD_POOL_PRE_PING", "true") == "true"
+    SQLITE_CLOUD_POOL_RECYCLE = int(os.getenv("SQLITE_CLOUD_POOL_RECYCLE", 300))  # seconds
+    WRITE_QUEUE_ENABLED = os.getenv("WRITE_QUEUE_ENABLED", "false") == "true"
+    WRITE_QUEUE_MAX_DELAY_MS = float(os.getenv("WRITE_QUEUE_MAX_DELAY_MS", 5))
+    WRITE_QUEUE_MAX_BATCH = int(os.getenv("WRITE_QUEUE_MAX_BATCH", 200))
+    ANALYTICS_BATCH_MAX_SIZE = int(os.getenv("ANALYTICS_BATCH_MAX_SIZE", 500))
+    TASKS_BATCH_MAX_SIZE = int(os.getenv("TASKS_BATCH_MAX_SIZE", 500))
+    DELETION_CHUNK_SIZE = int(os.getenv("DELETION_CHUNK_SIZE", 1000))
+    DELETION_JOB_STALE_AFTER = float(os.getenv("DELETION_JOB_STALE_AFTER", 60))  # seconds
+    DELETION_MAX_ATTEMPTS = int(os.getenv("DELETION_MAX_ATTEMPTS", 5))
+    # invoked asynchronously to run deletion and import jobs, this function itself on Lambda
+    DELETION_WORKER_FUNCTION = os.getenv(
+        "DELETION_WORKER_FUNCTION", os.getenv("AWS_LAMBDA_FUNCTION_NAME")
+    )
+    # false when the deploy ran the migrations
+    SCHEMA_VERSION_CHECK = os.getenv("SCHEMA_VERSION_CHECK", "true") == "true"
+    # users per backfill transaction
+    MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", 200))
+    # seconds
+    REVOKED_USERS_REFRESH_INTERVAL = float(os.getenv("REVOKED_USERS_REFRESH_INTERVAL", 5))
+    EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 1000))
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 500))
+    IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", 20))
+    # larger uploads are run by the worker, when there's a worker function
+    IMPORT_INLINE_MAX_BYTES = int(os.getenv("IMPORT_INLINE_MAX_BYTES", 5 * 1024 * 1024))
+    IMPORT_JOB_STALE_AFTER = float(os.getenv("IMPORT_JOB_STALE_AFTER", 60))  # seconds
+    READ_CACHE_ENABLED = os.getenv("READ_CACHE_ENABLED", "false") == "true"
+    READ_CACHE_TTL = float(os.getenv("READ_CACHE_TTL", 30))  # seconds
+    READ_CACHE_MAX_SIZE = int(os.getenv("READ_CACHE_MAX_SIZE", 4096))
+    FAST_RESPONSES_ENABLED = os.getenv("FAST_RESPONSES_ENABLED", "false") == "true"
+    COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true") == "true"
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))  # bytes
+    COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+    GOOGLE_CERTS_CACHE_FILE = "/tmp/google_certs.json" if os.getenv("ENV") == "prod" else None
     SECRET_KEY: str = os.getenv("SECRET_KEY", "09d25e094faa6ca")
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 43200  # 30 Days
     JWT_TOKEN_TYPE: str = "bearer"
+    TOKEN_CACHE_MAX_SIZE: int = int(os.getenv("TOKEN_CACHE_MAX_SIZE", 4096))
     BACKEND_CORS_ORIGINS: List[str] = ["https://nemo-app.netlify.app"]
     if os.getenv("ENV") == "development":
         BACKEND_CORS_ORIGINS.append("http://localhost:3000")
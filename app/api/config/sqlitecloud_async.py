@@ -0,0 +1,94 @@
+"""Async SQLAlchemy dialect for SQLite Cloud.
+
+The `sqlitecloud` driver only ships a blocking DB-API module. aiosqlite already solves the
+same problem for the stdlib `sqlite3` module by running a connection on its own worker thread
+and exposing awaitable methods, and it accepts any `sqlite3`-compatible connector. This
+dialect hands it a connector for the SQLite Cloud DB-API instead, so the stock SQLAlchemy
+aiosqlite adapter can drive it with `create_async_engine("sqlitecloud+aiosqlite://...")`.
+"""
+
+from functools import partial
+from threading import Thread
+
+from sqlalchemy.dialects import registry
+from sqlalchemy.dialects.sqlite.aiosqlite import (
+    AsyncAdapt_aiosqlite_dbapi,
+    SQLiteDialect_aiosqlite,
+)
+from sqlalchemy.engine.url import URL
+from sqlalchemy.exc import ArgumentError
+from sqlalchemy.pool import NullPool
+
+
+class AsyncAdapt_sqlitecloud_dbapi(AsyncAdapt_aiosqlite_dbapi):
+    def __init__(self, aiosqlite, sqlitecloud_dbapi):
+        self.sqlitecloud_dbapi = sqlitecloud_dbapi
+        super().__init__(aiosqlite, __import__("sqlite3"))
+
+    def _init_dbapi_attributes(self) -> None:
+        super()._init_dbapi_attributes()
+        # surface the driver's own exceptions so SQLAlchemy wraps them correctly
+        for name in (
+            "DatabaseError",
+            "Error",
+            "IntegrityError",
+            "NotSupportedError",
+            "OperationalError",
+            "ProgrammingError",
+        ):
+            setattr(self, name, getattr(self.sqlitecloud_dbapi, name))
+
+    def connect(self, connection_str: str, **kw):
+        def creator(**_):
+            connection = self.aiosqlite.Connection(
+                partial(self.sqlitecloud_dbapi.connect, connection_str), iter_chunk_size=64
+            )
+            # aiosqlite 0.22 (pinned in requirements.txt) keeps its worker in the private
+            # `_thread`. A daemon worker doesn't keep the process alive for an unclosed connection.
+            worker = getattr(connection, "_thread", None)
+            if not isinstance(worker, Thread):
+                raise RuntimeError(
+                    "aiosqlite.Connection no longer has a `_thread` worker, "
+                    "update AsyncAdapt_sqlitecloud_dbapi.connect for this aiosqlite version."
+                )
+            worker.daemon = True
+            return connection
+
+        return super().connect(async_creator_fn=creator, **kw)
+
+
+class SQLiteCloudDialect_aiosqlite(SQLiteDialect_aiosqlite):
+    name = "sqlitecloud"
+    driver = "aiosqlite"
+
+    supports_statement_cache = False
+
+    @classmethod
+    def import_dbapi(cls) -> AsyncAdapt_sqlitecloud_dbapi:
+        from sqlitecloud import dbapi2
+
+        return AsyncAdapt_sqlitecloud_dbapi(__import__("aiosqlite"), dbapi2)
+
+    @classmethod
+    def get_pool_class(cls, url: URL):
+        return NullPool
+
+    def on_connect(self):
+        # SQLite Cloud doesn't support user defined functions (regexp, floor).
+        return None
+
+    def create_connect_args(self, url: URL):
+        if not url.host:
+            raise ArgumentError(
+                "SQLite Cloud URL is required, e.g. "
+                "sqlitecloud+aiosqlite://myserver.sqlite.cloud:8860/mydb.sqlite?apikey=mykey1234"
+            )
+        return ([url.set(drivername="sqlitecloud").render_as_string(hide_password=False)], {})
+
+    def is_disconnect(self, e, connection, cursor):
+        return "Cannot operate on a closed database." in str(e) or super().is_disconnect(
+            e, connection, cursor
+        )
+
+
+registry.register("sqlitecloud.aiosqlite", __name__, "SQLiteCloudDialect_aiosqlite")
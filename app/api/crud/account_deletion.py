@@ -0,0 +1,282 @@
+"""Account deletion as a background job.
+
+`DELETE /nemo/delete` only records a `NemoDeletionJob`, revokes the user's access and
+hands the job to a worker: an asynchronous invoke of this Lambda (`DELETION_WORKER_FUNCTION`),
+or a background task after the response when running outside Lambda. `run_deletion_job`
+then removes analytics and tasks in chunks of `DELETION_CHUNK_SIZE` rows, one short
+transaction per chunk with the progress saved alongside, so a long-time user never holds
+the write lock for long or runs into the Lambda timeout.
+
+`sweep_deletion_jobs` runs on a schedule and picks up the jobs nobody is working on: ones
+whose invoke was lost, that were cut short by a timeout, or that failed, which are retried
+up to `DELETION_MAX_ATTEMPTS` times. Jobs out of retries are logged and counted by
+`deletion_job_counts`, their users stay revoked.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Set
+
+from sqlmodel import delete, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api.config.database_sqlite import async_session
+from app.api.config.replica import refresh_replica
+from app.api.config.settings import get_setting
+from app.api.crud.bulk_import import run_import_job
+from app.api.models.nemo import (
+    NemoAnalytics,
+    NemoAnalyticsDaily,
+    NemoDeletionJob,
+    NemoSettings,
+    NemoTasks,
+    NemoUserInformation,
+)
+from app.api.utils.read_cache import invalidate_pending, mark_stale
+
+LOGGER = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Lambda events with this key are worker tasks, see `handle_worker_event`
+WORKER_TASK_KEY = "nemo_task"
+
+
+class RevokedUsers:
+    """google_ids with an unfinished deletion job, reloaded every `refresh_interval` seconds.
+
+    Users revoked by this process are blocked right away, other instances pick them up
+    on their next reload.
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._google_ids: Set[str] = set()
+        self._local: Set[str] = set()
+        self._loaded_at = float("-inf")
+
+    async def contains(self, google_id: str, session: AsyncSession) -> bool:
+        if time.monotonic() - self._loaded_at > self.refresh_interval:
+            await self.refresh(session)
+        return google_id in self._google_ids or google_id in self._local
+
+    async def refresh(self, session: AsyncSession) -> None:
+        statement = select(NemoDeletionJob.google_id).where(NemoDeletionJob.status != DONE)
+        self._google_ids = set((await session.exec(statement)).all())
+        self._loaded_at = time.monotonic()
+
+    def add(self, google_id: str) -> None:
+        self._local.add(google_id)
+
+    def discard(self, google_id: str) -> None:
+        self._local.discard(google_id)
+        self._google_ids.discard(google_id)
+
+
+revoked_users = RevokedUsers(get_setting().REVOKED_USERS_REFRESH_INTERVAL)
+
+
+async def start_deletion(google_id: str, session: AsyncSession) -> NemoDeletionJob:
+    """Record a deletion job for the user, or return the one that's already in progress."""
+    statement = (
+        select(NemoDeletionJob)
+        .where(NemoDeletionJob.google_id == google_id)
+        .where(NemoDeletionJob.status != DONE)
+    )
+    job = (await session.exec(statement)).first()
+    if job is None:
+        now = datetime.now()
+        job = NemoDeletionJob(
+            id=uuid.uuid4().hex, google_id=google_id, status=PENDING, created_at=now, updated_at=now
+        )
+        session.add(job)
+        await session.flush()
+    revoked_users.add(google_id)
+    return job
+
+
+async def get_deletion_job(job_id: str, google_id: str) -> Optional[NemoDeletionJob]:
+    """The user's deletion job, None for another user's."""
+    async with async_session() as session:
+        job = await session.get(NemoDeletionJob, job_id)
+    return job if job is not None and job.google_id == google_id else None
+
+
+async def has_unfinished_deletion(google_id: str, session: AsyncSession) -> bool:
+    """Whether the user's account is being deleted, read from the database, not `revoked_users`."""
+    statement = (
+        select(NemoDeletionJob.id)
+        .where(NemoDeletionJob.google_id == google_id)
+        .where(NemoDeletionJob.status != DONE)
+    )
+    return (await session.exec(statement)).first() is not None
+
+
+def _invoke_worker(function_name: str, payload: str) -> None:
+    import boto3  # slow to import and only needed here, it ships with the Lambda runtime
+
+    boto3.client("lambda").invoke(
+        FunctionName=function_name, InvocationType="Event", Payload=payload
+    )
+
+
+async def dispatch_worker_task(task: str, **fields) -> bool:
+    """Send a task to its own Lambda invocation, False when there's no worker function.
+
+    The invoke is asynchronous, it returns once Lambda has queued the event. Raises when
+    the invoke fails.
+    """
+    function_name = get_setting().DELETION_WORKER_FUNCTION
+    if not function_name:
+        return False
+    payload = json.dumps({WORKER_TASK_KEY: task, **fields})
+    await asyncio.to_thread(_invoke_worker, function_name, payload)
+    return True
+
+
+async def dispatch_deletion_job(job_id: str) -> bool:
+    """Start the job in the worker, False when there's no worker function.
+
+    The job must be committed first. If the invoke fails the sweep runs the job once it's idle.
+    """
+    try:
+        return await dispatch_worker_task("run_deletion_job", job_id=job_id)
+    except Exception:
+        LOGGER.exception("Could not start deletion job %s, leaving it to the sweep", job_id)
+    return True
+
+
+async def _delete_chunk(session: AsyncSession, model, google_id: str, chunk_size: int) -> int:
+    ids = select(model.id).where(model.google_id == google_id).limit(chunk_size).scalar_subquery()
+    result = await session.exec(delete(model).where(model.id.in_(ids)))
+    return result.rowcount
+
+
+async def run_deletion_job(job_id: str) -> None:
+    """Delete the user's rows in bounded chunks, saving the progress after each one."""
+    chunk_size = get_setting().DELETION_CHUNK_SIZE
+    async with async_session() as session:
+        job = await session.get(NemoDeletionJob, job_id)
+        if job is None or job.status == DONE:
+            return
+        google_id = job.google_id
+
+        try:
+            for model, progress in (
+                (NemoAnalytics, "analytics_deleted"),
+                (NemoTasks, "tasks_deleted"),
+            ):
+                while True:
+                    deleted = await _delete_chunk(session, model, google_id, chunk_size)
+                    setattr(job, progress, getattr(job, progress) + deleted)
+                    job.status = RUNNING
+                    job.updated_at = datetime.now()
+                    session.add(job)
+                    await session.commit()
+                    if deleted < chunk_size:
+                        break
+
+            for model in (NemoAnalyticsDaily, NemoSettings, NemoUserInformation):
+                await session.exec(delete(model).where(model.google_id == google_id))
+            mark_stale(session, google_id)
+            job.status = DONE
+            job.updated_at = datetime.now()
+            session.add(job)
+            await session.commit()
+            await invalidate_pending(session)
+        except Exception as e:
+            LOGGER.exception("Deletion job %s failed", job_id)
+            await session.rollback()
+            job = await session.get(NemoDeletionJob, job_id)
+            job.status = FAILED
+            job.error = str(e)
+            job.failed_attempts += 1
+            job.updated_at = datetime.now()
+            session.add(job)
+            await session.commit()
+            if job.failed_attempts >= get_setting().DELETION_MAX_ATTEMPTS:
+                LOGGER.error(
+                    "Deletion job %s gave up after %d attempts, its user stays revoked",
+                    job_id,
+                    job.failed_attempts,
+                )
+            return
+
+    revoked_users.discard(google_id)
+    await refresh_replica(google_id)
+
+
+async def sweep_deletion_jobs() -> int:
+    """Run the unfinished jobs idle for `DELETION_JOB_STALE_AFTER` seconds, return how many.
+
+    Idle jobs were never started, cut short (e.g. by the Lambda timeout) or failed. Failed
+    ones are retried until they reach `DELETION_MAX_ATTEMPTS`.
+    """
+    settings = get_setting()
+    idle_since = datetime.now() - timedelta(seconds=settings.DELETION_JOB_STALE_AFTER)
+    async with async_session() as session:
+        statement = (
+            select(NemoDeletionJob.id)
+            .where(NemoDeletionJob.status != DONE)
+            .where(NemoDeletionJob.updated_at < idle_since)
+            .where(NemoDeletionJob.failed_attempts < settings.DELETION_MAX_ATTEMPTS)
+            .order_by(NemoDeletionJob.updated_at)
+        )
+        job_ids = (await session.exec(statement)).all()
+    for job_id in job_ids:
+        await run_deletion_job(job_id)
+    return len(job_ids)
+
+
+async def deletion_job_counts() -> Dict[str, int]:
+    """Unfinished jobs by status, and the failed ones the sweep no longer retries."""
+    async with async_session() as session:
+        statement = (
+            select(NemoDeletionJob.status, func.count())
+            .where(NemoDeletionJob.status != DONE)
+            .group_by(NemoDeletionJob.status)
+        )
+        counts = {status: 0 for status in (PENDING, RUNNING, FAILED)}
+        counts.update((await session.exec(statement)).all())
+        statement = (
+            select(func.count())
+            .select_from(NemoDeletionJob)
+            .where(NemoDeletionJob.status == FAILED)
+            .where(NemoDeletionJob.failed_attempts >= get_setting().DELETION_MAX_ATTEMPTS)
+        )
+        counts["gave_up"] = (await session.exec(statement)).one()
+    return counts
+
+
+def handle_worker_event(event: Dict) -> Dict:
+    """Run a worker task sent to the Lambda by `dispatch_worker_task` or the sweep schedule."""
+    task = event[WORKER_TASK_KEY]
+    if task == "run_deletion_job":
+        coroutine = run_deletion_job(event["job_id"])
+    elif task == "sweep_deletion_jobs":
+        coroutine = sweep_deletion_jobs()
+    elif task == "run_import_job":
+        coroutine = run_import_job(event["job_id"])
+    else:
+        raise ValueError(f"Unknown worker task {task!r}")
+    result = _worker_loop().run_until_complete(coroutine)
+    return {"task": task, "result": result}
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _worker_loop() -> asyncio.AbstractEventLoop:
+    # one loop for the worker tasks of this process, kept across warm invocations. Not set as
+    # the current loop, so it's left alone by Mangum and by code that creates its own.
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+    return _loop
@@ -0,0 +1,155 @@
+"""Maintenance of the `nemo_analytics_daily` rollup table."""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, case, delete, func, or_
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api.models.nemo import NemoAnalytics, NemoAnalyticsDaily
+
+
+def rollup_row(google_id: str, created_at: datetime, duration: int) -> Dict:
+    """Parameters that add one session to the user's rollup row for that day."""
+    return {
+        "google_id": google_id,
+        "day": created_at.date(),
+        "total_duration": duration,
+        "session_count": 1,
+        "max_session": duration,
+        "max_session_at": created_at,
+    }
+
+
+def _on_conflict_merge(statement):
+    excluded = statement.excluded
+    is_new_max = or_(
+        excluded.max_session > NemoAnalyticsDaily.max_session,
+        and_(
+            excluded.max_session == NemoAnalyticsDaily.max_session,
+            excluded.max_session_at > NemoAnalyticsDaily.max_session_at,
+        ),
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[NemoAnalyticsDaily.google_id, NemoAnalyticsDaily.day],
+        set_={
+            "total_duration": NemoAnalyticsDaily.total_duration + excluded.total_duration,
+            "session_count": NemoAnalyticsDaily.session_count + excluded.session_count,
+            "max_session": case(
+                (is_new_max, excluded.max_session), else_=NemoAnalyticsDaily.max_session
+            ),
+            "max_session_at": case(
+                (is_new_max, excluded.max_session_at), else_=NemoAnalyticsDaily.max_session_at
+            ),
+        },
+    )
+
+
+def rollup_upsert_statement(google_id: str, created_at: datetime, duration: int):
+    """Statement that adds one session to the user's rollup row for that day."""
+    return _on_conflict_merge(
+        insert(NemoAnalyticsDaily).values(**rollup_row(google_id, created_at, duration))
+    )
+
+
+def rollup_upsert_many_statement(rows: Optional[List[Dict]] = None):
+    """Same upsert for several `rollup_row`s.
+
+    Without `rows` the statement has no values and is meant for executemany, otherwise
+    it's a single multi-row INSERT. Rows for the same day are merged one after the other.
+    """
+    statement = insert(NemoAnalyticsDaily)
+    if rows is not None:
+        statement = statement.values(rows)
+    return _on_conflict_merge(statement)
+
+
+def _raw_daily_query(google_ids: Optional[Sequence[str]] = None):
+    """Aggregate raw analytics the same way the rollup does."""
+    ranked = select(
+        NemoAnalytics.google_id,
+        func.date(NemoAnalytics.created_at).label("day"),
+        NemoAnalytics.duration,
+        NemoAnalytics.created_at,
+        func.row_number()
+        .over(
+            partition_by=(NemoAnalytics.google_id, func.date(NemoAnalytics.created_at)),
+            order_by=(NemoAnalytics.duration.desc(), NemoAnalytics.created_at.desc()),
+        )
+        .label("rank"),
+    )
+    if google_ids is not None:
+        ranked = ranked.where(NemoAnalytics.google_id.in_(google_ids))
+    ranked = ranked.subquery()
+
+    return select(
+        ranked.c.google_id,
+        ranked.c.day,
+        func.sum(ranked.c.duration).label("total_duration"),
+        func.count().label("session_count"),
+        func.max(ranked.c.duration).label("max_session"),
+        func.max(case((ranked.c.rank == 1, ranked.c.created_at))).label("max_session_at"),
+    ).group_by(ranked.c.google_id, ranked.c.day)
+
+
+def rebuild_statements(google_ids: Optional[Sequence[str]] = None) -> Tuple:
+    """DELETE and INSERT replacing the rollup rows of `google_ids`, or everyone's, from raw rows."""
+    statement_delete = delete(NemoAnalyticsDaily)
+    if google_ids is not None:
+        statement_delete = statement_delete.where(NemoAnalyticsDaily.google_id.in_(google_ids))
+
+    statement_insert = insert(NemoAnalyticsDaily).from_select(
+        ["google_id", "day", "total_duration", "session_count", "max_session", "max_session_at"],
+        _raw_daily_query(google_ids),
+    )
+    return statement_delete, statement_insert
+
+
+async def backfill(session: AsyncSession, google_id: Optional[str] = None) -> int:
+    """Rebuild the rollup from the raw rows, for one user or everyone. Returns the row count."""
+    statement_delete, statement_insert = rebuild_statements(
+        None if google_id is None else [google_id]
+    )
+    await session.exec(statement_delete)
+    result = await session.exec(statement_insert)
+    await session.commit()
+    return result.rowcount
+
+
+async def check_consistency(session: AsyncSession, google_id: Optional[str] = None) -> List[Dict]:
+    """Compare rollup rows with the raw data and return every (google_id, day) that differs.
+
+    Every column the write path maintains is compared, including `max_session_at`.
+    """
+    columns = ("total_duration", "session_count", "max_session", "max_session_at")
+
+    raw_rows = (
+        await session.exec(_raw_daily_query(None if google_id is None else [google_id]))
+    ).fetchall()
+    raw: Dict[Tuple[str, str], Tuple] = {
+        (row.google_id, str(row.day)): tuple(getattr(row, column) for column in columns)
+        for row in raw_rows
+    }
+
+    statement = select(NemoAnalyticsDaily)
+    if google_id is not None:
+        statement = statement.where(NemoAnalyticsDaily.google_id == google_id)
+    rollup: Dict[Tuple[str, str], Tuple] = {
+        (row.google_id, str(row.day)): tuple(getattr(row, column) for column in columns)
+        for row in (await session.exec(statement)).all()
+    }
+
+    mismatches = []
+    for key in sorted(raw.keys() | rollup.keys()):
+        if raw.get(key) != rollup.get(key):
+            mismatches.append(
+                {
+                    "google_id": key[0],
+                    "day": key[1],
+                    "raw": dict(zip(columns, raw[key])) if key in raw else None,
+                    "rollup": dict(zip(columns, rollup[key])) if key in rollup else None,
+                }
+            )
+    return mismatches
@@ -0,0 +1,367 @@
+"""Bulk import of analytics and tasks from NDJSON or CSV files.
+
+The input is the format written by `app.api.crud.export`, one record per line (or CSV
+row) with its `type`. Records are parsed one at a time and validated against
+`NemoAnalytics` / `NemoTasks`. Every `IMPORT_BATCH_SIZE` valid rows are inserted with
+one `executemany` per table, in a transaction that also saves the position in
+the file on the `NemoImportJob`. When an import fails, running it again with the same
+job and file skips everything that was already committed. Account and settings records
+are skipped, the rows always belong to the importing user.
+
+Whoever runs a job first claims it with `claim_import_job`, so two resumes of the same job
+can't insert the same batch twice. Uploads over `IMPORT_INLINE_MAX_BYTES` are staged in the
+object store by `stage_import` and run by the worker (see `app.api.crud.account_deletion`)
+through `run_import_job`, instead of within the request.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import AsyncIterable, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import and_, or_, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.api.config.database_sqlite import async_engine, async_session
+from app.api.config.replica import create_object_store_from_settings, refresh_replica
+from app.api.config.settings import get_setting
+from app.api.crud.analytics_rollup import rollup_row, rollup_upsert_many_statement
+from app.api.models.nemo import NemoAnalytics, NemoImportJob, NemoTasks
+
+LOGGER = logging.getLogger(__name__)
+
+NDJSON = "ndjson"
+CSV = "csv"
+IMPORT_FORMATS = (NDJSON, CSV)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# uploads bigger than this are buffered on disk instead of in memory
+SPOOL_MAX_SIZE = 1024 * 1024  # bytes
+
+IMPORT_MODELS = {"analytics": NemoAnalytics, "task": NemoTasks}
+SKIPPED_TYPES = ("account", "settings")
+
+# a parsed record, or the reason it couldn't be parsed
+_Record = Tuple[Optional[Dict], Optional[str]]
+
+
+def iter_records(lines: Iterable[str], import_format: str) -> Iterator[_Record]:
+    """Parse the records one at a time, `lines` can be an open text file."""
+    if import_format == CSV:
+        for row in csv.DictReader(lines):
+            yield row, None
+        return
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield None, "Expected a JSON object"
+            continue
+        yield record, None
+
+
+def validate_record(google_id: str, record: Dict) -> Tuple[Optional[type], Optional[Dict]]:
+    """Model and column values for an analytics or task record, `(None, None)` for skipped types.
+
+    Raises ValueError for unknown types and ValidationError for invalid values.
+    """
+    record_type = record.get("type")
+    if record_type in SKIPPED_TYPES:
+        return None, None
+    model = IMPORT_MODELS.get(record_type)
+    if model is None:
+        raise ValueError(f"Unknown record type {record_type!r}")
+
+    # ids are assigned on insert, and CSV rows carry empty cells for other types' columns
+    values = {
+        name: record[name]
+        for name in model.model_fields
+        if name in record and name not in ("id", "google_id")
+    }
+    row = model.model_validate({**values, "google_id": google_id})
+    return model, row.model_dump(exclude={"id"})
+
+
+def _validation_message(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in error.errors())
+    return str(error)
+
+
+async def get_or_create_import_job(
+    google_id: str, import_format: str, job_id: Optional[str] = None
+) -> NemoImportJob:
+    """The user's job `job_id` to resume, or a new pending one. Raises LookupError for unknown jobs.
+
+    Claim the job before running it.
+    """
+    async with async_session() as session:
+        if job_id is not None:
+            job = await session.get(NemoImportJob, job_id)
+            if job is None or job.google_id != google_id:
+                raise LookupError(f"No import job {job_id}")
+            if job.format != import_format:
+                raise ValueError(f"Import job {job_id} is a {job.format} import")
+            return job
+
+        now = datetime.now()
+        job = NemoImportJob(
+            id=uuid.uuid4().hex,
+            google_id=google_id,
+            format=import_format,
+            status=PENDING,
+            created_at=now,
+            updated_at=now,
+        )
+        session.add(job)
+        await session.commit()
+        return job
+
+
+async def claim_import_job(
+    job_id: str, google_id: Optional[str] = None
+) -> Optional[NemoImportJob]:
+    """Mark the job running and return it, None when it's done or someone else is running it.
+
+    Pending and failed jobs can be claimed, and running ones that haven't committed a batch
+    for `IMPORT_JOB_STALE_AFTER` seconds, their run was cut short.
+    """
+    now = datetime.now()
+    idle_since = now - timedelta(seconds=get_setting().IMPORT_JOB_STALE_AFTER)
+    statement = update(NemoImportJob).where(NemoImportJob.id == job_id)
+    if google_id is not None:
+        statement = statement.where(NemoImportJob.google_id == google_id)
+    statement = (
+        statement.where(
+            or_(
+                NemoImportJob.status.in_((PENDING, FAILED)),
+                and_(NemoImportJob.status == RUNNING, NemoImportJob.updated_at < idle_since),
+            )
+        )
+        .values(status=RUNNING, error=None, updated_at=now)
+        .returning(NemoImportJob)
+        .execution_options(populate_existing=True)
+    )
+    async with async_session() as session:
+        job = (await session.exec(statement)).scalar_one_or_none()
+        await session.commit()
+    return job
+
+
+async def get_import_job(job_id: str, google_id: str) -> Optional[NemoImportJob]:
+    """The user's import job, None for another user's."""
+    async with async_session() as session:
+        job = await session.get(NemoImportJob, job_id)
+    return job if job is not None and job.google_id == google_id else None
+
+
+async def _write_batch(
+    conn: AsyncConnection,
+    job: NemoImportJob,
+    analytics: List[Dict],
+    tasks: List[Dict],
+    records_done: int,
+    invalid_rows: int,
+) -> None:
+    """Insert one batch and move the checkpoint forward, all in one transaction."""
+    async with conn.begin():
+        # executemany keeps one cached statement per table, a VALUES list would be compiled
+        # every batch
+        if analytics:
+            await conn.execute(insert(NemoAnalytics.__table__), analytics)
+            await conn.execute(
+                rollup_upsert_many_statement(),
+                [
+                    rollup_row(row["google_id"], row["created_at"], row["duration"])
+                    for row in analytics
+                ],
+            )
+        if tasks:
+            await conn.execute(insert(NemoTasks.__table__), tasks)
+        await conn.execute(
+            update(NemoImportJob)
+            .where(NemoImportJob.id == job.id)
+            .values(
+                status=RUNNING,
+                records_done=records_done,
+                analytics_inserted=job.analytics_inserted + len(analytics),
+                tasks_inserted=job.tasks_inserted + len(tasks),
+                invalid_rows=job.invalid_rows + invalid_rows,
+                updated_at=datetime.now(),
+            )
+        )
+    job.records_done = records_done
+    job.analytics_inserted += len(analytics)
+    job.tasks_inserted += len(tasks)
+    job.invalid_rows += invalid_rows
+
+
+async def _set_status(job_id: str, status: str, error: Optional[str] = None) -> NemoImportJob:
+    async with async_session() as session:
+        job = await session.get(NemoImportJob, job_id)
+        job.status = status
+        job.error = error
+        job.updated_at = datetime.now()
+        session.add(job)
+        await session.commit()
+        return job
+
+
+async def run_import(
+    job: NemoImportJob, lines: Iterable[str], batch_size: Optional[int] = None
+) -> Dict:
+    """Import the file into the job's user, resuming after its checkpoint, and report on it.
+
+    The job must have been claimed with `claim_import_job`.
+    """
+    settings = get_setting()
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    if job.status == DONE:
+        return import_report(job, records=0, seconds=0.0, errors=[])
+
+    resume_at = job.records_done
+    position = 0
+    analytics: List[Dict] = []
+    tasks: List[Dict] = []
+    invalid_rows = 0
+    errors: List[Dict] = []
+    started = time.perf_counter()
+
+    try:
+        # one connection for the whole import, with a transaction per batch
+        async with async_engine.connect() as conn:
+            for record, error in iter_records(lines, job.format):
+                position += 1
+                if position <= resume_at:
+                    continue
+                if error is None:
+                    try:
+                        model, row = validate_record(job.google_id, record)
+                    except (ValidationError, ValueError) as e:
+                        error = _validation_message(e)
+                    else:
+                        if model is NemoAnalytics:
+                            analytics.append(row)
+                        elif model is NemoTasks:
+                            tasks.append(row)
+                if error is not None:
+                    invalid_rows += 1
+                    if len(errors) < settings.IMPORT_MAX_REPORTED_ERRORS:
+                        errors.append({"record": position, "error": error})
+
+                if len(analytics) + len(tasks) >= batch_size:
+                    await _write_batch(conn, job, analytics, tasks, position, invalid_rows)
+                    analytics, tasks, invalid_rows = [], [], 0
+
+            await _write_batch(conn, job, analytics, tasks, max(position, resume_at), invalid_rows)
+        job = await _set_status(job.id, DONE)
+    except Exception as e:
+        LOGGER.exception("Import job %s failed at record %d", job.id, position)
+        job = await _set_status(job.id, FAILED, str(e))
+
+    try:
+        await refresh_replica(job.google_id)
+    except Exception:
+        LOGGER.exception("Refreshing the replica after import job %s failed", job.id)
+
+    return import_report(
+        job,
+        records=max(position - resume_at, 0),
+        seconds=time.perf_counter() - started,
+        errors=errors,
+    )
+
+
+def import_report(job: NemoImportJob, records: int, seconds: float, errors: List[Dict]) -> Dict:
+    """Job totals plus the throughput of this run, `records` being the records it read."""
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "error": job.error,
+        "records_done": job.records_done,
+        "analytics_inserted": job.analytics_inserted,
+        "tasks_inserted": job.tasks_inserted,
+        "invalid_rows": job.invalid_rows,
+        "errors": errors,
+        "records": records,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(records / seconds) if seconds > 0 else None,
+    }
+
+
+async def spool_upload(chunks: AsyncIterable[bytes]) -> IO[str]:
+    """Buffer a streamed upload, on disk past `SPOOL_MAX_SIZE`, and return it as text."""
+    file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    async for chunk in chunks:
+        file.write(chunk)
+    file.seek(0)
+    return io.TextIOWrapper(file, encoding="utf-8", newline="")
+
+
+def upload_size(upload: IO[str]) -> int:
+    """Size in bytes of a file returned by `spool_upload`."""
+    size = upload.buffer.seek(0, io.SEEK_END)
+    upload.buffer.seek(0)
+    return size
+
+
+def staged_key(job_id: str) -> str:
+    return f"imports/{job_id}"
+
+
+async def stage_import(job: NemoImportJob, upload: IO[str]) -> NemoImportJob:
+    """Save the upload in the object store for `run_import_job`, and release the job as pending.
+
+    Send the job to the worker after this.
+    """
+    with tempfile.NamedTemporaryFile() as file:
+        shutil.copyfileobj(upload.buffer, file)
+        file.flush()
+        store = create_object_store_from_settings()
+        await asyncio.to_thread(store.upload, file.name, staged_key(job.id))
+    return await _set_status(job.id, PENDING)
+
+
+async def run_import_job(job_id: str) -> Optional[Dict]:
+    """Run a job staged by `stage_import` and report on it, None when it couldn't be claimed."""
+    job = await claim_import_job(job_id)
+    if job is None:
+        return None
+
+    store = create_object_store_from_settings()
+    key = staged_key(job_id)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "upload")
+        try:
+            await asyncio.to_thread(store.download, key, path)
+        except Exception as e:
+            LOGGER.exception("Could not load the upload of import job %s", job_id)
+            job = await _set_status(job_id, FAILED, f"Could not load the upload: {e}")
+            return import_report(job, records=0, seconds=0.0, errors=[])
+        with open(path, encoding="utf-8", newline="") as lines:
+            report = await run_import(job, lines)
+
+    # a failed job is resumed by sending the file again
+    await asyncio.to_thread(store.delete, key)
+    return report
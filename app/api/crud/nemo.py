@@ -1,117 +1,253 @@
 from datetime import datetime
-from typing import List, Dict, Optional
-
-from sqlalchemy import Integer, case, cast, func
-from sqlalchemy.event import listens_for
-from sqlmodel import Session, delete, select
-
-from app.api.config.database_sqlite import engine
+from typing import List, Dict, Optional, Tuple
+
+from sqlalchemy import Integer, Row, case, cast, func, tuple_
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import delete, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api.config.replica import read_session, record_task_changes, write_session
+from app.api.crud.analytics_rollup import (
+    rollup_row,
+    rollup_upsert_many_statement,
+    rollup_upsert_statement,
+)
+from app.api.crud.write_queue import get_write_queue
 from app.api.models.nemo import (
     NemoAnalytics,
+    NemoAnalyticsDaily,
     NemoSettings,
     NemoTasks,
     NemoUserInformation,
+    NemoUserVersion,
 )
-from app.api.utils.nemo import get_date_x_days_ago
+from app.api.utils.read_cache import ACCOUNT, IMAGE_URL, SETTINGS, cached_read, mark_stale
+from app.api.utils.time_window import TimeWindow
+
+DASHBOARD_FIELDS = (
+    "settings",
+    "account",
+    "user_image",
+    "analytics",
+    "best_day",
+    "current_goal",
+    "tasks",
+)
+MONTH_ABBREVIATIONS = "JanFebMarAprMayJunJulAugSepOctNovDec"
+
+
+def _short_date(column):
+    """`column` formatted like `strftime("%b %d %Y")`, SQLite's strftime has no month names."""
+    month = cast(func.strftime("%m", column), Integer)
+    return func.substr(MONTH_ABBREVIATIONS, month * 3 - 2, 3).op("||")(
+        func.strftime(" %d %Y", column)
+    )
+
+
+def _weekly_analytics(days: List[NemoAnalyticsDaily]) -> List[Dict]:
+    """Same rows as `NemoDeta.get_analytics`, built from already fetched rollup rows."""
+    rows = [
+        {
+            "weekday": f"{day.day:%B} {day.day:%d}",
+            "total_count": day.total_duration,
+            "month_number": day.day.month,
+        }
+        for day in days
+    ]
+    return sorted(rows, key=lambda row: row["weekday"])
+
+
+def _best_day(days: List[NemoAnalyticsDaily]) -> Optional[Dict]:
+    """Same result as `NemoDeta.analytics_get_best_day`, built from already fetched rollup rows."""
+    if not days:
+        return
+    best_day = max(days, key=lambda day: day.total_duration)
+    best_session = max(days, key=lambda day: (day.max_session, day.max_session_at))
+    return {
+        "best_day_full_date": best_day.day.strftime("%a, %b %d %Y"),
+        "best_day_duration": best_day.total_duration,
+        "best_session_full_date": best_session.max_session_at,
+        "best_session_duration": best_session.max_session,
+    }
+
+
+def _current_goal(days: List[NemoAnalyticsDaily], today) -> Optional[Dict[str, int]]:
+    """Same result as `NemoDeta.analytics_get_current_goal`, from already fetched rollup rows."""
+    total = next((day.total_duration for day in days if day.day == today), None)
+    if not total:
+        return
+    return {"current_goal": int(total)}
+
 
 class NemoDeta:
-    """Utility class to manage nemo in Deta Base."""
-
-    # This event listener will automatically create a NemoSettings entry when a new user is inserted in NemoUserInformation table.
-    @listens_for(NemoUserInformation, "after_insert")
-    def create_settings_and_user(mapper, connection, target: NemoUserInformation):
-        # Automatically create the related settings entry
-        connection.execute(
-            NemoSettings.__table__.insert().values({"google_id": target.google_id})
-        )
+    """Utility class to manage nemo in Deta Base.
+
+    Every method takes an optional `session`. Routes pass the request-scoped session from
+    `get_session`, which commits once at the end of the request; without one the method
+    opens, commits and closes its own session as before. With the write queue enabled,
+    analytics and task inserts are group committed on their own instead, see `write_queue`.
+    """
 
     @staticmethod
-    def create_new_user(user_dict) -> NemoUserInformation:
+    async def create_new_user(
+        user_dict, session: Optional[AsyncSession] = None
+    ) -> NemoUserInformation:
         """Create a new user in the NemoUserInformation table."""
         user = NemoUserInformation(**user_dict)
-        with Session(engine) as session:
-            # this will automatically trigger an event when a new user is inserted in the table.
-            # check `@listens_for(NemoUserInformation, "after_insert")`
+        async with write_session(user.google_id, session) as session:
+            # the related NemoSettings row is created by the
+            # `trg_nemo_user_information_settings` trigger.
             session.add(user)
-            session.commit()
-            session.refresh(user)
+            await session.flush()
         return user
 
     @staticmethod
-    def get_user_by_id(google_id: str) -> NemoUserInformation:
-        with Session(engine) as session:
+    async def upsert_user(user_dict, session: Optional[AsyncSession] = None) -> NemoUserInformation:
+        """Create the user if it doesn't exist and return the stored row in a single statement.
+
+        A returning user hits the conflict branch, which is a no-op update so the row can be
+        returned without overwriting anything edited through `/account`. New users get their
+        settings row from the `trg_nemo_user_information_settings` trigger.
+        """
+        statement = insert(NemoUserInformation).values(**user_dict)
+        statement = statement.on_conflict_do_update(
+            index_elements=[NemoUserInformation.google_id],
+            set_={"google_id": statement.excluded.google_id},
+        ).returning(NemoUserInformation)
+
+        async with write_session(user_dict["google_id"], session) as session:
+            user = (await session.exec(statement)).scalar_one()
+        return user
+
+    @staticmethod
+    async def get_user_by_id(
+        google_id: str, session: Optional[AsyncSession] = None
+    ) -> NemoUserInformation:
+        async with read_session(google_id, session) as session:
             statement = select(NemoUserInformation).where(NemoUserInformation.google_id == google_id)
-            user = session.exec(statement).first()
+            user = (await session.exec(statement)).first()
         return user
     
     @classmethod
-    def check_user_exists(cls, google_id) -> NemoUserInformation:
+    async def check_user_exists(
+        cls, google_id, session: Optional[AsyncSession] = None
+    ) -> NemoUserInformation:
         """Check if user already exists in the NemoUserInformation table"""
-        user: NemoUserInformation = cls.get_user_by_id(google_id)
+        user: NemoUserInformation = await cls.get_user_by_id(google_id, session)
         return user
     
     @staticmethod
-    def get_user_settings(google_id: str) -> NemoSettings:
-        with Session(engine) as session:
-            statement = select(NemoSettings).where(NemoSettings.google_id == google_id)
-            user_settings = session.exec(statement).first()
-        return user_settings
-
-    @classmethod
-    def get_user_profile(cls, google_id: str) -> NemoUserInformation:
-        user: NemoUserInformation = cls.get_user_by_id(google_id)
-        return user
+    async def get_versions(
+        google_id: str, session: Optional[AsyncSession] = None
+    ) -> Dict[str, int]:
+        """Change counters of the user's rows, all zero for a user that never changed anything."""
+        async with read_session(google_id, session) as session:
+            statement = select(NemoUserVersion).where(NemoUserVersion.google_id == google_id)
+            versions = (await session.exec(statement)).first()
+        if versions is None:
+            return {name: 0 for name in NemoUserVersion.model_fields if name != "google_id"}
+        return versions.model_dump(exclude={"google_id"})
 
     @staticmethod
-    def update_settings(google_id: str, updated_setting: dict) -> None:
-        if not updated_setting:
-            return
+    async def get_user_settings(
+        google_id: str, session: Optional[AsyncSession] = None
+    ) -> NemoSettings:
+        async def load():
+            async with read_session(google_id, session) as read:
+                statement = select(NemoSettings).where(NemoSettings.google_id == google_id)
+                return (await read.exec(statement)).first()
 
-        with Session(engine) as session:
-            statement = select(NemoSettings).where(NemoSettings.google_id == google_id)
-            settings = session.exec(statement).one()
+        return await cached_read(google_id, SETTINGS, load, session, NemoSettings)
 
-            for key, value in updated_setting.items():
-                setattr(settings, key, value)
+    @classmethod
+    async def get_user_profile(
+        cls, google_id: str, session: Optional[AsyncSession] = None
+    ) -> NemoUserInformation:
+        async def load():
+            return await cls.get_user_by_id(google_id, session)
 
-            session.add(settings)
-            session.commit()
+        return await cached_read(google_id, ACCOUNT, load, session, NemoUserInformation)
 
     @staticmethod
-    def update_user_account(google_id: str, updated_profile: dict) -> None:
-        if not updated_profile:
-            return
+    async def update_settings(
+        google_id: str, updated_setting: dict, session: Optional[AsyncSession] = None
+    ) -> NemoSettings:
+        """Update only the given columns and return the stored row.
 
-        with Session(engine) as session:
-            statement = select(NemoUserInformation).where(NemoUserInformation.google_id == google_id)
-            user = session.exec(statement).one()
+        Raises NoResultFound if there's none.
+        """
+        if not updated_setting:
+            async with read_session(google_id, session) as read:
+                statement = select(NemoSettings).where(NemoSettings.google_id == google_id)
+                return (await read.exec(statement)).one()
+
+        async with write_session(google_id, session) as session:
+            statement = (
+                update(NemoSettings)
+                .where(NemoSettings.google_id == google_id)
+                .values(**updated_setting)
+                .returning(NemoSettings)
+                .execution_options(populate_existing=True)
+            )
+            settings = (await session.exec(statement)).scalar_one()
+            mark_stale(session, google_id, SETTINGS)
+        return settings
 
-            for key, value in updated_profile.items():
-                setattr(user, key, value)
+    @staticmethod
+    async def update_user_account(
+        google_id: str, updated_profile: dict, session: Optional[AsyncSession] = None
+    ) -> NemoUserInformation:
+        """Update only the given columns and return the stored row.
 
-            session.add(user)
-            session.commit()
+        Raises NoResultFound if there's none.
+        """
+        if not updated_profile:
+            async with read_session(google_id, session) as read:
+                statement = select(NemoUserInformation).where(
+                    NemoUserInformation.google_id == google_id
+                )
+                return (await read.exec(statement)).one()
+
+        async with write_session(google_id, session) as session:
+            statement = (
+                update(NemoUserInformation)
+                .where(NemoUserInformation.google_id == google_id)
+                .values(**updated_profile)
+                .returning(NemoUserInformation)
+                .execution_options(populate_existing=True)
+            )
+            user = (await session.exec(statement)).scalar_one()
+            mark_stale(session, google_id, ACCOUNT, IMAGE_URL)
+        return user
 
     @staticmethod
-    def get_user_image_url(google_id: str) -> str:
-        with Session(engine) as session:
-            statement = select(NemoUserInformation.profile_pic).where(NemoUserInformation.google_id == google_id)
-            profile_pic = session.exec(statement).first()
-        return profile_pic
+    async def get_user_image_url(google_id: str, session: Optional[AsyncSession] = None) -> str:
+        async def load():
+            async with read_session(google_id, session) as read:
+                statement = select(NemoUserInformation.profile_pic).where(
+                    NemoUserInformation.google_id == google_id
+                )
+                return (await read.exec(statement)).first()
+
+        return await cached_read(google_id, IMAGE_URL, load, session)
 
 
     @staticmethod
-    def get_analytics(google_id: str) -> List[NemoAnalytics]:
-        seven_days_ago = get_date_x_days_ago(7)
-        with Session(engine) as session:
+    async def get_analytics(
+        google_id: str, session: Optional[AsyncSession] = None
+    ) -> List[NemoAnalytics]:
+        last_week = TimeWindow.last_days(7)
+        async with read_session(google_id, session) as session:
             subquery = (
                 select(
-                    NemoAnalytics.duration,
-                    cast(func.strftime("%m", NemoAnalytics.created_at), Integer).label("month_number"),
-                    func.strftime("%d", NemoAnalytics.created_at).label("day_of_date"),
+                    NemoAnalyticsDaily.total_duration.label("duration"),
+                    cast(func.strftime("%m", NemoAnalyticsDaily.day), Integer).label(
+                        "month_number"
+                    ),
+                    func.strftime("%d", NemoAnalyticsDaily.day).label("day_of_date"),
                 )
-                .where(NemoAnalytics.google_id == google_id)
-                .where(NemoAnalytics.created_at >= seven_days_ago)
+                .where(NemoAnalyticsDaily.google_id == google_id)
+                .where(last_week.day_clause(NemoAnalyticsDaily.day))
                 .subquery()
             )
 
@@ -150,45 +286,49 @@ class NemoDeta:
                 .order_by(subquery2.c.weekday)
             )
 
-            rows: List[NemoAnalytics] = session.exec(subquery3).fetchall()
+            rows: List[NemoAnalytics] = (await session.exec(subquery3)).fetchall()
 
         result = list(map(lambda x: x._asdict(), rows))
         return result
 
     @staticmethod
-    def analytics_get_best_day(google_id: str) -> Optional[Dict[str, str]]:
-        seven_days_ago = get_date_x_days_ago(7)
-        with Session(engine) as session:
+    async def analytics_get_best_day(
+        google_id: str, session: Optional[AsyncSession] = None
+    ) -> Optional[Dict[str, str]]:
+        last_week = TimeWindow.last_days(7)
+        async with read_session(google_id, session) as session:
             query_best_day = (
                 select(
-                    func.sum(NemoAnalytics.duration).label("duration"),
-                    func.date(NemoAnalytics.created_at).label("grouped_date"),
+                    NemoAnalyticsDaily.total_duration.label("duration"),
+                    NemoAnalyticsDaily.day.label("grouped_date"),
                 )
-                .where(NemoAnalytics.google_id == google_id)
-                .where(NemoAnalytics.created_at >= seven_days_ago)
-                .group_by(func.date(NemoAnalytics.created_at))
-                .order_by(func.sum(NemoAnalytics.duration).desc())
+                .where(NemoAnalyticsDaily.google_id == google_id)
+                .where(last_week.day_clause(NemoAnalyticsDaily.day))
+                .order_by(NemoAnalyticsDaily.total_duration.desc())
                 .limit(1)
             )
 
             query_best_session = (
                 select(
-                    NemoAnalytics.created_at, NemoAnalytics.duration
+                    NemoAnalyticsDaily.max_session_at.label("created_at"),
+                    NemoAnalyticsDaily.max_session.label("duration"),
+                )
+                .where(NemoAnalyticsDaily.google_id == google_id)
+                .where(last_week.day_clause(NemoAnalyticsDaily.day))
+                .order_by(
+                    NemoAnalyticsDaily.max_session.desc(), NemoAnalyticsDaily.max_session_at.desc()
                 )
-                .where(NemoAnalytics.google_id == google_id)
-                .where(NemoAnalytics.created_at >= seven_days_ago)
-                .order_by(NemoAnalytics.duration.desc(), NemoAnalytics.created_at.desc())
                 .limit(1)
             )
 
-            row_best_day = session.exec(query_best_day).first()
-            row_best_session = session.exec(query_best_session).first()
+            row_best_day = (await session.exec(query_best_day)).first()
+            row_best_session = (await session.exec(query_best_session)).first()
 
         if row_best_day is None or row_best_session is None:
             return
             
         result = {
-            "best_day_full_date": datetime.strptime(row_best_day.grouped_date, "%Y-%m-%d").strftime("%a, %b %d %Y"),
+            "best_day_full_date": row_best_day.grouped_date.strftime("%a, %b %d %Y"),
             "best_day_duration": row_best_day.duration,
             "best_session_full_date": row_best_session.created_at,
             "best_session_duration": row_best_session.duration,
@@ -196,91 +336,299 @@ class NemoDeta:
         return result
 
     @staticmethod
-    def analytics_get_current_goal(google_id: str) -> Optional[Dict[str, int]]:
-        with Session(engine) as session:
+    async def analytics_get_current_goal(
+        google_id: str, session: Optional[AsyncSession] = None
+    ) -> Optional[Dict[str, int]]:
+        async with read_session(google_id, session) as session:
             query = (
-                select(func.sum(NemoAnalytics.duration))
-                .where(NemoAnalytics.google_id == google_id)
-                .where(func.date(NemoAnalytics.created_at) == func.date("now"))
+                select(NemoAnalyticsDaily.total_duration)
+                .where(NemoAnalyticsDaily.google_id == google_id)
+                .where(TimeWindow.today().day_clause(NemoAnalyticsDaily.day))
             )
-            row = session.exec(query).first()
+            row = (await session.exec(query)).first()
         if not row:
             return
         return {"current_goal": int(row)}
 
     @staticmethod
-    def insert_analytic(analytics: dict) -> None:
+    async def insert_analytic(analytics: dict, session: Optional[AsyncSession] = None) -> None:
         if not analytics:
             return
         new_analytics = NemoAnalytics(**analytics)
-        with Session(engine) as session:
+        write_queue = get_write_queue()
+        if write_queue is not None:
+            await write_queue.insert_analytic(new_analytics)
+            return
+        async with write_session(new_analytics.google_id, session) as session:
+            # the raw row and its daily rollup are committed together
             session.add(new_analytics)
-            session.commit()
+            await session.exec(
+                rollup_upsert_statement(
+                    new_analytics.google_id, new_analytics.created_at, new_analytics.duration
+                )
+            )
 
     @staticmethod
-    def get_task_summary(google_id: str) -> List[NemoTasks]:
-        ten_day_interval = get_date_x_days_ago(10)
-        with Session(engine) as session:
-            query = (
-                select(
-                    NemoTasks.id,
-                    NemoTasks.created_at,
-                    NemoTasks.duration,
-                    NemoTasks.task_description,
-                    func.sum(NemoTasks.duration)
-                        .over(partition_by=func.date(NemoTasks.created_at))
-                        .label("total_duration"),
+    async def insert_analytics_batch(
+        google_id: str, analytics: List[dict], session: Optional[AsyncSession] = None
+    ) -> None:
+        """Insert many analytics rows, and their rollup updates, one multi-row statement each."""
+        if not analytics:
+            return
+        rows = [{**row, "google_id": google_id} for row in analytics]
+        async with write_session(google_id, session) as session:
+            await session.exec(insert(NemoAnalytics).values(rows))
+            await session.exec(
+                rollup_upsert_many_statement(
+                    [rollup_row(google_id, row["created_at"], row["duration"]) for row in rows]
                 )
-                .where(NemoTasks.google_id == google_id)
-                .where(NemoTasks.created_at >= ten_day_interval)
-                .order_by(NemoTasks.created_at.desc())
             )
 
-            rows = session.exec(query).fetchall()
+    @staticmethod
+    def _task_summary_query(google_id: str):
+        last_ten_days = TimeWindow.last_days(10)
+        return (
+            select(
+                NemoTasks.id,
+                NemoTasks.created_at,
+                NemoTasks.duration,
+                NemoTasks.task_description,
+                func.sum(NemoTasks.duration)
+                    .over(partition_by=func.date(NemoTasks.created_at))
+                    .label("total_duration"),
+            )
+            .where(NemoTasks.google_id == google_id)
+            .where(last_ten_days.clause(NemoTasks.created_at))
+            .order_by(NemoTasks.created_at.desc())
+        )
+
+    @classmethod
+    async def get_task_summary(
+        cls, google_id: str, session: Optional[AsyncSession] = None
+    ) -> List[NemoTasks]:
+        async with read_session(google_id, session) as session:
+            rows = (await session.exec(cls._task_summary_query(google_id))).fetchall()
 
         lsts = list(map(lambda x: { **x._asdict(), "date": x.created_at.strftime("%b %d %Y")}, rows))
         return lsts
 
+    @classmethod
+    async def get_task_summary_rows(
+        cls, google_id: str, session: Optional[AsyncSession] = None
+    ) -> List[Row]:
+        """The rows of `get_task_summary` as the query returns them, the date formatted in SQL."""
+        statement = cls._task_summary_query(google_id).add_columns(
+            _short_date(NemoTasks.created_at).label("date")
+        )
+        async with read_session(google_id, session) as session:
+            return (await session.exec(statement)).fetchall()
+
+    @staticmethod
+    async def get_task_history(
+        google_id: str,
+        after: Optional[Tuple[datetime, int]] = None,
+        limit: int = 50,
+        session: Optional[AsyncSession] = None,
+    ) -> Tuple[List, List[Dict], bool]:
+        """One page of tasks, newest first, starting after the `(created_at, id)` key `after`.
+
+        Keyset pagination keeps every page a range search on the `(google_id, created_at)`
+        index however deep the client goes. Returns the page, the total of each day on the
+        page (including tasks of those days on other pages) and whether there's more.
+        """
+        query = select(
+            NemoTasks.id, NemoTasks.created_at, NemoTasks.duration, NemoTasks.task_description
+        ).where(NemoTasks.google_id == google_id)
+        if after is not None:
+            query = query.where(tuple_(NemoTasks.created_at, NemoTasks.id) < tuple_(*after))
+        query = query.order_by(NemoTasks.created_at.desc(), NemoTasks.id.desc()).limit(limit + 1)
+
+        async with read_session(google_id, session) as session:
+            rows = (await session.exec(query)).fetchall()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            if not rows:
+                return [], [], False
+
+            days_on_page = TimeWindow.days_between(rows[-1].created_at, rows[0].created_at)
+            totals_query = (
+                select(
+                    func.date(NemoTasks.created_at).label("day"),
+                    func.sum(NemoTasks.duration).label("total_duration"),
+                )
+                .where(NemoTasks.google_id == google_id)
+                .where(days_on_page.clause(NemoTasks.created_at))
+                .group_by(func.date(NemoTasks.created_at))
+                .order_by(func.date(NemoTasks.created_at).desc())
+            )
+            totals = (await session.exec(totals_query)).fetchall()
+
+        day_totals = [
+            {
+                "date": datetime.strptime(row.day, "%Y-%m-%d").strftime("%b %d %Y"),
+                "total_duration": row.total_duration,
+            }
+            for row in totals
+        ]
+        return rows, day_totals, has_more
+
+    @classmethod
+    async def get_dashboard(
+        cls, google_id: str, fields=DASHBOARD_FIELDS, session: Optional[AsyncSession] = None
+    ) -> Dict:
+        """Everything the home screen needs, read in one session with at most three statements.
+
+        The user and settings rows come from a single join, and the weekly analytics, best day
+        and current goal are all derived from one read of the user's daily rollup. Each field
+        has the same shape as the response of its own route.
+        """
+        fields = set(fields)
+        dashboard = {}
+        async with read_session(google_id, session) as session:
+            if fields & {"settings", "account", "user_image"}:
+                statement = (
+                    select(NemoUserInformation, NemoSettings)
+                    .outerjoin(
+                        NemoSettings, NemoSettings.google_id == NemoUserInformation.google_id
+                    )
+                    .where(NemoUserInformation.google_id == google_id)
+                )
+                user, settings = (await session.exec(statement)).first() or (None, None)
+                if "settings" in fields:
+                    dashboard["settings"] = settings
+                if "account" in fields:
+                    dashboard["account"] = user
+                if "user_image" in fields:
+                    dashboard["user_image"] = {"profile_pic": user.profile_pic if user else None}
+
+            if fields & {"analytics", "best_day", "current_goal"}:
+                today = TimeWindow.today()
+                last_week = TimeWindow.last_days(7, now=today.start)
+                statement = (
+                    select(NemoAnalyticsDaily)
+                    .where(NemoAnalyticsDaily.google_id == google_id)
+                    .where(last_week.day_clause(NemoAnalyticsDaily.day))
+                    .order_by(NemoAnalyticsDaily.day)
+                )
+                days = (await session.exec(statement)).all()
+                if "analytics" in fields:
+                    dashboard["analytics"] = _weekly_analytics(days)
+                if "best_day" in fields:
+                    dashboard["best_day"] = _best_day(days)
+                if "current_goal" in fields:
+                    dashboard["current_goal"] = _current_goal(days, today.start.date())
+
+            if "tasks" in fields:
+                rows = (await session.exec(cls._task_summary_query(google_id))).fetchall()
+                dashboard["tasks"] = [
+                    {**row._asdict(), "date": row.created_at.strftime("%b %d %Y")} for row in rows
+                ]
+        return dashboard
+
     @staticmethod
-    def insert_new_task(task: dict) -> None:
+    async def insert_new_task(task: dict, session: Optional[AsyncSession] = None) -> None:
         if not task: return
         new_task = NemoTasks(**task)
-        with Session(engine) as session:
+        write_queue = get_write_queue()
+        if write_queue is not None:
+            return await write_queue.insert_task(new_task)
+        async with write_session(new_task.google_id, session) as session:
             session.add(new_task)
-            session.commit()
-            session.refresh(new_task)
+            await session.flush()
         return new_task
 
     @staticmethod
-    def delete_task_by_key(google_id: str, key: str) -> None:
+    async def delete_task_by_key(
+        google_id: str, key: str, session: Optional[AsyncSession] = None
+    ) -> None:
         if not key:
             raise ValueError("No key found.")
 
-        with Session(engine) as session:
-            statement = select(NemoTasks).where(NemoTasks.google_id == google_id).where(NemoTasks.id == key)
-            task = session.exec(statement).one()
+        async with write_session(google_id, session) as session:
+            statement = (
+                delete(NemoTasks)
+                .where(NemoTasks.google_id == google_id)
+                .where(NemoTasks.id == key)
+                .returning(NemoTasks.id)
+            )
+            # raises NoResultFound when the user has no such task
+            deleted_id = (await session.exec(statement)).scalar_one()
+            record_task_changes(session, google_id, [deleted_id])
 
-            session.delete(task)
-            session.commit()
+    @staticmethod
+    async def insert_tasks(
+        google_id: str, tasks: List[dict], session: Optional[AsyncSession] = None
+    ) -> List[NemoTasks]:
+        """Insert many tasks with one multi-row statement and return the stored rows."""
+        if not tasks:
+            return []
+        rows = [{**task, "google_id": google_id} for task in tasks]
+        async with write_session(google_id, session) as session:
+            statement = insert(NemoTasks).values(rows).returning(NemoTasks)
+            new_tasks = (await session.exec(statement)).scalars().all()
+        return new_tasks
+
+    @staticmethod
+    async def update_tasks(
+        google_id: str, updates: List[dict], session: Optional[AsyncSession] = None
+    ) -> List[int]:
+        """Apply `{"id": ..., **changes}` edits to the user's tasks, returns the ids that exist."""
+        updated = []
+        async with write_session(google_id, session) as session:
+            for changes in updates:
+                changes = dict(changes)
+                task_id = changes.pop("id")
+                statement = (
+                    update(NemoTasks)
+                    .where(NemoTasks.google_id == google_id)
+                    .where(NemoTasks.id == task_id)
+                    .values(**changes)
+                    .returning(NemoTasks.id)
+                )
+                if (await session.exec(statement)).first() is not None:
+                    updated.append(task_id)
+            record_task_changes(session, google_id, updated)
+        return updated
+
+    @staticmethod
+    async def delete_tasks(
+        google_id: str, ids: List[int], session: Optional[AsyncSession] = None
+    ) -> List[int]:
+        """Delete the user's tasks with one `DELETE ... WHERE id IN (...)`, return their ids."""
+        if not ids:
+            return []
+        async with write_session(google_id, session) as session:
+            statement = (
+                delete(NemoTasks)
+                .where(NemoTasks.google_id == google_id)
+                .where(NemoTasks.id.in_(ids))
+                .returning(NemoTasks.id)
+            )
+            deleted = (await session.exec(statement)).scalars().all()
+            record_task_changes(session, google_id, deleted)
+        return deleted
 
     @classmethod
-    def remove_user(cls, google_id: str) -> None:
+    async def remove_user(cls, google_id: str, session: Optional[AsyncSession] = None) -> None:
         if not google_id:
             raise ValueError("Invalid or no google_id found.")
 
-        with Session(engine) as session:
+        async with write_session(google_id, session) as session:
             statement_user = delete(NemoUserInformation).where(NemoUserInformation.google_id == google_id)
             statement_settings = delete(NemoSettings).where(NemoSettings.google_id == google_id)
             statement_analytics = delete(NemoAnalytics).where(NemoAnalytics.google_id == google_id)
+            statement_analytics_daily = delete(NemoAnalyticsDaily).where(
+                NemoAnalyticsDaily.google_id == google_id
+            )
             statement_tasks = delete(NemoTasks).where(NemoTasks.google_id == google_id)
 
+            mark_stale(session, google_id)
             try:
-                session.exec(statement_analytics)
-                session.exec(statement_tasks)
-                session.exec(statement_settings)
-                session.exec(statement_user)
-                session.commit()
+                await session.exec(statement_analytics)
+                await session.exec(statement_analytics_daily)
+                await session.exec(statement_tasks)
+                await session.exec(statement_settings)
+                await session.exec(statement_user)
             except Exception as e:
-                session.rollback()
                 print(f"Error: {e}")
                 raise e
@@ -0,0 +1,171 @@
+"""Group commit for analytics and task inserts.
+
+Every commit against SQLite Cloud is a network round trip, and concurrent commits to a
+local SQLite file fight over the write lock. With `WRITE_QUEUE_ENABLED` the inserts are
+handed to a single writer instead. It waits up to `WRITE_QUEUE_MAX_DELAY_MS` for more
+rows (or until `WRITE_QUEUE_MAX_BATCH` are waiting) and inserts the whole batch with one
+`executemany` per table in a single transaction. Each caller awaits a future that
+resolves once its row has been committed.
+"""
+
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.api.config.database_sqlite import async_engine
+from app.api.config.replica import refresh_replica
+from app.api.config.settings import get_setting
+from app.api.crud.analytics_rollup import rollup_row, rollup_upsert_many_statement
+from app.api.models.nemo import NemoAnalytics, NemoTasks
+
+LOGGER = logging.getLogger(__name__)
+
+ANALYTICS = "analytics"
+TASKS = "tasks"
+
+_Item = Tuple[str, dict, asyncio.Future]
+
+
+class WriteQueue:
+    """Single writer that batches pending analytics and task inserts into one transaction."""
+
+    def __init__(
+        self, engine: AsyncEngine = async_engine, max_delay: float = 0.005, max_batch: int = 200
+    ):
+        self.engine = engine
+        self.max_delay = max_delay  # seconds
+        self.max_batch = max_batch
+        self.batches = 0
+        self.rows = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+
+    def _ensure_writer(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._writer is None or self._writer.done():
+            # one writer per event loop, the test client starts a new loop per request
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._writer = loop.create_task(self._run(self._queue))
+        return self._queue
+
+    async def insert_analytic(self, analytics: NemoAnalytics) -> None:
+        """Insert the row and its rollup update, returns once they are committed."""
+        await self._submit(ANALYTICS, analytics.model_dump(exclude={"id"}))
+
+    async def insert_task(self, task: NemoTasks) -> NemoTasks:
+        """Insert the row, returns it with its id once it's committed."""
+        task.id = await self._submit(TASKS, task.model_dump(exclude={"id"}))
+        return task
+
+    async def _submit(self, kind: str, row: dict):
+        future = asyncio.get_running_loop().create_future()
+        self._ensure_writer().put_nowait((kind, row, future))
+        return await future
+
+    async def close(self) -> None:
+        """Commit everything still waiting and stop the writer."""
+        if self._writer is None or self._writer.done():
+            return
+        self._queue.put_nowait(None)
+        await self._writer
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            batch: List[_Item] = [item]
+            deadline = loop.time() + self.max_delay
+            stop = False
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+            if stop:
+                return
+
+    async def _flush(self, batch: List[_Item]) -> None:
+        try:
+            results = await self._write(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                _, _, future = batch[0]
+                if not future.done():
+                    future.set_exception(e)
+                return
+            # one bad row (e.g. a deleted user) shouldn't fail everyone else's insert
+            LOGGER.warning("Group commit of %d rows failed, retrying them one by one", len(batch))
+            for item in batch:
+                await self._flush([item])
+            return
+
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+        self.batches += 1
+        self.rows += len(batch)
+        try:
+            for google_id in {row["google_id"] for _, row, _ in batch}:
+                await refresh_replica(google_id)
+        except Exception:
+            # the rows are committed, the replica catches up once it's stale
+            LOGGER.exception("Refreshing the replica after a group commit failed")
+
+    async def _write(self, batch: List[_Item]) -> list:
+        analytics = [row for kind, row, _ in batch if kind == ANALYTICS]
+        tasks = [row for kind, row, _ in batch if kind == TASKS]
+        task_ids = []
+        async with self.engine.begin() as conn:
+            if analytics:
+                await conn.execute(insert(NemoAnalytics.__table__), analytics)
+                await conn.execute(
+                    rollup_upsert_many_statement(),
+                    [
+                        rollup_row(row["google_id"], row["created_at"], row["duration"])
+                        for row in analytics
+                    ],
+                )
+            if tasks:
+                table = NemoTasks.__table__
+                result = await conn.execute(
+                    insert(table).returning(table.c.id, sort_by_parameter_order=True), tasks
+                )
+                task_ids = list(result.scalars())
+
+        task_ids = iter(task_ids)
+        return [next(task_ids) if kind == TASKS else None for kind, _, _ in batch]
+
+
+_write_queue: Optional[WriteQueue] = None
+
+
+def get_write_queue() -> Optional[WriteQueue]:
+    """The shared queue when `WRITE_QUEUE_ENABLED` is set, otherwise None."""
+    global _write_queue
+    settings = get_setting()
+    if _write_queue is None and settings.WRITE_QUEUE_ENABLED:
+        _write_queue = WriteQueue(
+            max_delay=settings.WRITE_QUEUE_MAX_DELAY_MS / 1000,
+            max_batch=settings.WRITE_QUEUE_MAX_BATCH,
+        )
+    return _write_queue
+
+
+def set_write_queue(queue: Optional[WriteQueue]) -> None:
+    global _write_queue
+    _write_queue = queue
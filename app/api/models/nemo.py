@@ -1,6 +1,7 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
+from sqlalchemy import DDL, event, text
 from sqlmodel import Field, Index, SQLModel
 
 class NemoUserInformation(SQLModel, table=True):
@@ -37,6 +38,32 @@ class NemoSettings(SQLModel, table=True):
     daily_goal: int = Field(default=4)
 
 
+def _sql_literal(value) -> str:
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(int(value))
+
+
+_settings_defaults = {
+    name: field.default for name, field in NemoSettings.model_fields.items() if name != "google_id"
+}
+
+# Create the settings row in the same statement that inserts a new user, so a login
+# upsert needs a single round trip. `IF NOT EXISTS` keeps it idempotent on every create_all.
+event.listen(
+    SQLModel.metadata,
+    "after_create",
+    DDL(
+        "CREATE TRIGGER IF NOT EXISTS trg_nemo_user_information_settings "
+        "AFTER INSERT ON nemo_user_information "
+        "BEGIN "
+        f"INSERT OR IGNORE INTO nemo_settings (google_id, {', '.join(_settings_defaults)}) "
+        f"VALUES (NEW.google_id, {', '.join(map(_sql_literal, _settings_defaults.values()))}); "
+        "END"
+    ),
+)
+
+
 class NemoAnalytics(SQLModel, table=True):
     __tablename__ = "nemo_analytics"
 
@@ -46,7 +73,19 @@ class NemoAnalytics(SQLModel, table=True):
     duration: int  # in seconds
     full_date: datetime
 
-    __table_args__ = (Index("ix_analytics_google_id", "google_id"),)
+    __table_args__ = (Index("ix_analytics_google_id_created_at", "google_id", "created_at"),)
+
+
+class NemoAnalyticsDaily(SQLModel, table=True):
+    """Per user and day rollup of `nemo_analytics`, maintained by `NemoDeta.insert_analytic`."""
+    __tablename__ = "nemo_analytics_daily"
+
+    google_id: str = Field(foreign_key="nemo_user_information.google_id", primary_key=True)
+    day: date = Field(primary_key=True)
+    total_duration: int = Field(default=0)  # in seconds
+    session_count: int = Field(default=0)
+    max_session: int = Field(default=0)  # in seconds
+    max_session_at: datetime  # created_at of the longest session, latest one on ties
 
 
 class NemoTasks(SQLModel, table=True):
@@ -59,4 +98,99 @@ class NemoTasks(SQLModel, table=True):
     duration: int  # in seconds
     task_date: datetime
 
-    __table_args__ = (Index("ix_tasks_google_id", "google_id"),)
+    __table_args__ = (Index("ix_tasks_google_id_created_at", "google_id", "created_at"),)
+
+
+class NemoDeletionJob(SQLModel, table=True):
+    """Progress of a background account deletion, see `app.api.crud.account_deletion`."""
+    __tablename__ = "nemo_deletion_jobs"
+
+    id: str = Field(primary_key=True)
+    google_id: str = Field(index=True)  # no foreign key, the job outlives the user
+    status: str = Field(default="pending")  # pending, running, done or failed
+    analytics_deleted: int = Field(default=0)
+    tasks_deleted: int = Field(default=0)
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    # retried by the sweep until DELETION_MAX_ATTEMPTS, added by migration 6
+    failed_attempts: int = Field(default=0, sa_column_kwargs={"server_default": text("0")})
+
+
+class NemoImportJob(SQLModel, table=True):
+    """Checkpoint of a bulk import, see `app.api.crud.bulk_import`."""
+    __tablename__ = "nemo_import_jobs"
+
+    id: str = Field(primary_key=True)
+    google_id: str = Field(
+        foreign_key="nemo_user_information.google_id", ondelete="CASCADE", index=True
+    )
+    format: str  # ndjson or csv
+    status: str = Field(default="running")  # pending, running, done or failed
+    records_done: int = Field(default=0)  # records of the file already committed, the resume point
+    analytics_inserted: int = Field(default=0)
+    tasks_inserted: int = Field(default=0)
+    invalid_rows: int = Field(default=0)
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+
+class NemoUserVersion(SQLModel, table=True):
+    """Change counters of a user's rows, the source of the ETags on the GET routes.
+
+    Bumped by the `trg_*_version_*` triggers, so every writer is covered without going
+    through `NemoDeta`. Users without a row haven't changed anything since the table was added.
+    """
+    __tablename__ = "nemo_user_versions"
+
+    google_id: str = Field(primary_key=True)  # no foreign key, deleting a user bumps it too
+    account: int = Field(default=0)
+    settings: int = Field(default=0)
+    analytics: int = Field(default=0)
+    tasks: int = Field(default=0)
+
+
+_VERSION_COUNTERS = [name for name in NemoUserVersion.model_fields if name != "google_id"]
+
+
+def _version_trigger(table, counter: str, operation: str) -> DDL:
+    row = "OLD" if operation == "DELETE" else "NEW"
+    when = ""
+    if operation == "UPDATE":
+        # e.g. the no-op update of a returning user's login upsert doesn't count
+        changed = " OR ".join(
+            f"OLD.{column.name} IS NOT NEW.{column.name}" for column in table.columns
+        )
+        when = f"WHEN {changed} "
+    increments = ["1" if name == counter else "0" for name in _VERSION_COUNTERS]
+    return DDL(
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table.name}_version_{operation.lower()} "
+        f"AFTER {operation} ON {table.name} {when}"
+        "BEGIN "
+        f"INSERT INTO nemo_user_versions (google_id, {', '.join(_VERSION_COUNTERS)}) "
+        f"VALUES ({row}.google_id, {', '.join(increments)}) "
+        f"ON CONFLICT (google_id) DO UPDATE SET {counter} = {counter} + 1; "
+        "END"
+    )
+
+
+for _table, _counter in (
+    (NemoUserInformation.__table__, "account"),
+    (NemoSettings.__table__, "settings"),
+    (NemoAnalytics.__table__, "analytics"),
+    (NemoTasks.__table__, "tasks"),
+):
+    for _operation in ("INSERT", "UPDATE", "DELETE"):
+        event.listen(
+            SQLModel.metadata, "after_create", _version_trigger(_table, _counter, _operation)
+        )
+
+
+class NemoSchemaVersion(SQLModel, table=True):
+    """Migrations applied to the database, see `app.api.config.migrations`."""
+    __tablename__ = "nemo_schema_versions"
+
+    version: int = Field(primary_key=True)
+    description: str
+    applied_at: datetime
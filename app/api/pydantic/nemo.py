@@ -1,5 +1,5 @@
 from datetime import date, datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -40,11 +40,28 @@ class Analytics(BaseModel):
     """Save analytics."""
     duration: int
 
+class AnalyticsSession(BaseModel):
+    """Session recorded by the client, possibly while offline."""
+    duration: int
+    created_at: datetime
+
 class CreateTask(BaseModel):
     """Save analytics."""
     task_description: str
     duration: int
 
+class UpdateTask(BaseModel):
+    """Edit an existing task."""
+    id: int
+    task_description: Optional[str] = None
+    duration: Optional[int] = None
+
+class TasksBatch(BaseModel):
+    """Create, edit and delete many tasks at once."""
+    create: List[CreateTask] = []
+    update: List[UpdateTask] = []
+    delete: List[int] = []
+
 class Account(BaseModel):
     """Update user account"""
     given_name: Optional[str] = None
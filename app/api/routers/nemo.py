@@ -1,23 +1,53 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Optional
 
-from fastapi import APIRouter, Header, status
+from fastapi import APIRouter, BackgroundTasks, Header, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import HTTPException
 from fastapi.param_functions import Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.exc import IntegrityError, NoResultFound
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.api.config.compression import compression
+from app.api.config.session import get_session
+from app.api.config.settings import get_setting
 # from app.api.emails.send_email import send_email
-from app.api.crud.nemo import NemoDeta
+from app.api.crud.account_deletion import (
+    dispatch_deletion_job,
+    dispatch_worker_task,
+    get_deletion_job,
+    has_unfinished_deletion,
+    revoked_users,
+    run_deletion_job,
+    start_deletion,
+)
+from app.api.crud.bulk_import import (
+    DONE as IMPORT_DONE,
+    IMPORT_FORMATS,
+    claim_import_job,
+    get_import_job,
+    get_or_create_import_job,
+    import_report,
+    run_import,
+    spool_upload,
+    stage_import,
+    upload_size,
+)
+from app.api.crud.export import EXPORT_FORMATS, NDJSON, export_user
+from app.api.crud.nemo import DASHBOARD_FIELDS, NemoDeta
 from app.api.models.nemo import NemoSettings, NemoUserInformation
 from app.api.pydantic.nemo import (
     Account,
     Analytics,
+    AnalyticsSession,
     CreateTask,
     DictPayload,
     GetAnalytics,
     GoogleAuth,
+    TasksBatch,
     User,
     UserAccount,
     UserSettings,
@@ -35,26 +65,86 @@ from app.api.utils.nemo import (
     get_user_payload,
     handle_integrity_error,
 )
+from app.api.utils.cursor import decode_cursor, encode_cursor
+from app.api.utils.etag import make_etag, matching_etag
+from app.api.utils.fast_json import (
+    ACCOUNT_SERIALIZER,
+    ANALYTICS_SERIALIZER,
+    SETTINGS_SERIALIZER,
+    TASK_SUMMARY_SERIALIZER,
+    fast_response,
+    rows_as_dicts,
+)
+from app.api.utils.read_cache import remember_versions
+from app.api.utils.token_cache import TokenCache
 
 LOGGER = logging.getLogger()
 nemo_route = APIRouter()
+token_cache = TokenCache(maxsize=get_setting().TOKEN_CACHE_MAX_SIZE)
+CLIENT_CLOCK_SKEW = timedelta(minutes=5)
 
-def current_user(x_auth_token: str = Header(None)) -> User:
-    """Get current user based on x_auth_token"""
+async def token_user(x_auth_token: str = Header(None)) -> User:
+    """User of the x_auth_token, whether or not their account is being deleted."""
     if not x_auth_token:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="x-auth-token header missing."
         )
-    user = User(**get_current_user(x_auth_token))
+    user = token_cache.get(x_auth_token)
     if not user:
+        user = User(**get_current_user(x_auth_token))
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No user found from the token. Invalid x-auth-token.",
+            )
+        token_cache.set(x_auth_token, user)
+    return user
+
+async def current_user(
+    user: User = Depends(token_user), session: AsyncSession = Depends(get_session)
+) -> User:
+    """Get current user based on x_auth_token"""
+    if await revoked_users.contains(user.google_id, session):
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No user found from the token. Invalid x-auth-token.",
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="This account is being deleted.",
         )
     return user
 
+def conditional_get(
+    *resources: str, daily: bool = False, applies: Optional[Callable[[Request], bool]] = None
+):
+    """Dependency that answers 304 when `If-None-Match` matches the user's current ETag.
+
+    The ETag is derived from the change counters of `resources` (see `NemoUserVersion`)
+    and today's date for `daily` responses, so a match skips the route's query entirely.
+    Requests for which `applies` returns False get no ETag, e.g. ones the route rejects.
+    """
+    async def check(
+        request: Request,
+        response: Response,
+        if_none_match: str = Header(None),
+        user: User = Depends(current_user),
+        session: AsyncSession = Depends(get_session),
+    ) -> None:
+        if applies is not None and not applies(request):
+            return
+        versions = await NemoDeta.get_versions(user.google_id, session=session)
+        # the body must not come from a cache entry older than the ETag
+        remember_versions(session, user.google_id, versions)
+        etag = make_etag(user.google_id, versions, resources, date.today() if daily else None)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        matched = matching_etag(if_none_match, etag)
+        if matched is not None:
+            # the client's copy may be a compressed representation, confirm that one
+            headers["ETag"] = matched
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+
+    return Depends(check)
+
 @nemo_route.post("/login")
-def create_user(auth: GoogleAuth):
+async def create_user(auth: GoogleAuth, session: AsyncSession = Depends(get_session)):
     """Create a new user or return existing user
 
     Args:
@@ -67,21 +157,24 @@ def create_user(auth: GoogleAuth):
         `string`: JWT Access token
     """
     # Get user payload from auth token
-    payload = get_user_payload(token=auth.google_token)
+    payload = await run_in_threadpool(get_user_payload, token=auth.google_token)
     if not check_google_user(payload):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Unable to validate google user",
         )
 
-    user: NemoUserInformation = NemoDeta.check_user_exists(google_id=payload["sub"])
-
-    # If user does not exists then create new user
-    if not user:
-        user_obj: DictPayload = create_dict_from_payload(payload)
-        user: NemoUserInformation = NemoDeta.create_new_user(user_obj)
-        # send welcome email to the new user
-        # send_email(receiver_fullname=user_obj["given_name"], receiver_email=user_obj["email"])
+    # Create the user on first login, otherwise return the existing user
+    user_obj: DictPayload = create_dict_from_payload(payload)
+    # checked against the database, the upsert would bring back a user being deleted
+    if await has_unfinished_deletion(user_obj["google_id"], session):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="This account is being deleted.",
+        )
+    user: NemoUserInformation = await NemoDeta.upsert_user(user_obj, session=session)
+    # send welcome email to the new user
+    # send_email(receiver_fullname=user_obj["given_name"], receiver_email=user_obj["email"])
 
     # create a access token
     access_token_expires = timedelta(days=JWT_ACCESS_TOKEN_EXPIRE_DAYS)
@@ -102,74 +195,133 @@ def create_user(auth: GoogleAuth):
     )
     return response
 
-@nemo_route.get("/settings", response_model=NemoSettings)
-def get_user_settings(user: User = Depends(current_user)):
+
+@nemo_route.get(
+    "/dashboard",
+    dependencies=[conditional_get("account", "settings", "analytics", "tasks", daily=True)],
+)
+async def get_dashboard(
+    response: Response,
+    fields: str = Query(None),
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Get all home screen data in one request.
+
+    `fields` is a comma separated subset of settings, account, user_image, analytics,
+    best_day, current_goal and tasks. Every field is returned when it's missing.
+    """
+    requested = DASHBOARD_FIELDS
+    if fields:
+        requested = tuple(field.strip() for field in fields.split(",") if field.strip())
+        unknown = set(requested) - set(DASHBOARD_FIELDS)
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown dashboard fields: {', '.join(sorted(unknown))}",
+            )
+    dashboard = await NemoDeta.get_dashboard(user.google_id, requested, session=session)
+    return fast_response(dashboard, response)
+
+@nemo_route.get(
+    "/settings", response_model=NemoSettings, dependencies=[conditional_get("settings")]
+)
+async def get_user_settings(
+    response: Response,
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_session),
+):
     """Get all user settings."""
-    settings: NemoSettings = NemoDeta.get_user_settings(user.google_id)
+    settings: NemoSettings = await NemoDeta.get_user_settings(user.google_id, session=session)
     if not settings:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No settings found for the user",
         )
-    return settings
+    return fast_response(settings, response, SETTINGS_SERIALIZER)
 
 @nemo_route.post("/settings")
-def update_user_timer_settings(
-    settings: UserSettings, user: User = Depends(current_user)
+async def update_user_timer_settings(
+    settings: UserSettings,
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_session),
 ):
-    """Update user settings."""
+    """Update user settings and return the stored settings."""
     updated_setting = settings.model_dump(exclude_unset=True)
     try:
-        NemoDeta.update_settings(
-            google_id=user.google_id, updated_setting=updated_setting
+        stored_settings = await NemoDeta.update_settings(
+            google_id=user.google_id, updated_setting=updated_setting, session=session
         )
     except NoResultFound:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No settings found for the user",
         )
-    return updated_setting
+    return stored_settings
 
-@nemo_route.get("/user-image")
-def get_user_image_url(user: User = Depends(current_user)):
+@nemo_route.get("/user-image", dependencies=[conditional_get("account")])
+async def get_user_image_url(
+    user: User = Depends(current_user), session: AsyncSession = Depends(get_session)
+):
     """Get user image recieved from google login."""
-    user_image_url = NemoDeta.get_user_image_url(google_id=user.google_id)
+    user_image_url = await NemoDeta.get_user_image_url(google_id=user.google_id, session=session)
     return {"profile_pic": user_image_url}
 
-@nemo_route.get("/account", response_model=NemoUserInformation)
-def get_user_account(user: User = Depends(current_user)):
+
+@nemo_route.get(
+    "/account", response_model=NemoUserInformation, dependencies=[conditional_get("account")]
+)
+async def get_user_account(
+    response: Response,
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_session),
+):
     """Get user account."""
-    account: NemoUserInformation = NemoDeta.get_user_profile(google_id=user.google_id)
+    account: NemoUserInformation = await NemoDeta.get_user_profile(
+        google_id=user.google_id, session=session
+    )
     if not account:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No user account found or is empty.",
         )
-    return account
+    return fast_response(account, response, ACCOUNT_SERIALIZER)
 
 @nemo_route.post("/account", response_model=UserAccount)
-def update_user_account(account: Account, user: User = Depends(current_user)):
-    """Update user account."""
+async def update_user_account(
+    account: Account,
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Update user account and return the stored account."""
     account_dict = account.model_dump(exclude_unset=True)
     try:
-        NemoDeta.update_user_account(
-            google_id=user.google_id, updated_profile=account_dict
+        stored_account = await NemoDeta.update_user_account(
+            google_id=user.google_id, updated_profile=account_dict, session=session
         )
     except NoResultFound:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No user account found for the user",
         )
-    return account_dict
+    return stored_account
 
-@nemo_route.get("/analytics")
-def get_user_analytics(user: User = Depends(current_user)):
+@nemo_route.get("/analytics", dependencies=[conditional_get("analytics", daily=True)])
+async def get_user_analytics(
+    response: Response,
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_session),
+):
     """Get all analytics."""
-    analytics = NemoDeta.get_analytics(google_id=user.google_id)
-    return analytics
+    analytics = await NemoDeta.get_analytics(google_id=user.google_id, session=session)
+    return fast_response(analytics, response, ANALYTICS_SERIALIZER)
 
 @nemo_route.post("/analytics", response_model=GetAnalytics)
-def create_user_analytics(analytics: Analytics, user: User = Depends(current_user)):
+async def create_user_analytics(
+    analytics: Analytics,
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_session),
+):
     """Create new analytics."""
     try:
         created_at = datetime.now()
@@ -179,34 +331,240 @@ def create_user_analytics(analytics: Analytics, user: User = Depends(current_use
             "duration": analytics.duration,
             "full_date": created_at,
         }
-        NemoDeta.insert_analytic(user_analytics)
+        await NemoDeta.insert_analytic(user_analytics, session=session)
     except IntegrityError as e:
         handle_integrity_error(e)
     return user_analytics
 
-@nemo_route.get("/statistics/{stats}")
-def get_stats(user: User = Depends(current_user), stats=str):
+@nemo_route.post("/analytics/batch")
+async def create_user_analytics_batch(
+    sessions: List[AnalyticsSession],
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Create many analytics at once, with the timestamps recorded by the client.
+
+    Every session is checked on its own. The valid ones are inserted together and the
+    response has one result per session, in the order they were sent.
+    """
+    max_size = get_setting().ANALYTICS_BATCH_MAX_SIZE
+    if len(sessions) > max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {max_size} analytics can be sent in one batch.",
+        )
+
+    latest_allowed = datetime.now() + CLIENT_CLOCK_SKEW
+    results, valid = [], []
+    for index, analytics in enumerate(sessions):
+        created_at = analytics.created_at
+        if created_at.tzinfo is not None:
+            # stored timestamps are naive server local time
+            created_at = created_at.astimezone().replace(tzinfo=None)
+
+        error = None
+        if analytics.duration <= 0:
+            error = "duration must be positive"
+        elif created_at > latest_allowed:
+            error = "created_at is in the future"
+
+        if error:
+            results.append({"index": index, "success": False, "error": error})
+            continue
+        valid.append(
+            {"created_at": created_at, "duration": analytics.duration, "full_date": created_at}
+        )
+        results.append(
+            {
+                "index": index,
+                "success": True,
+                "created_at": created_at,
+                "duration": analytics.duration,
+            }
+        )
+
+    try:
+        await NemoDeta.insert_analytics_batch(user.google_id, valid, session=session)
+    except IntegrityError as e:
+        handle_integrity_error(e)
+    return {"created": len(valid), "rejected": len(sessions) - len(valid), "results": results}
+
+STATS_CATEGORIES = ("best-day", "current-goal")
+
+@nemo_route.get(
+    "/statistics/{stats}",
+    dependencies=[
+        conditional_get(
+            "analytics",
+            daily=True,
+            applies=lambda request: request.path_params["stats"] in STATS_CATEGORIES,
+        )
+    ],
+)
+async def get_stats(
+    user: User = Depends(current_user), session: AsyncSession = Depends(get_session), stats=str
+):
     """Get statistics."""
     user_google_id = user.google_id
     if stats == "best-day":
-        results = NemoDeta.analytics_get_best_day(google_id=user_google_id)
-        return results
+        return await NemoDeta.analytics_get_best_day(google_id=user_google_id, session=session)
     if stats == "current-goal":
-        results = NemoDeta.analytics_get_current_goal(google_id=user_google_id)
-        return results
+        return await NemoDeta.analytics_get_current_goal(google_id=user_google_id, session=session)
     return JSONResponse(
         status_code=status.HTTP_204_NO_CONTENT,
         content={"message": "Invalid category or category not found"},
     )
 
-@nemo_route.get("/get-tasks")
-def get_tasks(user: User = Depends(current_user)):
+@nemo_route.get("/get-tasks", dependencies=[conditional_get("tasks", daily=True)])
+async def get_tasks(
+    response: Response,
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_session),
+):
     """Get all task."""
-    all_tasks = NemoDeta.get_task_summary(user.google_id)
+    if get_setting().FAST_RESPONSES_ENABLED:
+        # encoded straight from the result rows, the date is already formatted by the query
+        rows = await NemoDeta.get_task_summary_rows(user.google_id, session=session)
+        return fast_response(rows_as_dicts(rows), response, TASK_SUMMARY_SERIALIZER)
+    all_tasks = await NemoDeta.get_task_summary(user.google_id, session=session)
     return all_tasks
 
+@nemo_route.get("/tasks/history", dependencies=[conditional_get("tasks")])
+async def get_task_history(
+    response: Response,
+    cursor: str = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Get all tasks page by page, newest first.
+
+    Pass the returned `next_cursor` to get the following page, it's null on the last one.
+    """
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor.",
+            )
+
+    rows, day_totals, has_more = await NemoDeta.get_task_history(
+        user.google_id, after, limit, session=session
+    )
+    history = {
+        "tasks": [{**row._asdict(), "date": row.created_at.strftime("%b %d %Y")} for row in rows],
+        "days": day_totals,
+        "next_cursor": encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None,
+    }
+    return fast_response(history, response)
+
+# cheap levels, an export streams megabytes and brotli 1 already saves ~90% on it
+@nemo_route.get("/export", dependencies=[compression(gzip_level=1, brotli_quality=1)])
+async def export_user_data(
+    export_format: str = Query(NDJSON, alias="format"), user: User = Depends(current_user)
+):
+    """Download the account, settings, analytics and tasks as NDJSON or CSV.
+
+    The rows are streamed in chunks, the response never holds the whole history in memory.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown export format, expected one of: {', '.join(EXPORT_FORMATS)}",
+        )
+    return StreamingResponse(
+        export_user(user.google_id, export_format),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="nemo-export.{export_format}"'},
+    )
+
+@nemo_route.post("/import")
+async def import_user_data(
+    request: Request,
+    import_format: str = Query(NDJSON, alias="format"),
+    job_id: str = Query(None),
+    user: User = Depends(current_user),
+):
+    """Import analytics and tasks from an NDJSON or CSV file sent as the request body.
+
+    The file has the layout of `/export`. Rows are committed in batches, when the import
+    fails send the same file again with the returned `job_id` to continue where it stopped.
+    Files over `IMPORT_INLINE_MAX_BYTES` are imported by the worker, the response is a 202
+    and `/import/status` has the progress. A job that is already running gets a 409.
+    """
+    if import_format not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown import format, expected one of: {', '.join(IMPORT_FORMATS)}",
+        )
+    try:
+        job = await get_or_create_import_job(user.google_id, import_format, job_id)
+    except LookupError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No import job found.",
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if job.status == IMPORT_DONE:
+        return import_report(job, records=0, seconds=0.0, errors=[])
+
+    settings = get_setting()
+    upload = await spool_upload(request.stream())
+    try:
+        # claimed once the upload is in, so a slow upload doesn't make the claim look stale
+        job = await claim_import_job(job.id, user.google_id)
+        if job is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="The import job is already running.",
+            )
+        if settings.DELETION_WORKER_FUNCTION and (
+            upload_size(upload) > settings.IMPORT_INLINE_MAX_BYTES
+        ):
+            job = await stage_import(job, upload)
+            # if the invoke fails the job stays pending, sending the file again resumes it
+            await dispatch_worker_task("run_import_job", job_id=job.id)
+            return JSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content=import_report(job, records=0, seconds=0.0, errors=[]),
+            )
+        report = await run_import(job, upload)
+    finally:
+        upload.close()
+    if report["status"] != IMPORT_DONE:
+        return JSONResponse(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, content=report)
+    return report
+
+@nemo_route.get("/import/status")
+async def import_status(job_id: str, user: User = Depends(current_user)):
+    """Progress of an import, without the per-run figures of the `/import` report."""
+    job = await get_import_job(job_id, user.google_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No import job found.",
+        )
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "error": job.error,
+        "records_done": job.records_done,
+        "analytics_inserted": job.analytics_inserted,
+        "tasks_inserted": job.tasks_inserted,
+        "invalid_rows": job.invalid_rows,
+    }
+
 @nemo_route.post("/create_task")
-def create_new_task(task: CreateTask, user: User = Depends(current_user)):
+async def create_new_task(
+    task: CreateTask,
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_session),
+):
     """Create new task."""
     try:
         created_at = datetime.now()
@@ -216,26 +574,118 @@ def create_new_task(task: CreateTask, user: User = Depends(current_user)):
             "created_at": created_at,
             "task_date": created_at,
         }
-        new_task = NemoDeta.insert_new_task(task_dict)
+        new_task = await NemoDeta.insert_new_task(task_dict, session=session)
     except IntegrityError as e:
         handle_integrity_error(e)
     return new_task
 
+@nemo_route.post("/tasks/batch")
+async def tasks_batch(
+    batch: TasksBatch,
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Create, edit and delete many tasks in one transaction.
+
+    Creates run first, then edits, then deletes. Edits and deletes get one result per id,
+    `success` is false when the user has no task with that id.
+    """
+    max_size = get_setting().TASKS_BATCH_MAX_SIZE
+    if len(batch.create) + len(batch.update) + len(batch.delete) > max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {max_size} task operations can be sent in one batch.",
+        )
+
+    created_at = datetime.now()
+    new_tasks = [
+        {**task.model_dump(), "created_at": created_at, "task_date": created_at}
+        for task in batch.create
+    ]
+    updates = [task.model_dump(exclude_unset=True) for task in batch.update]
+    delete_ids = list(dict.fromkeys(batch.delete))
+    try:
+        created = await NemoDeta.insert_tasks(user.google_id, new_tasks, session=session)
+        updated = await NemoDeta.update_tasks(
+            user.google_id, [changes for changes in updates if len(changes) > 1], session=session
+        )
+        deleted = await NemoDeta.delete_tasks(user.google_id, delete_ids, session=session)
+    except IntegrityError as e:
+        handle_integrity_error(e)
+
+    update_results = []
+    for changes in updates:
+        if changes["id"] in updated:
+            update_results.append({"id": changes["id"], "success": True})
+        else:
+            error = "No fields to update" if len(changes) == 1 else "Task not found"
+            update_results.append({"id": changes["id"], "success": False, "error": error})
+
+    delete_results = []
+    for task_id in delete_ids:
+        if task_id in deleted:
+            delete_results.append({"id": task_id, "success": True})
+        else:
+            delete_results.append({"id": task_id, "success": False, "error": "Task not found"})
+
+    return {"created": created, "updated": update_results, "deleted": delete_results}
+
 @nemo_route.delete("/tasks/{task_key}")
-def delete_task_by_task_id(task_key=str, user: User = Depends(current_user)):
+async def delete_task_by_task_id(
+    task_key=str, user: User = Depends(current_user), session: AsyncSession = Depends(get_session)
+):
     """Delete Task"""
-    NemoDeta.delete_task_by_key(google_id=user.google_id, key=task_key)
+    await NemoDeta.delete_task_by_key(google_id=user.google_id, key=task_key, session=session)
     return JSONResponse(
         status_code=status.HTTP_200_OK,
         content={"success": True},
     )
 
 @nemo_route.delete("/delete")
-def delete_user(user: User = Depends(current_user)):
-    """Permanently remove user from the database."""
+async def delete_user(
+    background_tasks: BackgroundTasks,
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Permanently remove user from the database.
+
+    Access is revoked right away and the rows are deleted by a background job, poll
+    `/delete/status` with the returned `job_id` to follow it.
+    """
     user_google_id = user.google_id
-    NemoDeta.remove_user(google_id=user_google_id)
+    job = await start_deletion(user_google_id, session=session)
+    token_cache.invalidate_user(user_google_id)
+    # the worker reads the job with its own connection
+    await session.commit()
+    if not await dispatch_deletion_job(job.id):
+        # no worker function outside Lambda, run it after the response
+        background_tasks.add_task(run_deletion_job, job.id)
     return JSONResponse(
-        status_code=status.HTTP_200_OK,
-        content={"success": True, "google_id": user_google_id},
+        status_code=status.HTTP_202_ACCEPTED,
+        content={
+            "success": True,
+            "google_id": user_google_id,
+            "job_id": job.id,
+            "status": job.status,
+        },
     )
+
+@nemo_route.get("/delete/status")
+async def delete_user_status(job_id: str, user: User = Depends(token_user)):
+    """Progress of an account deletion, the status and the row counts only.
+
+    Takes the token the deletion was requested with, the user's access is otherwise revoked.
+    Interrupted jobs are resumed by the sweep.
+    """
+    job = await get_deletion_job(job_id, user.google_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No deletion job found.",
+        )
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "analytics_deleted": job.analytics_deleted,
+        "tasks_deleted": job.tasks_deleted,
+    }
@@ -0,0 +1,52 @@
+"""Strong ETags derived from the per-user change counters in `nemo_user_versions`.
+
+A compressed response is a different representation, so `CompressionMiddleware` gives it
+its own ETag with the content coding appended, see `encoded_etag`.
+"""
+
+import hashlib
+from datetime import date
+from typing import Dict, Optional, Sequence
+
+
+def make_etag(
+    google_id: str, versions: Dict[str, int], resources: Sequence[str], day: Optional[date] = None
+) -> str:
+    """Quoted ETag of the `resources` counters, `day` for responses relative to today."""
+    parts = [google_id, *(f"{resource}={versions[resource]}" for resource in resources)]
+    if day is not None:
+        parts.append(day.isoformat())
+    return '"' + hashlib.blake2b("|".join(parts).encode(), digest_size=12).hexdigest() + '"'
+
+
+# content codings `CompressionMiddleware` can send
+CONTENT_CODINGS = ("br", "gzip")
+
+
+def encoded_etag(etag: str, coding: str) -> str:
+    """ETag of the `coding` compressed representation, e.g. `"abc"` becomes `"abc-gzip"`."""
+    if not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{coding}"'
+
+
+def matching_etag(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """The `If-None-Match` entry matching `etag` or one of its compressed variants, if any.
+
+    Uses the weak comparison `If-None-Match` calls for.
+    """
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == "*":
+        return etag
+    variants = {etag, *(encoded_etag(etag, coding) for coding in CONTENT_CODINGS)}
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip().removeprefix("W/")
+        if candidate in variants:
+            return candidate
+    return None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an `If-None-Match` header matches, using the weak comparison it calls for."""
+    return matching_etag(if_none_match, etag) is not None
@@ -0,0 +1,84 @@
+"""Opt-in fast JSON responses, enabled with `FAST_RESPONSES_ENABLED`.
+
+By default FastAPI validates what a route returns against its `response_model`, walks it
+with `jsonable_encoder` and encodes the result with the stdlib `json` module. In fast mode
+routes return a `FastJSONResponse` instead, encoded in a single pass by pydantic-core's
+Rust serializer, using a serializer built once at import for every known response shape.
+Query rows are zipped into dicts with their column names and handed to it as they are.
+The bytes are the same in both modes.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import pydantic_core
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlalchemy import Row
+from starlette.responses import JSONResponse
+from typing_extensions import TypedDict
+
+from app.api.config.settings import get_setting
+from app.api.models.nemo import NemoSettings, NemoUserInformation
+
+
+class TaskSummary(TypedDict):
+    """A task of `/get-tasks`, with the total of its day."""
+
+    id: int
+    created_at: datetime
+    duration: int
+    task_description: str
+    total_duration: int
+    date: str
+
+
+class WeekdayAnalytics(TypedDict):
+    """A day of `/analytics`."""
+
+    weekday: str
+    total_count: int
+    month_number: int
+
+
+SETTINGS_SERIALIZER = TypeAdapter(NemoSettings)
+ACCOUNT_SERIALIZER = TypeAdapter(NemoUserInformation)
+TASK_SUMMARY_SERIALIZER = TypeAdapter(List[TaskSummary])
+ANALYTICS_SERIALIZER = TypeAdapter(List[WeekdayAnalytics])
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded by pydantic-core, with `serializer` when the shape is known."""
+
+    def __init__(self, content: Any, serializer: Optional[TypeAdapter] = None, **kwargs):
+        # render() runs in the parent's __init__
+        self.serializer = serializer
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        if self.serializer is not None:
+            return self.serializer.dump_json(content)
+        return pydantic_core.to_json(content)
+
+
+def rows_as_dicts(rows: Sequence[Row]) -> List[Dict]:
+    """Result rows as dicts, looking the column names up once instead of once per row."""
+    if not rows:
+        return []
+    fields = rows[0]._fields
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def fast_response(
+    content: Any, response: Response, serializer: Optional[TypeAdapter] = None
+) -> Any:
+    """`content` as a `FastJSONResponse` in fast mode, otherwise as is for FastAPI to encode.
+
+    `response` is the one injected into the route. FastAPI ignores it when a route returns
+    a response of its own, so its headers, e.g. the ETag of `conditional_get`, are copied.
+    """
+    if not get_setting().FAST_RESPONSES_ENABLED:
+        return content
+    fast = FastJSONResponse(content, serializer)
+    fast.headers.raw.extend(response.headers.raw)
+    return fast
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import jwt as pyjwt
+
+GOOGLE_OAUTH2_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class GoogleCertCache:
+    """Cache Google's ID token signing certificates across requests.
+
+    Certificates are kept until the ``max-age`` advertised by the endpoint expires,
+    refreshed early when a token carries an unknown ``kid`` and fetched over a single
+    pooled HTTP session. When ``cache_file`` is set the certificates are also written
+    to disk so a warm Lambda container can reuse them after a restart of the handler.
+
+    google-auth and requests are only imported on the first verification, they add a
+    good part of the handler's import time and only the login route needs them.
+    """
+
+    def __init__(
+        self,
+        certs_url: str = GOOGLE_OAUTH2_CERTS_URL,
+        cache_file: Optional[str] = None,
+        default_max_age: int = 3600,
+        min_refresh_interval: int = 30,
+        max_verified_tokens: int = 1024,
+    ):
+        self.certs_url = certs_url
+        self.cache_file = cache_file
+        self.default_max_age = default_max_age
+        self.min_refresh_interval = min_refresh_interval
+        self.max_verified_tokens = max_verified_tokens
+        self.fetch_count = 0
+
+        self._certs: Dict[str, str] = {}
+        self._expires_at: float = 0
+        self._fetched_at: float = 0
+        # by audience and token hash, a token is only reused for the audience it was checked for
+        self._verified: "OrderedDict[Tuple[Optional[str], str], dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._request = None
+        self._load_from_file()
+
+    def get_certs(self, kid: Optional[str] = None) -> Dict[str, str]:
+        """Return the cached certificates, fetching them when stale or when `kid` is unknown."""
+        with self._lock:
+            now = time.time()
+            if now >= self._expires_at:
+                self._refresh(now)
+            elif (
+                kid
+                and kid not in self._certs
+                and now - self._fetched_at >= self.min_refresh_interval
+            ):
+                self._refresh(now)
+            return self._certs
+
+    def verify_token(self, token: str, audience: Optional[str] = None) -> dict:
+        """Verify a Google ID token, reusing the result for tokens verified before."""
+        key = (audience, hashlib.sha256(token.encode()).hexdigest())
+        with self._lock:
+            payload = self._verified.get(key)
+            if payload is not None:
+                if payload["exp"] > time.time():
+                    self._verified.move_to_end(key)
+                    return payload
+                del self._verified[key]
+
+        try:
+            kid = pyjwt.get_unverified_header(token).get("kid")
+        except pyjwt.PyJWTError as e:
+            raise ValueError(f"Invalid token header: {e}")
+
+        from google.auth import jwt as google_jwt
+
+        payload = google_jwt.decode(token, certs=self.get_certs(kid), audience=audience)
+        if payload.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer. 'iss' should be one of {GOOGLE_ISSUERS}")
+
+        with self._lock:
+            self._verified[key] = payload
+            if len(self._verified) > self.max_verified_tokens:
+                self._verified.popitem(last=False)
+        return payload
+
+    def clear(self) -> None:
+        with self._lock:
+            self._certs = {}
+            self._expires_at = 0
+            self._fetched_at = 0
+            self._verified.clear()
+
+    def _refresh(self, now: float) -> None:
+        if self._request is None:
+            import requests as http_requests
+            from google.auth.transport import requests
+
+            self._request = requests.Request(session=http_requests.Session())
+        response = self._request(self.certs_url, method="GET")
+        if response.status != 200:
+            raise ValueError(f"Could not fetch certificates at {self.certs_url}")
+
+        self.fetch_count += 1
+        self._certs = json.loads(response.data.decode("utf-8"))
+        self._fetched_at = now
+        self._expires_at = now + self._parse_max_age(response.headers.get("Cache-Control", ""))
+        self._save_to_file()
+
+    def _parse_max_age(self, cache_control: str) -> int:
+        match = _MAX_AGE_RE.search(cache_control)
+        if not match:
+            return self.default_max_age
+        return int(match.group(1))
+
+    def _load_from_file(self) -> None:
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return
+        if cached.get("certs_url") != self.certs_url or cached.get("expires_at", 0) <= time.time():
+            return
+        self._certs = cached["certs"]
+        self._expires_at = cached["expires_at"]
+        self._fetched_at = cached.get("fetched_at", 0)
+
+    def _save_to_file(self) -> None:
+        if not self.cache_file:
+            return
+        cached = {
+            "certs_url": self.certs_url,
+            "certs": self._certs,
+            "expires_at": self._expires_at,
+            "fetched_at": self._fetched_at,
+        }
+        tmp_file = f"{self.cache_file}.tmp"
+        try:
+            with open(tmp_file, "w") as f:
+                json.dump(cached, f)
+            os.replace(tmp_file, self.cache_file)
+        except OSError:
+            pass
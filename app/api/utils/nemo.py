@@ -3,8 +3,6 @@ from datetime import datetime, timedelta, timezone
 
 import jwt
 from fastapi.exceptions import HTTPException
-from google.auth.transport import requests
-from google.oauth2 import id_token
 from sqlalchemy.exc import IntegrityError
 from starlette.status import (
     HTTP_400_BAD_REQUEST,
@@ -12,8 +10,10 @@ from starlette.status import (
     HTTP_404_NOT_FOUND,
 )
 
+from app.api.config.settings import get_setting
 from app.api.pydantic.nemo import DictPayload
 from app.api.routers.constants import GOOGLE_CLIENT_ID
+from app.api.utils.google_certs import GoogleCertCache
 
 credentials_exception = HTTPException(
     status_code=HTTP_403_FORBIDDEN, detail="Could not validate credentials"
@@ -22,6 +22,8 @@ credentials_exception = HTTPException(
 JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY", "09d25e094faa6ca")
 JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
 
+google_cert_cache = GoogleCertCache(cache_file=get_setting().GOOGLE_CERTS_CACHE_FILE)
+
 def check_google_user(payload):
     """Check if payload is valid."""
     if payload["iss"] not in ["accounts.google.com", "https://accounts.google.com"]:
@@ -36,18 +38,16 @@ def create_dict_from_payload(payload) -> DictPayload:
         "created_at": datetime.now(timezone.utc),
         "google_id": payload["sub"],
         "given_name": payload["given_name"],
-        "family_name": payload["family_name"],
+        "family_name": payload.get("family_name"),
         "email": payload["email"],
-        "profile_pic": payload["picture"],
+        "profile_pic": payload.get("picture"),
         "email_verified": payload["email_verified"],
     }
 
 def get_user_payload(token):
     """Verify oauth2_token and decode user."""
     try:
-        decoded = id_token.verify_oauth2_token(
-            token, requests.Request(), GOOGLE_CLIENT_ID
-        )
+        decoded = google_cert_cache.verify_token(token, audience=GOOGLE_CLIENT_ID)
         return decoded
     except ValueError:
         raise credentials_exception
@@ -71,10 +71,6 @@ def create_access_token(*, data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
-def get_date_x_days_ago(x: int) -> datetime:
-    seven_days_ago = datetime.now() - timedelta(days=x)
-    return seven_days_ago
-
 def handle_integrity_error(e: IntegrityError):
     if "FOREIGN KEY constraint failed" in str(e):
         raise HTTPException(
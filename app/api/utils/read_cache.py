@@ -0,0 +1,225 @@
+"""Per-user read-through cache for rows that only change when the user edits them.
+
+`NemoDeta.get_user_settings`, `get_user_profile` and `get_user_image_url` go through
+`ReadCache.get_or_load`. Writes mark the user's entries stale on their session with
+`mark_stale`, and the entries are dropped once that session has committed, see
+`invalidate_pending`. Until then the writing request reads its own changes from the
+database. `None` results aren't cached.
+
+Entries carry the user's change counter (see `NemoUserVersion`) they were loaded under.
+A request that knows the current counters, e.g. to build its ETag, records them with
+`remember_versions`, and an entry from an older version is a miss. So a body served from
+another instance's stale entry never goes out under the ETag of a newer version.
+
+Values are stored as plain dicts and strings, so a shared backend (e.g. Redis) only has
+to implement `CacheBackend`. The default `InMemoryBackend` is per process, other
+instances see an edit once their entry expires after `READ_CACHE_TTL` seconds.
+"""
+
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple, Type
+
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api.config.settings import get_setting
+
+SETTINGS = "settings"
+ACCOUNT = "account"
+IMAGE_URL = "image_url"
+CACHED_READS = (SETTINGS, ACCOUNT, IMAGE_URL)
+# the `NemoUserVersion` counter each cached read changes with
+VERSION_COUNTERS = {SETTINGS: "settings", ACCOUNT: "account", IMAGE_URL: "account"}
+
+# (google_id, name) pairs written through a session, invalidated once it commits
+PENDING_INVALIDATION_KEY = "read_cache_pending_invalidation"
+# google_id -> change counters read by the request, see `remember_versions`
+VERSIONS_KEY = "read_cache_versions"
+
+
+class CacheBackend:
+    """Where cached values live. Values are JSON-serializable, a miss returns None."""
+
+    async def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def delete(self, keys: Iterable[str]) -> None:
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+
+class InMemoryBackend(CacheBackend):
+    """Bounded LRU with a TTL per entry, local to the process."""
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    async def delete(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ReadCache:
+    """Read-through cache in front of a backend, counting hits and misses per read."""
+
+    def __init__(self, backend: CacheBackend, ttl: float = 30):
+        self.backend = backend
+        self.ttl = ttl  # seconds
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self._generation = 0  # bumped by every invalidation
+
+    @staticmethod
+    def _key(google_id: str, name: str) -> str:
+        return f"{google_id}:{name}"
+
+    async def get_or_load(
+        self,
+        google_id: str,
+        name: str,
+        load: Callable[[], Awaitable[Any]],
+        session: Optional[AsyncSession] = None,
+        model: Optional[Type[SQLModel]] = None,
+    ) -> Any:
+        """Cached value of `name` for the user, calling `load` on a miss.
+
+        `model` rows are cached as dicts and a new instance is returned on every hit. An
+        entry loaded under another version than the one remembered on `session` is a miss.
+        """
+        if session is not None and (google_id, name) in session.info.get(
+            PENDING_INVALIDATION_KEY, ()
+        ):
+            # uncommitted writes of this request, neither served from nor stored in the cache
+            return await load()
+
+        version = _remembered_version(session, google_id, name)
+        key = self._key(google_id, name)
+        cached = await self.backend.get(key)
+        if cached is not None and (version is None or cached["version"] == version):
+            self.hits[name] += 1
+            value = cached["value"]
+            return model.model_validate(value) if model is not None else value
+
+        self.misses[name] += 1
+        generation = self._generation
+        value = await load()
+        # a write committed while loading may have been read before it, don't store that
+        if value is not None and generation == self._generation:
+            value_dump = value.model_dump() if model is not None else value
+            await self.backend.set(key, {"version": version, "value": value_dump}, self.ttl)
+        return value
+
+    async def invalidate(self, google_id: str, *names: str) -> None:
+        """Drop the user's entries for `names`, every cached read when none are given."""
+        self._generation += 1
+        await self.backend.delete(self._key(google_id, name) for name in names or CACHED_READS)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        stats = {}
+        for name in CACHED_READS:
+            hits, misses = self.hits[name], self.misses[name]
+            stats[name] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+            }
+        return stats
+
+
+_read_cache: Optional[ReadCache] = None
+
+
+def get_read_cache() -> Optional[ReadCache]:
+    """The shared cache when `READ_CACHE_ENABLED` is set, otherwise None."""
+    global _read_cache
+    settings = get_setting()
+    if _read_cache is None and settings.READ_CACHE_ENABLED:
+        _read_cache = ReadCache(
+            InMemoryBackend(settings.READ_CACHE_MAX_SIZE), ttl=settings.READ_CACHE_TTL
+        )
+    return _read_cache
+
+
+def set_read_cache(cache: Optional[ReadCache]) -> None:
+    global _read_cache
+    _read_cache = cache
+
+
+async def cached_read(
+    google_id: str,
+    name: str,
+    load: Callable[[], Awaitable[Any]],
+    session: Optional[AsyncSession] = None,
+    model: Optional[Type[SQLModel]] = None,
+) -> Any:
+    """`ReadCache.get_or_load` on the shared cache, or just `load()` when it's disabled."""
+    cache = get_read_cache()
+    if cache is None:
+        return await load()
+    return await cache.get_or_load(google_id, name, load, session, model)
+
+
+def remember_versions(session: AsyncSession, google_id: str, versions: Dict[str, int]) -> None:
+    """Record the user's current change counters, read through `session`, for its cached reads."""
+    session.info.setdefault(VERSIONS_KEY, {})[google_id] = versions
+
+
+def _remembered_version(
+    session: Optional[AsyncSession], google_id: str, name: str
+) -> Optional[int]:
+    if session is None:
+        return None
+    versions = session.info.get(VERSIONS_KEY, {}).get(google_id)
+    return None if versions is None else versions[VERSION_COUNTERS[name]]
+
+
+def mark_stale(session: AsyncSession, google_id: str, *names: str) -> None:
+    """Invalidate the user's `names` (or all) entries once `session` commits."""
+    pending = session.info.setdefault(PENDING_INVALIDATION_KEY, set())
+    pending.update((google_id, name) for name in names or CACHED_READS)
+
+
+async def invalidate_pending(session: AsyncSession) -> None:
+    """Drop every entry marked stale on `session`, after it has been committed."""
+    pending = session.info.pop(PENDING_INVALIDATION_KEY, ())
+    cache = get_read_cache()
+    if cache is None:
+        return
+    for google_id, name in pending:
+        await cache.invalidate(google_id, name)
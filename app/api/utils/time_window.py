@@ -0,0 +1,59 @@
+"""Half-open `[start, end)` time windows for the analytics and task queries.
+
+Filters compare the raw column against the bounds (`column >= start AND column < end`)
+instead of wrapping it in `date(...)`, so SQLite can range-scan the
+`(google_id, created_at)` indexes. Windows cover whole days and are built from a single
+`now`, which uses the same naive `datetime.now()` clock the rows are written with.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_
+
+
+def _midnight(moment: datetime) -> datetime:
+    return datetime.combine(moment.date(), time.min)
+
+
+class TimeWindow(NamedTuple):
+    start: datetime
+    end: datetime
+
+    @classmethod
+    def today(cls, now: Optional[datetime] = None) -> "TimeWindow":
+        return cls.last_days(0, now)
+
+    @classmethod
+    def last_days(cls, days: int, now: Optional[datetime] = None) -> "TimeWindow":
+        """Today plus the `days` calendar days before it."""
+        start_of_today = _midnight(now or datetime.now())
+        return cls(start_of_today - timedelta(days=days), start_of_today + timedelta(days=1))
+
+    @classmethod
+    def days_between(cls, first: datetime, last: datetime) -> "TimeWindow":
+        """Whole days from the day of `first` through the day of `last`, both included."""
+        return cls.between(_midnight(first), _midnight(last) + timedelta(days=1))
+
+    @classmethod
+    def between(cls, start: datetime, end: datetime) -> "TimeWindow":
+        if end < start:
+            raise ValueError("The end of a time window can't be before its start.")
+        return cls(start, end)
+
+    @property
+    def days(self) -> Tuple[date, date]:
+        """Bounds for a `date` column, covering every day the window touches."""
+        end_day = self.end.date()
+        if self.end != _midnight(self.end):
+            end_day += timedelta(days=1)
+        return self.start.date(), end_day
+
+    def clause(self, column):
+        """`column >= start AND column < end` for a `datetime` column."""
+        return and_(column >= self.start, column < self.end)
+
+    def day_clause(self, column):
+        """Same as `clause` for a `date` column."""
+        start_day, end_day = self.days
+        return and_(column >= start_day, column < end_day)
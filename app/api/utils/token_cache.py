@@ -0,0 +1,68 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from app.api.pydantic.nemo import User
+
+
+class TokenCache:
+    """Bounded LRU of decoded access tokens.
+
+    Entries are keyed by a hash of the raw token so tokens are never kept in memory,
+    expire at the token's own ``exp`` and can be dropped for a user, e.g. on account deletion.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[User, float]]" = OrderedDict()
+        self._by_user: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[User]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return user
+
+    def set(self, token: str, user: User) -> None:
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (user, user.exp)
+            self._entries.move_to_end(key)
+            self._by_user.setdefault(user.google_id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, google_id: str) -> None:
+        with self._lock:
+            for key in self._by_user.pop(google_id, set()):
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> None:
+        user, _ = self._entries.pop(key)
+        keys = self._by_user.get(user.google_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user.google_id]
@@ -0,0 +1,118 @@
+"""CPU time against bytes saved by CompressionMiddleware, per encoding and level.
+
+Payloads are built like the real responses: a /get-tasks body, a page of /tasks/history,
+a week of /analytics and an NDJSON export streamed in EXPORT_CHUNK_SIZE chunks. Each one is
+sent through the middleware as the route would send it and the CPU time of compressing it
+is measured with `time.process_time`.
+
+Run with: PYTHONPATH=. python benchmark/compression-benchmark.py
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pydantic_core
+
+from app.api.config.compression import BROTLI, ENCODINGS, GZIP, CompressionMiddleware
+from app.api.crud.export import _ndjson_chunk
+
+LEVELS = {GZIP: (1, 6, 9), BROTLI: (1, 4, 6, 9)}
+REPEAT = 5
+EXPORT_ROWS = 50_000
+EXPORT_CHUNK_SIZE = 1000
+
+
+def task_rows(count, offset=0):
+    now = datetime(2024, 5, 17, 18, 30)
+    rows = []
+    for i in range(offset, offset + count):
+        created_at = now - timedelta(minutes=37 * i)
+        rows.append(
+            {
+                "id": 100_000 - i,
+                "created_at": created_at,
+                "duration": 1500 + (i * 97) % 1200,
+                "task_description": (
+                    f"Review chapter {i % 40} notes and {'fix tests' if i % 3 else 'write summary'}"
+                ),
+                "total_duration": 5400 + (i * 13) % 3000,
+                "date": created_at.strftime("%b %d %Y"),
+            }
+        )
+    return rows
+
+
+def payloads():
+    tasks = task_rows(2000)
+    history = {
+        "tasks": task_rows(200),
+        "days": [{"day": "2024-05-17", "total_duration": 5400}],
+        "next_cursor": "eyJjIjoiMjAyNC0wNS0xNyJ9",
+    }
+    analytics = [
+        {"weekday": f"May {day}", "total_count": 3000 + day * 61, "month_number": 5}
+        for day in range(11, 18)
+    ]
+    export = [
+        _ndjson_chunk("task", task_rows(EXPORT_CHUNK_SIZE, offset))
+        for offset in range(0, EXPORT_ROWS, EXPORT_CHUNK_SIZE)
+    ]
+    return {
+        "get-tasks (2000)": [pydantic_core.to_json(tasks)],
+        "tasks/history (200)": [pydantic_core.to_json(history)],
+        "analytics (7 days)": [pydantic_core.to_json(analytics)],
+        f"export ndjson ({EXPORT_ROWS})": export,
+    }
+
+
+def make_app(chunks, media_type):
+    async def app(scope, receive, send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", media_type.encode())],
+            }
+        )
+        for i, chunk in enumerate(chunks):
+            await send(
+                {"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1}
+            )
+
+    return app
+
+
+async def run(chunks, media_type, encoding, level):
+    kwargs = {"gzip_level": level} if encoding == GZIP else {"brotli_quality": level}
+    middleware = CompressionMiddleware(make_app(chunks, media_type), **kwargs)
+    scope = {"type": "http", "headers": [(b"accept-encoding", encoding.encode())]}
+    sent = 0
+
+    async def send(message):
+        nonlocal sent
+        sent += len(message.get("body", b""))
+
+    start = time.process_time()
+    for _ in range(REPEAT):
+        await middleware(scope, None, send)
+    return (time.process_time() - start) / REPEAT, sent // REPEAT
+
+
+async def main():
+    print(f"{'payload':<24} {'encoding':<10} {'size':>10} {'saved':>7} {'cpu ms':>8} {'MB/s':>8}")
+    for label, chunks in payloads().items():
+        media_type = "application/x-ndjson" if label.startswith("export") else "application/json"
+        size = sum(len(chunk) for chunk in chunks)
+        print(f"{label:<24} {'identity':<10} {size:>10}")
+        for encoding in ENCODINGS:
+            for level in LEVELS[encoding]:
+                cpu, sent = await run(chunks, media_type, encoding, level)
+                rate = size / cpu / 1e6 if cpu else float("inf")
+                print(
+                    f"{'':<24} {f'{encoding}-{level}':<10} {sent:>10} {1 - sent / size:>7.1%} "
+                    f"{cpu * 1000:>8.2f} {rate:>8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
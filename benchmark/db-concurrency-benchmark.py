@@ -0,0 +1,103 @@
+"""Concurrency-limited throughput of the threadpool model vs the async database layer.
+
+Plain `def` routes run in Starlette's threadpool (40 threads by default) around a blocking
+`Session(engine)`; `async def` routes await an `AsyncSession` on the event loop. Every
+statement gets an artificial delay to stand in for the SQLite Cloud network round trip.
+
+Run with: PYTHONPATH=. python benchmark/db-concurrency-benchmark.py
+"""
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api.models.nemo import NemoSettings, NemoUserInformation
+
+LATENCY = float(os.getenv("BENCH_DB_LATENCY", 0.02))  # seconds per statement
+CONCURRENCY = (1, 10, 50, 200)
+REQUESTS_PER_WORKER = 5
+GOOGLE_ID = "bench_google_id"
+
+
+class SlowCursor(sqlite3.Cursor):
+    def execute(self, *args, **kwargs):
+        time.sleep(LATENCY)
+        return super().execute(*args, **kwargs)
+
+
+class SlowConnection(sqlite3.Connection):
+    def cursor(self, factory=SlowCursor):
+        return super().cursor(factory)
+
+
+def seed(db_file: str) -> None:
+    engine = create_engine(f"sqlite:///{db_file}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(
+            NemoUserInformation(
+                google_id=GOOGLE_ID,
+                email="bench@example.com",
+                given_name="Bench",
+                created_at=datetime.now(),
+            )
+        )
+        session.commit()
+    engine.dispose()
+
+
+async def run(label, request, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited():
+        async with semaphore:
+            await request()
+
+    total = concurrency * REQUESTS_PER_WORKER
+    start = time.perf_counter()
+    await asyncio.gather(*(limited() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} concurrency={concurrency:<4} {total / elapsed:8.1f} req/s")
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_file = os.path.join(tmp_dir, "bench.db")
+        seed(db_file)
+        pool = {"pool_size": max(CONCURRENCY), "max_overflow": 0}
+        connect_args = {"factory": SlowConnection, "check_same_thread": False}
+        sync_engine = create_engine(f"sqlite:///{db_file}", connect_args=connect_args, **pool)
+        async_engine = create_async_engine(
+            f"sqlite+aiosqlite:///{db_file}", connect_args=connect_args, **pool
+        )
+        statement = select(NemoSettings).where(NemoSettings.google_id == GOOGLE_ID)
+
+        def threadpool_query():
+            with Session(sync_engine) as session:
+                return session.exec(statement).first()
+
+        async def threadpool_request():
+            return await run_in_threadpool(threadpool_query)
+
+        async def async_request():
+            async with AsyncSession(async_engine) as session:
+                return (await session.exec(statement)).first()
+
+        print(f"simulated round trip: {LATENCY * 1000:.0f} ms/statement")
+        for concurrency in CONCURRENCY:
+            await run("threadpool", threadpool_request, concurrency)
+            await run("async", async_request, concurrency)
+
+        sync_engine.dispose()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,184 @@
+"""Bytes per second and allocations of the default vs the fast response path.
+
+A local SQLite file is seeded with TASKS tasks and a week of analytics, every payload is
+read once and then turned into a response body both ways: the default path (dicts and
+`strftime` per row, `response_model` validation, `jsonable_encoder`, `json.dumps`) and the
+`FAST_RESPONSES_ENABLED` one. Only the encoding is timed, the queries are the same. Peak
+memory is measured on a separate run, tracemalloc slows everything down.
+
+Run with: PYTHONPATH=. python benchmark/serialization-benchmark.py
+"""
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from fastapi.routing import APIRoute, serialize_response
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.responses import JSONResponse
+
+import app.api.config.replica as replica
+from app.api.crud.analytics_rollup import rollup_row, rollup_upsert_many_statement
+from app.api.crud.nemo import NemoDeta
+from app.api.models.nemo import NemoAnalytics, NemoTasks, NemoUserInformation
+from app.api.utils.fast_json import (
+    ACCOUNT_SERIALIZER,
+    ANALYTICS_SERIALIZER,
+    SETTINGS_SERIALIZER,
+    TASK_SUMMARY_SERIALIZER,
+    FastJSONResponse,
+    rows_as_dicts,
+)
+from main import app
+
+TASKS = 50_000
+SMALL_PAYLOAD_REPEAT = 5000
+GOOGLE_ID = "bench_google_id"
+
+
+def seed(db_file: str) -> None:
+    engine = create_engine(f"sqlite:///{db_file}")
+    SQLModel.metadata.create_all(engine)
+    now = datetime.now()
+    with Session(engine) as session:
+        session.add(
+            NemoUserInformation(
+                google_id=GOOGLE_ID,
+                email="bench@example.com",
+                given_name="Bench",
+                profile_pic="https://example.com/bench.png",
+                created_at=now,
+            )
+        )
+        # the settings row is created along with the user
+        session.commit()
+    # spread over the last nine days, all of them are in the task summary
+    created = [now - timedelta(seconds=i * 9 * 86400 // TASKS) for i in range(TASKS)]
+    tasks = [
+        {
+            "google_id": GOOGLE_ID,
+            "created_at": at,
+            "task_date": at,
+            "task_description": f"Write chapter {i} of the report",
+            "duration": 1500,
+        }
+        for i, at in enumerate(created)
+    ]
+    analytics = [
+        {"google_id": GOOGLE_ID, "created_at": at, "full_date": at, "duration": 1500}
+        for at in created[::100]
+    ]
+    with engine.begin() as conn:
+        conn.execute(NemoTasks.__table__.insert(), tasks)
+        conn.execute(NemoAnalytics.__table__.insert(), analytics)
+        conn.execute(
+            rollup_upsert_many_statement(),
+            [rollup_row(GOOGLE_ID, row["created_at"], row["duration"]) for row in analytics],
+        )
+    engine.dispose()
+
+
+def response_field(path: str):
+    route = next(
+        route
+        for route in app.routes
+        if isinstance(route, APIRoute) and route.path == path and "GET" in route.methods
+    )
+    return route.secure_cloned_response_field
+
+
+def default_body(content, field=None) -> bytes:
+    # what FastAPI does with a route's return value, serialize_response never awaits for
+    # async routes
+    try:
+        serialize_response(field=field, response_content=content).send(None)
+    except StopIteration as done:
+        return JSONResponse(done.value).body
+
+
+def measure(encode, repeat):
+    start = time.perf_counter()
+    size = sum(len(encode()) for _ in range(repeat))
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    encode()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / elapsed, peak
+
+
+async def load():
+    summary_rows = await NemoDeta.get_task_summary_rows(GOOGLE_ID)
+    async with replica.async_session() as session:
+        plain_rows = (await session.exec(NemoDeta._task_summary_query(GOOGLE_ID))).fetchall()
+    return {
+        "plain_rows": plain_rows,
+        "summary_rows": summary_rows,
+        "analytics": await NemoDeta.get_analytics(GOOGLE_ID),
+        "settings": await NemoDeta.get_user_settings(GOOGLE_ID),
+        "account": await NemoDeta.get_user_profile(GOOGLE_ID),
+    }
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_file = os.path.join(tmp_dir, "bench.db")
+        seed(db_file)
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}")
+        replica.async_session = async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+        data = asyncio.run(load())
+        asyncio.run(engine.dispose())
+
+    settings_field = response_field("/nemo/settings")
+    account_field = response_field("/nemo/account")
+    payloads = {
+        f"get-tasks ({len(data['summary_rows'])} rows)": (
+            1,
+            lambda: default_body(
+                [
+                    {**row._asdict(), "date": row.created_at.strftime("%b %d %Y")}
+                    for row in data["plain_rows"]
+                ]
+            ),
+            lambda: FastJSONResponse(
+                rows_as_dicts(data["summary_rows"]), TASK_SUMMARY_SERIALIZER
+            ).body,
+        ),
+        f"analytics (x{SMALL_PAYLOAD_REPEAT})": (
+            SMALL_PAYLOAD_REPEAT,
+            lambda: default_body(data["analytics"]),
+            lambda: FastJSONResponse(data["analytics"], ANALYTICS_SERIALIZER).body,
+        ),
+        f"settings (x{SMALL_PAYLOAD_REPEAT})": (
+            SMALL_PAYLOAD_REPEAT,
+            lambda: default_body(data["settings"], settings_field),
+            lambda: FastJSONResponse(data["settings"], SETTINGS_SERIALIZER).body,
+        ),
+        f"account (x{SMALL_PAYLOAD_REPEAT})": (
+            SMALL_PAYLOAD_REPEAT,
+            lambda: default_body(data["account"], account_field),
+            lambda: FastJSONResponse(data["account"], ACCOUNT_SERIALIZER).body,
+        ),
+    }
+
+    print(f"{'payload':<24} {'path':<8} {'MB/s':>9} {'peak KiB':>10}")
+    for label, (repeat, default, fast) in payloads.items():
+        assert default() == fast(), f"{label}: the fast path returned different bytes"
+        default_rate, default_peak = measure(default, repeat)
+        fast_rate, fast_peak = measure(fast, repeat)
+        print(f"{label:<24} {'default':<8} {default_rate / 1e6:9.2f} {default_peak / 1024:10.1f}")
+        print(
+            f"{'':<24} {'fast':<8} {fast_rate / 1e6:9.2f} {fast_peak / 1024:10.1f}   "
+            f"{fast_rate / default_rate:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Analytics and task queries under each SQLite pragma profile on a seeded database.
+
+Run with: PYTHONPATH=. python benchmark/sqlite-pragma-benchmark.py
+"""
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import app.api.config.replica as replica
+from app.api.config.database_sqlite import SQLITE_PRAGMA_PROFILES, use_pragma_profile
+from app.api.crud.analytics_rollup import backfill
+from app.api.crud.nemo import NemoDeta
+from app.api.models.nemo import NemoAnalytics, NemoTasks, NemoUserInformation
+
+USERS = 50
+ANALYTICS_PER_USER = 2000
+TASKS_PER_USER = 500
+ITERATIONS = 200
+WRITES = 200
+
+
+def seed(db_file: str) -> None:
+    engine = create_engine(f"sqlite:///{db_file}")
+    SQLModel.metadata.create_all(engine)
+    now = datetime.now()
+    with engine.begin() as conn:
+        conn.execute(
+            NemoUserInformation.__table__.insert(),
+            [
+                {
+                    "google_id": f"user-{i}",
+                    "email": f"user-{i}@example.com",
+                    "given_name": "Bench",
+                    "created_at": now,
+                }
+                for i in range(USERS)
+            ],
+        )
+        for i in range(USERS):
+            analytics = []
+            for _ in range(ANALYTICS_PER_USER):
+                created_at = now - timedelta(minutes=random.randint(0, 60 * 24 * 30))
+                analytics.append(
+                    {
+                        "google_id": f"user-{i}",
+                        "created_at": created_at,
+                        "duration": random.randint(600, 3600),
+                        "full_date": created_at,
+                    }
+                )
+            conn.execute(NemoAnalytics.__table__.insert(), analytics)
+
+            tasks = []
+            for j in range(TASKS_PER_USER):
+                created_at = now - timedelta(minutes=random.randint(0, 60 * 24 * 30))
+                tasks.append(
+                    {
+                        "google_id": f"user-{i}",
+                        "created_at": created_at,
+                        "task_description": f"task {j}",
+                        "duration": random.randint(600, 3600),
+                        "task_date": created_at,
+                    }
+                )
+            conn.execute(NemoTasks.__table__.insert(), tasks)
+    engine.dispose()
+
+
+async def seed_rollup(db_file: str) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}")
+    async with AsyncSession(engine) as session:
+        await backfill(session)
+    await engine.dispose()
+
+
+async def time_query(name, query):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await query(f"user-{random.randrange(USERS)}")
+    elapsed = time.perf_counter() - start
+    print(f"  {name:<28} {elapsed / ITERATIONS * 1000:8.2f} ms/op")
+
+
+async def time_writes():
+    start = time.perf_counter()
+    for _ in range(WRITES):
+        now = datetime.now()
+        await NemoDeta.insert_analytic(
+            {
+                "google_id": f"user-{random.randrange(USERS)}",
+                "created_at": now,
+                "duration": 1500,
+                "full_date": now,
+            }
+        )
+    elapsed = time.perf_counter() - start
+    print(f"  {'insert_analytic':<28} {elapsed / WRITES * 1000:8.2f} ms/op")
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_file = os.path.join(tmp_dir, "bench.db")
+        print(f"seeding {USERS} users x {ANALYTICS_PER_USER} analytics, {TASKS_PER_USER} tasks ...")
+        seed(db_file)
+        await seed_rollup(db_file)
+
+        for profile in SQLITE_PRAGMA_PROFILES:
+            engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}")
+            use_pragma_profile(engine.sync_engine, profile)
+            replica.async_session = async_sessionmaker(
+                engine, class_=AsyncSession, expire_on_commit=False
+            )
+
+            print(f"profile: {profile}")
+            await time_query("get_analytics", NemoDeta.get_analytics)
+            await time_query("analytics_get_best_day", NemoDeta.analytics_get_best_day)
+            await time_query("analytics_get_current_goal", NemoDeta.analytics_get_current_goal)
+            await time_query("get_task_summary", NemoDeta.get_task_summary)
+            await time_writes()
+            await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
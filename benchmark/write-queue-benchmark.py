@@ -0,0 +1,96 @@
+"""Insert throughput of per-row commits vs the group-commit write queue.
+
+Each writer inserts analytics rows back to back into a local SQLite file using the
+"durable" pragma profile, so every commit is an fsync.
+
+Run with: PYTHONPATH=. python benchmark/write-queue-benchmark.py
+"""
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import app.api.config.replica as replica
+from app.api.config.database_sqlite import use_pragma_profile
+from app.api.crud.nemo import NemoDeta
+from app.api.crud.write_queue import WriteQueue, set_write_queue
+from app.api.models.nemo import NemoUserInformation
+
+WRITERS = (1, 10, 100)
+ROWS_PER_RUN = 2000
+GOOGLE_ID = "bench_google_id"
+
+
+def seed(db_file: str) -> None:
+    engine = create_engine(f"sqlite:///{db_file}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(
+            NemoUserInformation(
+                google_id=GOOGLE_ID,
+                email="bench@example.com",
+                given_name="Bench",
+                created_at=datetime.now(),
+            )
+        )
+        session.commit()
+    engine.dispose()
+
+
+async def run(label, writers):
+    rows_per_writer = ROWS_PER_RUN // writers
+    errors = 0
+
+    async def writer():
+        nonlocal errors
+        for _ in range(rows_per_writer):
+            now = datetime.now()
+            try:
+                await NemoDeta.insert_analytic(
+                    {"google_id": GOOGLE_ID, "created_at": now, "duration": 1500, "full_date": now}
+                )
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(writer() for _ in range(writers)))
+    elapsed = time.perf_counter() - start
+    rows = rows_per_writer * writers
+    print(f"{label:<12} writers={writers:<4} {rows / elapsed:9.1f} rows/s  errors={errors}")
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_file = os.path.join(tmp_dir, "bench.db")
+        seed(db_file)
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{db_file}", pool_size=max(WRITERS), max_overflow=0
+        )
+        use_pragma_profile(engine.sync_engine, "durable")
+        replica.async_session = async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+
+        for writers in WRITERS:
+            set_write_queue(None)
+            await run("per-row", writers)
+
+            queue = WriteQueue(engine=engine)
+            set_write_queue(queue)
+            await run("group", writers)
+            await queue.close()
+            print(
+                f"{'':<12} {queue.batches} transactions, {queue.rows / queue.batches:.1f} rows each"
+            )
+
+        set_write_queue(None)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
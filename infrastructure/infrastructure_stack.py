@@ -8,6 +8,9 @@ from dotenv import load_dotenv
 from aws_cdk import (
     Duration,
     Stack,
+    aws_events as _events,
+    aws_events_targets as _targets,
+    aws_iam as _iam,
     aws_lambda as _lambda,
     # aws_apigatewayv2 as _apigw,
 )
@@ -38,6 +41,28 @@ class InfrastructureStack(Stack):
             timeout=Duration.seconds(30)
         )
 
+        # Account deletions run in their own asynchronous invocation of the function, see
+        # app/api/crud/account_deletion.py. A separate policy, the function's default one
+        # can't refer to the function itself.
+        _iam.Policy(self, "DeletionWorkerInvoke",
+            statements=[
+                _iam.PolicyStatement(
+                    actions=["lambda:InvokeFunction"], resources=[base_lambda.function_arn]
+                )
+            ],
+        ).attach_to_role(base_lambda.role)
+
+        # Resume deletion jobs whose invocation was lost, timed out or failed
+        _events.Rule(self, "DeletionJobSweep",
+            schedule=_events.Schedule.rate(Duration.minutes(5)),
+            targets=[
+                _targets.LambdaFunction(
+                    base_lambda,
+                    event=_events.RuleTargetInput.from_object({"nemo_task": "sweep_deletion_jobs"}),
+                )
+            ],
+        )
+
         # # Create an API Gateway
         # base_api = _apigw.HttpApi(self, "NemoAppAPIGateway",
         #     api_name='nemo-app-api',
@@ -8,13 +8,19 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
 from fastapi.responses import HTMLResponse
-from sqlmodel import SQLModel
 
 import app.api.models.nemo
-from app.api.config.database_sqlite import engine
+from app.api.config.compression import CompressionMiddleware
+from app.api.config.database_sqlite import async_engine, engine
+from app.api.config.migrations import check_schema_version
+from app.api.config.replica import get_replica
+from app.api.config.session import CheckoutCounterMiddleware
 
 from app.api.config.settings import get_setting
+from app.api.crud.account_deletion import WORKER_TASK_KEY, deletion_job_counts, handle_worker_event
+from app.api.crud.write_queue import get_write_queue
 from app.api.routers.nemo import nemo_route
+from app.api.utils.read_cache import get_read_cache
 
 settings = get_setting()
 
@@ -23,15 +29,24 @@ settings = get_setting()
 async def lifespan_context(app: FastAPI) -> AsyncGenerator[None, None]:
     # Startup logic
     print("Starting app...")
-    print("Initializing database tables")
-    SQLModel.metadata.create_all(engine)  # Create tables during startup
+    if settings.SCHEMA_VERSION_CHECK:
+        # tables are created and changed offline by `make migrate`, see app.api.config.migrations
+        version = await check_schema_version(async_engine)
+        print(f"Database schema at version {version}")
+    replica = get_replica()  # Pull the local read replica snapshot, if enabled
 
     yield  # FastAPI runs the app here
 
     # Perform shutdown tasks (e.g., closing DB connections)
     # Shutdown logic
     print("Shutting down...")
+    write_queue = get_write_queue()
+    if write_queue is not None:
+        await write_queue.close()  # commit the inserts that are still waiting
     engine.dispose()  # Close all connections
+    await async_engine.dispose()
+    if replica is not None:
+        await replica.dispose()
 
 app = FastAPI(lifespan=lifespan_context, title=settings.APP_NAME)
 
@@ -42,7 +57,12 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
+# X-DB-Checkouts header with connection checkouts per request
+app.add_middleware(CheckoutCounterMiddleware)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)  # brotli or gzip for bodies over COMPRESSION_MIN_SIZE
 
 @app.get("/")
 def index():
@@ -53,6 +73,19 @@ def index():
 async def health():
     return {"status": "healthy"}
 
+@app.get("/health/read-cache")
+async def read_cache_stats():
+    """Hits, misses and hit rate of the per-user read cache since this instance started."""
+    read_cache = get_read_cache()
+    if read_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, "ttl": read_cache.ttl, "reads": read_cache.stats()}
+
+@app.get("/health/deletion-jobs")
+async def deletion_job_stats():
+    """Unfinished account deletions by status, `gave_up` are failed ones out of retries."""
+    return await deletion_job_counts()
+
 app.include_router(
     nemo_route,
     prefix="/nemo",
@@ -60,4 +93,11 @@ app.include_router(
 )
 
 # Add Mangum handler for AWS Lambda
-handler = Mangum(app)
+mangum_handler = Mangum(app)
+
+
+def handler(event, context):
+    """Lambda entry point: worker tasks (deletion jobs and their sweep) or HTTP requests."""
+    if WORKER_TASK_KEY in event:
+        return handle_worker_event(event)
+    return mangum_handler(event, context)
@@ -0,0 +1,44 @@
+"""Rebuild or verify the `nemo_analytics_daily` rollup.
+
+Run with:
+    PYTHONPATH=. python scripts/analytics-rollup.py backfill [--google-id ID]
+    PYTHONPATH=. python scripts/analytics-rollup.py check [--google-id ID]
+"""
+import argparse
+import asyncio
+import sys
+
+from app.api.config.database_sqlite import async_engine, async_session
+from app.api.crud.analytics_rollup import backfill, check_consistency
+
+
+async def run(command, google_id):
+    try:
+        async with async_session() as session:
+            if command == "backfill":
+                rows = await backfill(session, google_id)
+                print(f"Rebuilt {rows} rollup rows")
+                return 0
+
+            mismatches = await check_consistency(session, google_id)
+            for mismatch in mismatches:
+                print(
+                    f"{mismatch['google_id']} {mismatch['day']}: "
+                    f"raw={mismatch['raw']} rollup={mismatch['rollup']}"
+                )
+            print(f"{len(mismatches)} mismatched days")
+            return 1 if mismatches else 0
+    finally:
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=("backfill", "check"))
+    parser.add_argument("--google-id", help="only this user (default: everyone)")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.command, args.google_id)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Report the slowest imports of the Lambda handler and check them against the budget.
+
+Run with:
+    PYTHONPATH=. python scripts/import-time-report.py [--runs 5] [--top 20] [--record]
+
+`--record` writes the measurement, plus some slack, as the new budget for
+tests/test_import_time.py. Record it after an import was added on purpose.
+"""
+import argparse
+import sys
+
+from tests.import_time import (
+    IMPORT_BUDGET_FILE,
+    best_of,
+    format_report,
+    load_budget,
+    record_budget,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="the fastest run is reported")
+    parser.add_argument("--top", type=int, default=20, help="packages and modules to list")
+    parser.add_argument(
+        "--record", action="store_true", help=f"save as the budget in {IMPORT_BUDGET_FILE}"
+    )
+    args = parser.parse_args()
+
+    profile = best_of(args.runs)
+    print(format_report(profile, args.top))
+    print()
+    if args.record:
+        budget = record_budget(profile)
+        print(f"Recorded budget: {budget['import_ms']} ms, {budget['modules']} modules")
+        return 0
+
+    budget = load_budget()
+    import_ms = profile.cumulative_ms("main")
+    print(
+        f"Budget: {budget['import_ms']} ms, {budget['modules']} modules (python {budget['python']})"
+    )
+    over = import_ms > budget["import_ms"] or profile.module_count > budget["modules"]
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Import a user's analytics and tasks from an NDJSON or CSV export file.
+
+Run with:
+    PYTHONPATH=. python scripts/import-user-data.py --google-id ID FILE \\
+        [--format csv] [--job-id JOB_ID]
+
+Pass the job id printed by a failed run to continue after its last committed batch.
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from app.api.config.database_sqlite import async_engine
+from app.api.crud.bulk_import import (
+    CSV,
+    DONE,
+    IMPORT_FORMATS,
+    NDJSON,
+    get_or_create_import_job,
+    run_import,
+)
+
+
+async def run(path, google_id, import_format, job_id, batch_size):
+    try:
+        job = await get_or_create_import_job(google_id, import_format, job_id)
+        print(
+            f"Import job {job.id}, resuming after record {job.records_done}"
+            if job_id
+            else f"Import job {job.id}"
+        )
+        with open(path, encoding="utf-8", newline="") as file:
+            report = await run_import(job, file, batch_size)
+        print(json.dumps(report, indent=2))
+        print(
+            f"{report['records']} records in {report['seconds']}s, "
+            f"{report['rows_per_second']} rows/s"
+        )
+        return 0 if report["status"] == DONE else 1
+    finally:
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("file")
+    parser.add_argument(
+        "--google-id", required=True, help="user the rows are imported for, must exist"
+    )
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="default: from the file extension")
+    parser.add_argument("--job-id", help="resume this import job")
+    parser.add_argument(
+        "--batch-size", type=int, help="rows per transaction (default: IMPORT_BATCH_SIZE)"
+    )
+    args = parser.parse_args()
+    import_format = args.format or (CSV if args.file.endswith(".csv") else NDJSON)
+    sys.exit(
+        asyncio.run(run(args.file, args.google_id, import_format, args.job_id, args.batch_size))
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Apply the pending schema migrations, see `app.api.config.migrations`.
+
+Run before deploying code that needs them (the app refuses to start on an outdated schema) with:
+    PYTHONPATH=. python scripts/migrate.py upgrade [--to VERSION]
+    PYTHONPATH=. python scripts/migrate.py status
+"""
+import argparse
+import sys
+import time
+
+from app.api.config.database_sqlite import engine
+from app.api.config.migrations import LATEST_VERSION, current_version, migrate, pending_migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=("upgrade", "status"))
+    parser.add_argument("--to", type=int, help=f"stop at this version (default: {LATEST_VERSION})")
+    args = parser.parse_args()
+
+    try:
+        with engine.connect() as connection:
+            version = current_version(connection)
+        pending = pending_migrations(version, args.to)
+        print(f"Schema at version {version}, latest is {LATEST_VERSION}")
+        if args.command == "status":
+            for migration in pending:
+                print(f"pending {migration.version}: {migration.description}")
+            return 1 if pending else 0
+
+        for migration in pending:
+            started = time.perf_counter()
+            migrate(engine, target=migration.version)
+            print(
+                f"applied {migration.version}: {migration.description} "
+                f"({time.perf_counter() - started:.1f} s)"
+            )
+        return 0
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,10 +3,10 @@ from datetime import datetime, timedelta, timezone
 from typing import List
 
 from sqlalchemy import Integer, case, cast, column, func
-from sqlalchemy.event import listens_for
-from sqlmodel import Session, SQLModel, select
+from sqlmodel import Session, select
 
 from app.api.config.database_sqlite import engine
+from app.api.config.migrations import migrate
 from app.api.models.nemo import (
     NemoAnalytics,
     NemoSettings,
@@ -14,7 +14,7 @@ from app.api.models.nemo import (
     NemoUserInformation,
 )
 
-SQLModel.metadata.create_all(engine)
+migrate(engine)
 
 
 def random_word(length):
@@ -51,16 +51,6 @@ def create_payload():
     }
 
 
-# This event listener will automatically create a settings entry when a new user is inserted.
-@listens_for(NemoUserInformation, "after_insert")
-def create_settings(mapper, connection, target: NemoUserInformation):
-    # Automatically create the related settings entry
-    print(f"==>> target: {target}")
-    connection.execute(
-        NemoSettings.__table__.insert().values({"google_id": target.google_id})
-    )
-
-
 def create_dummy_users():
     lst = [NemoUserInformation(**default_payload())]
     for _ in range(20):
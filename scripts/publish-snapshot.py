@@ -0,0 +1,32 @@
+"""Download the SQLite Cloud database and publish it as the read replica snapshot.
+
+Run periodically (e.g. from a scheduled job) with: PYTHONPATH=. python scripts/publish-snapshot.py
+"""
+import os
+import tempfile
+
+from sqlitecloud import dbapi2
+from sqlitecloud.download import download_db
+
+from app.api.config.database_sqlite import sqlite_url
+from app.api.config.replica import create_object_store_from_settings, publish_snapshot
+from app.api.config.settings import get_setting
+
+settings = get_setting()
+
+
+def main():
+    store = create_object_store_from_settings()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, settings.SQLITE_CLOUD_DB)
+        connection = dbapi2.connect(sqlite_url)
+        try:
+            download_db(connection.sqlitecloud_connection, settings.SQLITE_CLOUD_DB, db_path)
+        finally:
+            connection.close()
+        publish_snapshot(store, settings.SQLITE_CLOUD_DB, db_path)
+    print(f"Published snapshot {settings.SQLITE_CLOUD_DB}")
+
+
+if __name__ == "__main__":
+    main()
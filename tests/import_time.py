@@ -0,0 +1,125 @@
+"""Cold-start import cost of the Lambda handler, as reported by `python -X importtime`.
+
+Everything `main` imports is loaded before the first request is served, so the handler's
+import time and module count are kept under the budget in `IMPORT_BUDGET_FILE`, checked
+by `tests/test_import_time.py`. `scripts/import-time-report.py` lists the top offenders
+and records a new budget. Lives with the tests, so it isn't packaged with the app.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+HANDLER_IMPORT = "import main; main.handler"
+# the Lambda configuration, engines are created at import but don't connect until used
+HANDLER_ENV = {"ENV": "prod"}
+IMPORT_BUDGET_FILE = os.path.join(os.path.dirname(__file__), "import_budget.json")
+
+# slack recorded on top of a measurement, import time varies a lot between runs and machines
+BUDGET_EXTRA_MODULES = 15
+BUDGET_TIME_FACTOR = 1.5
+
+
+class ModuleImport(NamedTuple):
+    """One line of `-X importtime`, times in microseconds."""
+
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+class ImportProfile(NamedTuple):
+    modules: List[ModuleImport]
+
+    @property
+    def module_count(self) -> int:
+        return len(self.modules)
+
+    def cumulative_ms(self, name: str) -> float:
+        """Time spent importing `name` and everything it imported first."""
+        return next(module.cumulative_us for module in self.modules if module.name == name) / 1000
+
+    def imported(self, name: str) -> bool:
+        return any(
+            module.name == name or module.name.startswith(f"{name}.") for module in self.modules
+        )
+
+    def top_packages(self, limit: int = 15) -> List[Tuple[str, int]]:
+        """Top level packages by the time spent in their own modules, in microseconds."""
+        totals: Counter = Counter()
+        for module in self.modules:
+            totals[module.name.split(".")[0]] += module.self_us
+        return totals.most_common(limit)
+
+    def top_modules(self, limit: int = 15) -> List[ModuleImport]:
+        """Modules by cumulative time, i.e. including what they imported first."""
+        return sorted(self.modules, key=lambda module: module.cumulative_us, reverse=True)[:limit]
+
+
+def parse_importtime(output: str) -> ImportProfile:
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # the header
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append(ModuleImport(name.strip(), int(self_us), int(cumulative_us), depth))
+    return ImportProfile(modules)
+
+
+def profile_imports(
+    statement: str = HANDLER_IMPORT, env: Optional[Dict[str, str]] = None
+) -> ImportProfile:
+    """Run `statement` in a fresh interpreter and profile its imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        env={**os.environ, **HANDLER_ENV, **(env or {})},
+        check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def best_of(
+    runs: int, statement: str = HANDLER_IMPORT, env: Optional[Dict[str, str]] = None
+) -> ImportProfile:
+    """The fastest of `runs` profiles, the others are mostly noise from the machine."""
+    profiles = [profile_imports(statement, env) for _ in range(runs)]
+    return min(profiles, key=lambda profile: profile.cumulative_ms("main"))
+
+
+def load_budget(path: str = IMPORT_BUDGET_FILE) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def record_budget(profile: ImportProfile, path: str = IMPORT_BUDGET_FILE) -> Dict:
+    budget = {
+        "python": f"{sys.version_info.major}.{sys.version_info.minor}",
+        "modules": profile.module_count + BUDGET_EXTRA_MODULES,
+        "import_ms": round(profile.cumulative_ms("main") * BUDGET_TIME_FACTOR),
+    }
+    with open(path, "w") as f:
+        json.dump(budget, f, indent=2)
+        f.write("\n")
+    return budget
+
+
+def format_report(profile: ImportProfile, limit: int = 15) -> str:
+    lines = [f"main: {profile.cumulative_ms('main'):.1f} ms, {profile.module_count} modules", ""]
+    lines.append(f"{'package':<32} {'self ms':>9}")
+    for package, self_us in profile.top_packages(limit):
+        lines.append(f"{package:<32} {self_us / 1000:>9.1f}")
+    lines += ["", f"{'module':<48} {'cumulative ms':>14}"]
+    for module in profile.top_modules(limit):
+        lines.append(
+            f"{'  ' * module.depth + module.name:<48} {module.cumulative_us / 1000:>14.1f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,256 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import asyncio
+import json
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, func, select
+
+import app.api.models.nemo
+from app.api.config.database_sqlite import async_engine, async_session, engine
+from app.api.config.settings import get_setting
+from app.api.crud import account_deletion
+from app.api.crud.account_deletion import (
+    deletion_job_counts,
+    revoked_users,
+    run_deletion_job,
+    start_deletion,
+    sweep_deletion_jobs,
+)
+from app.api.crud.nemo import NemoDeta
+from app.api.models.nemo import NemoAnalytics, NemoDeletionJob, NemoTasks, NemoUserInformation
+from app.api.utils.nemo import create_access_token
+from main import app, handler
+
+GOOGLE_ID = "deletion_google_id"
+
+
+async def start(google_id):
+    async with async_session() as session:
+        job = await start_deletion(google_id, session)
+        await session.commit()
+    return job
+
+
+class TestAccountDeletion(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        SQLModel.metadata.create_all(engine)
+        cls.headers = {
+            "x-auth-token": create_access_token(
+                data={"email": "deletion@example.com", "google_id": GOOGLE_ID}
+            )
+        }
+        cls.chunk_size = get_setting().DELETION_CHUNK_SIZE
+        get_setting().DELETION_CHUNK_SIZE = 1000
+
+    @classmethod
+    def tearDownClass(cls):
+        get_setting().DELETION_CHUNK_SIZE = cls.chunk_size
+        SQLModel.metadata.drop_all(engine)
+        engine.dispose()
+        sqlite_file_name = os.getenv("TEST_SQLITE_FILE_NAME")
+        if os.path.exists(sqlite_file_name):
+            os.remove(sqlite_file_name)
+
+    def setUp(self):
+        self.client = TestClient(app)
+        now = datetime.now()
+        asyncio.run(
+            NemoDeta.upsert_user(
+                {
+                    "google_id": GOOGLE_ID,
+                    "email": "deletion@example.com",
+                    "given_name": "Gone",
+                    "created_at": now,
+                }
+            )
+        )
+        with Session(engine) as session:
+            session.add_all(
+                NemoAnalytics(google_id=GOOGLE_ID, created_at=now, duration=60, full_date=now)
+                for _ in range(2500)
+            )
+            session.add_all(
+                NemoTasks(
+                    google_id=GOOGLE_ID,
+                    created_at=now,
+                    task_date=now,
+                    task_description="t",
+                    duration=60,
+                )
+                for _ in range(1200)
+            )
+            session.commit()
+
+    def count(self, model):
+        with Session(engine) as session:
+            return session.exec(
+                select(func.count()).select_from(model).where(model.google_id == GOOGLE_ID)
+            ).one()
+
+    def test_access_is_revoked_and_rows_deleted_in_chunks(self):
+        job = asyncio.run(start(GOOGLE_ID))
+        self.assertEqual(job.status, "pending")
+        response = self.client.get("/nemo/settings", headers=self.headers)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()["detail"], "This account is being deleted.")
+
+        deletes = []
+
+        def record_delete(conn, cursor, statement, *args):
+            if statement.startswith("DELETE FROM nemo_analytics ") or statement.startswith(
+                "DELETE FROM nemo_tasks "
+            ):
+                deletes.append(statement)
+
+        event.listen(async_engine.sync_engine, "before_cursor_execute", record_delete)
+        try:
+            asyncio.run(run_deletion_job(job.id))
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", record_delete)
+
+        # analytics: 1000 + 1000 + 500, tasks: 1000 + 200
+        self.assertEqual(len(deletes), 5)
+        self.assertTrue(all("LIMIT" in statement for statement in deletes))
+
+        status = self.status(job.id).json()
+        self.assertEqual(
+            status,
+            {"job_id": job.id, "status": "done", "analytics_deleted": 2500, "tasks_deleted": 1200},
+        )
+        self.assertEqual(self.count(NemoAnalytics), 0)
+        self.assertEqual(self.count(NemoUserInformation), 0)
+        self.assertEqual(self.client.get("/nemo/settings", headers=self.headers).status_code, 404)
+
+    def status(self, job_id, headers=None):
+        return self.client.get(
+            "/nemo/delete/status", params={"job_id": job_id}, headers=headers or self.headers
+        )
+
+    def set_job(self, job_id, **values):
+        with Session(engine) as session:
+            stored = session.get(NemoDeletionJob, job_id)
+            for name, value in values.items():
+                setattr(stored, name, value)
+            session.add(stored)
+            session.commit()
+
+    def test_stale_job_is_resumed_by_the_sweep(self):
+        job = asyncio.run(start(GOOGLE_ID))
+        self.set_job(job.id, status="running", updated_at=datetime.now() - timedelta(hours=1))
+
+        # polling doesn't restart it
+        for _ in range(2):
+            status = self.status(job.id).json()
+            self.assertEqual(status["status"], "running")
+
+        self.assertEqual(
+            handler({"nemo_task": "sweep_deletion_jobs"}, None),
+            {"task": "sweep_deletion_jobs", "result": 1},
+        )
+        status = self.status(job.id).json()
+        self.assertEqual(status["status"], "done")
+        self.assertEqual(self.count(NemoTasks), 0)
+        self.assertFalse(asyncio.run(self.is_revoked()))
+
+    def test_failed_jobs_are_retried_until_the_last_attempt(self):
+        max_attempts = get_setting().DELETION_MAX_ATTEMPTS
+        job = asyncio.run(start(GOOGLE_ID))
+        # a job out of retries isn't run again and its user stays revoked
+        self.set_job(
+            job.id,
+            status="failed",
+            failed_attempts=max_attempts,
+            updated_at=datetime.now() - timedelta(hours=1),
+        )
+        self.assertEqual(asyncio.run(sweep_deletion_jobs()), 0)
+        self.assertTrue(asyncio.run(self.is_revoked()))
+        counts = asyncio.run(deletion_job_counts())
+        self.assertEqual((counts["failed"], counts["gave_up"]), (1, 1))
+        self.assertEqual(self.client.get("/health/deletion-jobs").json(), counts)
+
+        self.set_job(job.id, failed_attempts=max_attempts - 1)
+        self.assertEqual(asyncio.run(sweep_deletion_jobs()), 1)
+        self.assertEqual(self.count(NemoAnalytics), 0)
+        self.assertEqual(
+            asyncio.run(deletion_job_counts()),
+            {"pending": 0, "running": 0, "failed": 0, "gave_up": 0},
+        )
+
+    def test_recent_jobs_are_left_to_their_worker(self):
+        job = asyncio.run(start(GOOGLE_ID))
+        self.assertEqual(asyncio.run(sweep_deletion_jobs()), 0)
+        self.assertEqual(asyncio.run(deletion_job_counts())["pending"], 1)
+        asyncio.run(run_deletion_job(job.id))
+
+    def test_delete_hands_the_job_to_the_worker_function(self):
+        settings = get_setting()
+        worker_function = settings.DELETION_WORKER_FUNCTION
+        settings.DELETION_WORKER_FUNCTION = "nemo-app"
+        try:
+            with mock.patch.object(account_deletion, "_invoke_worker") as invoke_worker:
+                response = self.client.delete("/nemo/delete", headers=self.headers)
+        finally:
+            settings.DELETION_WORKER_FUNCTION = worker_function
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["job_id"]
+        invoke_worker.assert_called_once_with(
+            "nemo-app", json.dumps({"nemo_task": "run_deletion_job", "job_id": job_id})
+        )
+        # nothing was deleted within the request
+        status = self.status(job_id).json()
+        self.assertEqual(status["status"], "pending")
+        self.assertEqual(self.count(NemoTasks), 1200)
+
+        self.assertEqual(
+            handler({"nemo_task": "run_deletion_job", "job_id": job_id}, None),
+            {"task": "run_deletion_job", "result": None},
+        )
+        self.assertEqual(self.count(NemoTasks), 0)
+
+    async def is_revoked(self):
+        async with async_session() as session:
+            return await revoked_users.contains(GOOGLE_ID, session)
+
+    def test_unknown_job(self):
+        self.assertEqual(self.status("nope").status_code, 404)
+
+    def test_status_is_only_shown_to_the_deleted_user(self):
+        job = asyncio.run(start(GOOGLE_ID))
+        self.assertEqual(self.status(job.id).status_code, 200)
+        other = {
+            "x-auth-token": create_access_token(
+                data={"email": "other@example.com", "google_id": "other_google_id"}
+            )
+        }
+        self.assertEqual(self.status(job.id, headers=other).status_code, 404)
+        response = self.client.get("/nemo/delete/status", params={"job_id": job.id})
+        self.assertEqual(response.status_code, 404)
+        asyncio.run(run_deletion_job(job.id))
+
+    @mock.patch("app.api.routers.nemo.get_user_payload")
+    def test_login_is_refused_while_the_account_is_being_deleted(self, get_user_payload):
+        get_user_payload.return_value = {
+            "iss": "accounts.google.com",
+            "sub": GOOGLE_ID,
+            "email": "deletion@example.com",
+            "given_name": "Gone",
+            "email_verified": True,
+        }
+        job = asyncio.run(start(GOOGLE_ID))
+        revoked_users.discard(GOOGLE_ID)  # as on an instance that hasn't reloaded yet
+        response = self.client.post("/nemo/login", json={"google_token": "token"})
+        self.assertEqual(response.status_code, 403)
+
+        asyncio.run(run_deletion_job(job.id))
+        response = self.client.post("/nemo/login", json={"google_token": "token"})
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,114 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import asyncio
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, select
+
+import app.api.models.nemo
+from app.api.config.database_sqlite import async_engine, async_session, engine
+from app.api.config.settings import get_setting
+from app.api.crud.analytics_rollup import check_consistency
+from app.api.crud.nemo import NemoDeta
+from app.api.models.nemo import NemoAnalytics
+from app.api.utils.nemo import create_access_token
+from main import app
+
+GOOGLE_ID = "batch_google_id"
+
+
+class TestAnalyticsBatch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        SQLModel.metadata.create_all(engine)
+        asyncio.run(
+            NemoDeta.upsert_user(
+                {
+                    "google_id": GOOGLE_ID,
+                    "email": "batch@example.com",
+                    "given_name": "Batch",
+                    "created_at": datetime.now(),
+                }
+            )
+        )
+        cls.headers = {
+            "x-auth-token": create_access_token(
+                data={"email": "batch@example.com", "google_id": GOOGLE_ID}
+            )
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        SQLModel.metadata.drop_all(engine)
+        engine.dispose()
+        sqlite_file_name = os.getenv("TEST_SQLITE_FILE_NAME")
+        if os.path.exists(sqlite_file_name):
+            os.remove(sqlite_file_name)
+
+    def setUp(self):
+        self.client = TestClient(app)
+        self.inserts = []
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self.record_insert)
+
+    def tearDown(self):
+        event.remove(async_engine.sync_engine, "before_cursor_execute", self.record_insert)
+
+    def record_insert(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT"):
+            self.inserts.append((statement, executemany))
+
+    def test_batch_with_client_timestamps(self):
+        now = datetime.now()
+        sessions = [
+            {"duration": 1500, "created_at": (now - timedelta(hours=3)).isoformat()},
+            {"duration": 900, "created_at": (now - timedelta(days=1)).isoformat()},
+            {"duration": -5, "created_at": now.isoformat()},
+            {"duration": 600, "created_at": (now + timedelta(days=1)).isoformat()},
+            {"duration": 300, "created_at": datetime.now(timezone.utc).isoformat()},
+        ]
+        response = self.client.post("/nemo/analytics/batch", json=sessions, headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.text)
+        body = response.json()
+
+        self.assertEqual((body["created"], body["rejected"]), (3, 2))
+        self.assertEqual(
+            [result["success"] for result in body["results"]], [True, True, False, False, True]
+        )
+        self.assertEqual(body["results"][2]["error"], "duration must be positive")
+        self.assertEqual(body["results"][3]["error"], "created_at is in the future")
+        # one multi-row insert for the raw rows and one for the rollup
+        self.assertEqual(len(self.inserts), 2)
+        self.assertFalse(any(executemany for _, executemany in self.inserts))
+
+        with Session(engine) as session:
+            stored = session.exec(
+                select(NemoAnalytics.created_at).where(NemoAnalytics.google_id == GOOGLE_ID)
+            ).all()
+        self.assertIn(now - timedelta(days=1), stored)
+
+        async def check():
+            async with async_session() as session:
+                return await check_consistency(session, GOOGLE_ID)
+
+        self.assertEqual(asyncio.run(check()), [])
+
+    def test_batch_size_limit(self):
+        settings = get_setting()
+        max_size = settings.ANALYTICS_BATCH_MAX_SIZE
+        settings.ANALYTICS_BATCH_MAX_SIZE = 2
+        try:
+            sessions = [{"duration": 60, "created_at": datetime.now().isoformat()}] * 3
+            response = self.client.post(
+                "/nemo/analytics/batch", json=sessions, headers=self.headers
+            )
+        finally:
+            settings.ANALYTICS_BATCH_MAX_SIZE = max_size
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.inserts, [])
@@ -0,0 +1,126 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, SQLModel, delete, select
+
+import app.api.models.nemo
+from app.api.config.database_sqlite import async_session, engine
+from app.api.crud.analytics_rollup import backfill, check_consistency
+from app.api.crud.nemo import NemoDeta
+from app.api.models.nemo import NemoAnalytics, NemoAnalyticsDaily
+
+GOOGLE_ID = "rollup_google_id"
+
+
+async def run_with_session(function, *args):
+    async with async_session() as session:
+        return await function(session, *args)
+
+
+class TestAnalyticsRollup(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        SQLModel.metadata.create_all(engine)
+        asyncio.run(
+            NemoDeta.upsert_user(
+                {
+                    "google_id": GOOGLE_ID,
+                    "email": "rollup@example.com",
+                    "given_name": "Rollup",
+                    "created_at": datetime.now(),
+                }
+            )
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        SQLModel.metadata.drop_all(engine)
+        engine.dispose()
+        sqlite_file_name = os.getenv("TEST_SQLITE_FILE_NAME")
+        if os.path.exists(sqlite_file_name):
+            os.remove(sqlite_file_name)
+
+    def setUp(self):
+        with Session(engine) as session:
+            session.exec(delete(NemoAnalytics))
+            session.exec(delete(NemoAnalyticsDaily))
+            session.commit()
+
+    def insert(self, created_at, duration):
+        asyncio.run(
+            NemoDeta.insert_analytic(
+                {
+                    "google_id": GOOGLE_ID,
+                    "created_at": created_at,
+                    "duration": duration,
+                    "full_date": created_at,
+                }
+            )
+        )
+
+    def test_insert_maintains_rollup(self):
+        now = datetime.now().replace(hour=12)
+        self.insert(now, 600)
+        self.insert(now + timedelta(minutes=30), 1500)
+        self.insert(now + timedelta(minutes=60), 900)
+        self.insert(now - timedelta(days=1), 300)
+
+        with Session(engine) as session:
+            today = session.exec(
+                select(NemoAnalyticsDaily).where(NemoAnalyticsDaily.day == now.date())
+            ).one()
+        self.assertEqual(today.total_duration, 3000)
+        self.assertEqual(today.session_count, 3)
+        self.assertEqual(today.max_session, 1500)
+        self.assertEqual(today.max_session_at, now + timedelta(minutes=30))
+        self.assertEqual(asyncio.run(run_with_session(check_consistency)), [])
+
+        best = asyncio.run(NemoDeta.analytics_get_best_day(GOOGLE_ID))
+        self.assertEqual(best["best_day_duration"], 3000)
+        self.assertEqual(best["best_session_duration"], 1500)
+
+        analytics = asyncio.run(NemoDeta.get_analytics(GOOGLE_ID))
+        self.assertEqual(sorted(row["total_count"] for row in analytics), [300, 3000])
+
+    def test_checker_finds_drift_and_backfill_repairs_it(self):
+        now = datetime.now()
+        self.insert(now, 600)
+        # raw rows written without going through insert_analytic
+        with Session(engine) as session:
+            session.add(
+                NemoAnalytics(google_id=GOOGLE_ID, created_at=now, duration=400, full_date=now)
+            )
+            session.commit()
+
+        mismatches = asyncio.run(run_with_session(check_consistency, GOOGLE_ID))
+        self.assertEqual(len(mismatches), 1)
+        self.assertEqual(mismatches[0]["raw"]["total_duration"], 1000)
+        self.assertEqual(mismatches[0]["rollup"]["total_duration"], 600)
+
+        self.assertEqual(asyncio.run(run_with_session(backfill, GOOGLE_ID)), 1)
+        self.assertEqual(asyncio.run(run_with_session(check_consistency, GOOGLE_ID)), [])
+        self.assertEqual(
+            asyncio.run(NemoDeta.analytics_get_current_goal(GOOGLE_ID)), {"current_goal": 1000}
+        )
+
+    def test_checker_compares_when_the_longest_session_was(self):
+        now = datetime.now().replace(hour=12)
+        self.insert(now, 600)
+        self.insert(now + timedelta(minutes=30), 1500)
+        with Session(engine) as session:
+            day = session.exec(select(NemoAnalyticsDaily)).one()
+            day.max_session_at = now
+            session.add(day)
+            session.commit()
+
+        mismatches = asyncio.run(run_with_session(check_consistency, GOOGLE_ID))
+        self.assertEqual(len(mismatches), 1)
+        self.assertEqual(mismatches[0]["raw"]["max_session_at"], now + timedelta(minutes=30))
+        self.assertEqual(mismatches[0]["rollup"]["max_session_at"], now)
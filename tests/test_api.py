@@ -75,7 +75,12 @@ class TestApp(unittest.TestCase):
     @patch("app.api.routers.nemo.check_google_user")
     @patch("app.api.routers.nemo.get_user_payload")
     def test_existing_user(self, mock_get_user_payload, mock_check_google_user):
-        mock_get_user_payload.return_value = {"sub": "test_google_id"}
+        mock_get_user_payload.return_value = {
+            "sub": "test_google_id",
+            "email": "test@example.com",
+            "given_name": "Test",
+            "email_verified": True,
+        }
         mock_check_google_user.return_value = True
         # Mocking the payload returned by get_user_payload
         auth = GoogleAuth(google_token="dummy_google_token")
@@ -110,11 +115,14 @@ class TestApp(unittest.TestCase):
             "/nemo/settings", json=new_settings, headers=headers
         )
         self.assertEqual(response.status_code, 200)
-        self.assertDictEqual(response.json(), new_settings)
+        # the response is the stored row, not an echo of the request
+        updated_settings = response.json()
+        self.assertDictEqual({k: updated_settings[k] for k in new_settings}, new_settings)
 
         # get updated settings and check if they are updated
         response = self.client.get("/nemo/settings", headers=headers)
         resp_data = response.json()
+        self.assertDictEqual(resp_data, updated_settings)
         resp_data.pop("google_id")
 
         self.assertEqual(response.status_code, 200)
@@ -252,10 +260,17 @@ class TestApp(unittest.TestCase):
     def test_remove_user(self):
         headers = {"x-auth-token": TestApp.access_token}
         response = self.client.delete("nemo/delete", headers=headers)
-        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.status_code, 202)
         self.assertIsInstance(response.json(), dict)
         self.assertEqual(response.json()["success"], True)
 
+        # the test client runs the background deletion before returning
+        response = self.client.get(
+            "nemo/delete/status", params={"job_id": response.json()["job_id"]}, headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "done")
+
     @pytest.mark.order(15)
     def test_invalid_token(self):
         headers = {"x-auth-token": "invalid_token"}
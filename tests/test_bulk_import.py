@@ -0,0 +1,301 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import asyncio
+import json
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, func, select
+
+import app.api.models.nemo
+from app.api.config.database_sqlite import async_session, engine
+from app.api.config.settings import get_setting
+from app.api.crud import account_deletion, bulk_import
+from app.api.crud.analytics_rollup import check_consistency
+from app.api.crud.nemo import NemoDeta
+from app.api.models.nemo import NemoAnalytics, NemoImportJob, NemoTasks
+from app.api.utils.nemo import create_access_token
+from main import app, handler
+
+SOURCE_GOOGLE_ID = "import_source_google_id"
+ANALYTICS_ROWS = 45
+TASK_ROWS = 12
+
+
+def _create_user(google_id):
+    asyncio.run(
+        NemoDeta.upsert_user(
+            {
+                "google_id": google_id,
+                "email": f"{google_id}@example.com",
+                "given_name": "Import",
+                "created_at": datetime(2024, 1, 1),
+            }
+        )
+    )
+
+
+def _headers(google_id):
+    return {
+        "x-auth-token": create_access_token(
+            data={"email": f"{google_id}@example.com", "google_id": google_id}
+        )
+    }
+
+
+def _count(model, google_id):
+    with Session(engine) as session:
+        return session.exec(
+            select(func.count()).select_from(model).where(model.google_id == google_id)
+        ).one()
+
+
+async def _consistency(google_id):
+    async with async_session() as session:
+        return await check_consistency(session, google_id)
+
+
+class TestBulkImport(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        SQLModel.metadata.create_all(engine)
+        _create_user(SOURCE_GOOGLE_ID)
+        start = datetime(2024, 3, 1, 7)
+        with Session(engine) as session:
+            for i in range(ANALYTICS_ROWS):
+                created_at = start + timedelta(hours=7 * i)
+                session.add(
+                    NemoAnalytics(
+                        google_id=SOURCE_GOOGLE_ID,
+                        created_at=created_at,
+                        full_date=created_at,
+                        duration=60 + i,
+                    )
+                )
+            for i in range(TASK_ROWS):
+                created_at = start + timedelta(hours=11 * i)
+                session.add(
+                    NemoTasks(
+                        google_id=SOURCE_GOOGLE_ID,
+                        created_at=created_at,
+                        task_date=created_at,
+                        task_description=f"task, {i}\nline two",
+                        duration=i,
+                    )
+                )
+            session.commit()
+
+        cls.client = TestClient(app)
+        cls.exports = {
+            export_format: cls.client.get(
+                "/nemo/export", params={"format": export_format}, headers=_headers(SOURCE_GOOGLE_ID)
+            ).content
+            for export_format in ("ndjson", "csv")
+        }
+        cls.batch_size = get_setting().IMPORT_BATCH_SIZE
+        get_setting().IMPORT_BATCH_SIZE = 10
+
+    @classmethod
+    def tearDownClass(cls):
+        get_setting().IMPORT_BATCH_SIZE = cls.batch_size
+        SQLModel.metadata.drop_all(engine)
+        engine.dispose()
+        sqlite_file_name = os.getenv("TEST_SQLITE_FILE_NAME")
+        if os.path.exists(sqlite_file_name):
+            os.remove(sqlite_file_name)
+
+    def _import(self, google_id, body, **params):
+        return self.client.post(
+            "/nemo/import", params=params, content=body, headers=_headers(google_id)
+        )
+
+    def test_round_trip_of_an_export(self):
+        for export_format in ("ndjson", "csv"):
+            with self.subTest(export_format=export_format):
+                google_id = f"import_{export_format}_google_id"
+                _create_user(google_id)
+
+                response = self._import(
+                    google_id, self.exports[export_format], format=export_format
+                )
+                self.assertEqual(response.status_code, 200, response.text)
+                report = response.json()
+                self.assertEqual(report["status"], "done")
+                self.assertEqual(report["analytics_inserted"], ANALYTICS_ROWS)
+                self.assertEqual(report["tasks_inserted"], TASK_ROWS)
+                self.assertEqual(report["invalid_rows"], 0)
+                self.assertEqual(report["records"], ANALYTICS_ROWS + TASK_ROWS + 2)
+                self.assertIsNotNone(report["rows_per_second"])
+
+                self.assertEqual(_count(NemoAnalytics, google_id), ANALYTICS_ROWS)
+                self.assertEqual(_count(NemoTasks, google_id), TASK_ROWS)
+                self.assertEqual(asyncio.run(_consistency(google_id)), [])
+                with Session(engine) as session:
+                    task = session.exec(
+                        select(NemoTasks)
+                        .where(NemoTasks.google_id == google_id)
+                        .order_by(NemoTasks.created_at)
+                    ).first()
+                self.assertEqual(task.task_description, "task, 0\nline two")
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        google_id = "import_invalid_google_id"
+        _create_user(google_id)
+        lines = [
+            {
+                "type": "analytics",
+                "created_at": "2024-01-01T10:00:00",
+                "full_date": "2024-01-01T10:00:00",
+                "duration": 60,
+            },
+            {
+                "type": "analytics",
+                "created_at": "yesterday",
+                "full_date": "2024-01-01T10:00:00",
+                "duration": 60,
+            },
+            {
+                "type": "task",
+                "created_at": "2024-01-01T10:00:00",
+                "task_date": "2024-01-01T10:00:00",
+                "duration": 5,
+            },
+            {"type": "note", "text": "hello"},
+        ]
+        body = "\n".join(json.dumps(line) for line in lines) + "\nnot json\n"
+
+        response = self._import(google_id, body)
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual(report["analytics_inserted"], 1)
+        self.assertEqual(report["tasks_inserted"], 0)
+        self.assertEqual(report["invalid_rows"], 4)
+        self.assertEqual([error["record"] for error in report["errors"]], [2, 3, 4, 5])
+        self.assertIn("created_at", report["errors"][0]["error"])
+        self.assertIn("task_description", report["errors"][1]["error"])
+
+    def test_resume_after_a_failed_batch(self):
+        google_id = "import_resume_google_id"
+        _create_user(google_id)
+        write_batch = bulk_import._write_batch
+        calls = []
+
+        async def fail_third_batch(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 3:
+                raise RuntimeError("connection lost")
+            return await write_batch(*args, **kwargs)
+
+        with mock.patch.object(bulk_import, "_write_batch", fail_third_batch):
+            response = self._import(google_id, self.exports["ndjson"])
+        self.assertEqual(response.status_code, 500)
+        report = response.json()
+        self.assertEqual(report["status"], "failed")
+        self.assertEqual(report["error"], "connection lost")
+        # two batches of 10 rows, after the account and settings records
+        self.assertEqual(report["records_done"], 22)
+        self.assertEqual(_count(NemoAnalytics, google_id), 20)
+
+        response = self._import(google_id, self.exports["ndjson"], job_id=report["job_id"])
+        self.assertEqual(response.status_code, 200, response.text)
+        resumed = response.json()
+        self.assertEqual(resumed["status"], "done")
+        self.assertEqual(resumed["records"], ANALYTICS_ROWS + TASK_ROWS - 20)
+        self.assertEqual(resumed["analytics_inserted"], ANALYTICS_ROWS)
+        self.assertEqual(resumed["tasks_inserted"], TASK_ROWS)
+        self.assertEqual(_count(NemoAnalytics, google_id), ANALYTICS_ROWS)
+        self.assertEqual(_count(NemoTasks, google_id), TASK_ROWS)
+        self.assertEqual(asyncio.run(_consistency(google_id)), [])
+
+        # a finished job doesn't import the file twice
+        response = self._import(google_id, self.exports["ndjson"], job_id=report["job_id"])
+        self.assertEqual(response.json()["records"], 0)
+        self.assertEqual(_count(NemoAnalytics, google_id), ANALYTICS_ROWS)
+
+    def test_unknown_job_and_format(self):
+        response = self._import(SOURCE_GOOGLE_ID, b"", job_id="missing")
+        self.assertEqual(response.status_code, 404)
+        response = self._import(SOURCE_GOOGLE_ID, b"", format="xml")
+        self.assertEqual(response.status_code, 400)
+
+    def test_jobs_are_removed_with_the_user(self):
+        google_id = "import_removed_google_id"
+        _create_user(google_id)
+        self.assertEqual(self._import(google_id, self.exports["ndjson"]).status_code, 200)
+        asyncio.run(NemoDeta.remove_user(google_id))
+        self.assertEqual(_count(NemoImportJob, google_id), 0)
+
+    def test_a_running_job_is_not_run_twice(self):
+        google_id = "import_claimed_google_id"
+        _create_user(google_id)
+        job = asyncio.run(bulk_import.get_or_create_import_job(google_id, "ndjson"))
+        self.assertIsNotNone(asyncio.run(bulk_import.claim_import_job(job.id, google_id)))
+        self.assertIsNone(asyncio.run(bulk_import.claim_import_job(job.id, google_id)))
+
+        response = self._import(google_id, self.exports["ndjson"], job_id=job.id)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(_count(NemoAnalytics, google_id), 0)
+
+        # a run that stopped committing batches was cut short and can be taken over
+        settings = get_setting()
+        stale_after = settings.IMPORT_JOB_STALE_AFTER
+        settings.IMPORT_JOB_STALE_AFTER = 0
+        try:
+            response = self._import(google_id, self.exports["ndjson"], job_id=job.id)
+        finally:
+            settings.IMPORT_JOB_STALE_AFTER = stale_after
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(_count(NemoAnalytics, google_id), ANALYTICS_ROWS)
+
+    def test_large_imports_are_run_by_the_worker(self):
+        google_id = "import_worker_google_id"
+        _create_user(google_id)
+        settings = get_setting()
+        overridden = {
+            name: getattr(settings, name)
+            for name in (
+                "DELETION_WORKER_FUNCTION", "IMPORT_INLINE_MAX_BYTES", "SQLITE_SNAPSHOT_STORE"
+            )
+        }
+        with tempfile.TemporaryDirectory() as store_dir:
+            settings.DELETION_WORKER_FUNCTION = "nemo-app"
+            settings.IMPORT_INLINE_MAX_BYTES = 100
+            settings.SQLITE_SNAPSHOT_STORE = store_dir
+            try:
+                with mock.patch.object(account_deletion, "_invoke_worker") as invoke_worker:
+                    response = self._import(google_id, self.exports["ndjson"])
+                self.assertEqual(response.status_code, 202, response.text)
+                job_id = response.json()["job_id"]
+                invoke_worker.assert_called_once_with(
+                    "nemo-app", json.dumps({"nemo_task": "run_import_job", "job_id": job_id})
+                )
+                # nothing was imported within the request
+                self.assertEqual(_count(NemoAnalytics, google_id), 0)
+                status = self.client.get(
+                    "/nemo/import/status", params={"job_id": job_id}, headers=_headers(google_id)
+                ).json()
+                self.assertEqual(status["status"], "pending")
+
+                report = handler({"nemo_task": "run_import_job", "job_id": job_id}, None)
+                self.assertEqual(report["result"]["status"], "done")
+                self.assertEqual(_count(NemoAnalytics, google_id), ANALYTICS_ROWS)
+                self.assertEqual(_count(NemoTasks, google_id), TASK_ROWS)
+                self.assertFalse(os.path.exists(os.path.join(store_dir, "imports", job_id)))
+                # a repeated event finds the job done
+                report = handler({"nemo_task": "run_import_job", "job_id": job_id}, None)
+                self.assertIsNone(report["result"])
+            finally:
+                for name, value in overridden.items():
+                    setattr(settings, name, value)
+
+        status = self.client.get(
+            "/nemo/import/status", params={"job_id": job_id}, headers=_headers(SOURCE_GOOGLE_ID)
+        )
+        self.assertEqual(status.status_code, 404)
@@ -0,0 +1,215 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import asyncio
+import gzip
+import unittest
+import zlib
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel
+
+import app.api.models.nemo
+from app.api.config.compression import (
+    BROTLI,
+    GZIP,
+    CompressionMiddleware,
+    brotli,
+    compression,
+    negotiate,
+)
+from app.api.config.database_sqlite import engine
+from app.api.crud.nemo import NemoDeta
+from app.api.utils.etag import encoded_etag
+from app.api.utils.nemo import create_access_token
+from main import app
+
+GOOGLE_ID = "compression_google_id"
+
+
+def streaming_app(chunks, min_size=1024):
+    api = FastAPI()
+
+    @api.get("/stream")
+    async def stream():
+        return StreamingResponse(iter(chunks), media_type="application/x-ndjson")
+
+    @api.get("/small", dependencies=[compression(gzip_level=0, min_size=0)])
+    async def small():
+        return {"message": "tiny"}
+
+    @api.get("/binary")
+    async def binary():
+        return PlainTextResponse(b"x" * 4096, media_type="application/octet-stream")
+
+    api.add_middleware(CompressionMiddleware, min_size=min_size)
+    return api
+
+
+class TestCompression(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        SQLModel.metadata.create_all(engine)
+        asyncio.run(
+            NemoDeta.upsert_user(
+                {
+                    "google_id": GOOGLE_ID,
+                    "email": "compression@example.com",
+                    "given_name": "Zip",
+                    "created_at": datetime.now(),
+                }
+            )
+        )
+        now = datetime.now()
+        tasks = [
+            {
+                "created_at": now - timedelta(hours=i),
+                "task_date": now,
+                "task_description": f"task {i}",
+                "duration": 1500,
+            }
+            for i in range(50)
+        ]
+        asyncio.run(NemoDeta.insert_tasks(GOOGLE_ID, tasks))
+        cls.headers = {
+            "x-auth-token": create_access_token(
+                data={"email": "compression@example.com", "google_id": GOOGLE_ID}
+            )
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        SQLModel.metadata.drop_all(engine)
+        engine.dispose()
+        sqlite_file_name = os.getenv("TEST_SQLITE_FILE_NAME")
+        if os.path.exists(sqlite_file_name):
+            os.remove(sqlite_file_name)
+
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def get(self, path, accept_encoding):
+        return self.client.get(path, headers={**self.headers, "Accept-Encoding": accept_encoding})
+
+    def test_negotiation(self):
+        self.assertIsNone(negotiate(None))
+        self.assertIsNone(negotiate("identity"))
+        self.assertIsNone(negotiate("gzip;q=0"))
+        self.assertEqual(negotiate("gzip, deflate"), GZIP)
+        self.assertEqual(negotiate("*"), BROTLI if brotli else GZIP)
+        self.assertEqual(negotiate("br;q=0.5, gzip;q=0.8"), GZIP)
+        if brotli:
+            self.assertEqual(negotiate("gzip, deflate, br"), BROTLI)
+
+    def test_large_bodies_are_compressed(self):
+        plain = self.get("/nemo/get-tasks", "identity")
+        compressed = self.get("/nemo/get-tasks", "gzip")
+        self.assertNotIn("content-encoding", plain.headers)
+        self.assertEqual(compressed.headers["content-encoding"], "gzip")
+        self.assertEqual(compressed.headers["vary"], "Accept-Encoding")
+        # the client decodes the body, the length header is the one of what went over the wire
+        self.assertEqual(compressed.content, plain.content)
+        self.assertLess(int(compressed.headers["content-length"]), len(plain.content) // 3)
+        # a different representation with a strong validator of its own
+        self.assertEqual(compressed.headers["etag"], encoded_etag(plain.headers["etag"], "gzip"))
+
+    def test_conditional_get_of_a_compressed_response(self):
+        etag = self.get("/nemo/get-tasks", "gzip").headers["etag"]
+        response = self.client.get(
+            "/nemo/get-tasks",
+            headers={**self.headers, "Accept-Encoding": "gzip", "If-None-Match": etag},
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["etag"], etag)
+        self.assertEqual(response.headers["vary"], "Accept-Encoding")
+
+    @unittest.skipIf(brotli is None, "brotli isn't installed")
+    def test_brotli(self):
+        plain = self.get("/nemo/get-tasks", "identity")
+        response = self.get("/nemo/get-tasks", "gzip, br")
+        self.assertEqual(response.headers["content-encoding"], "br")
+        self.assertEqual(response.content, plain.content)
+
+    def test_small_bodies_are_sent_as_is(self):
+        response = self.get("/nemo/settings", "gzip")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.headers["vary"], "Accept-Encoding")
+
+    def test_uncompressed_responses_vary_on_accept_encoding(self):
+        for accept_encoding in ("identity", ""):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.get("/nemo/get-tasks", accept_encoding)
+                self.assertNotIn("content-encoding", response.headers)
+                self.assertEqual(response.headers["vary"], "Accept-Encoding")
+                self.assertNotIn("-", response.headers["etag"])
+
+    def test_streamed_response_is_compressed_chunk_by_chunk(self):
+        chunks = [
+            f'{{"type":"task","id":{i},"task_description":"task {i}"}}\n'.encode() * 40
+            for i in range(5)
+        ]
+        messages = []
+
+        async def stream(scope, receive, send):
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [(b"content-type", b"application/x-ndjson")],
+                }
+            )
+            for chunk in chunks:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def send(message):
+            messages.append(message)
+
+        middleware = CompressionMiddleware(stream, min_size=1024)
+        asyncio.run(
+            middleware({"type": "http", "headers": [(b"accept-encoding", b"gzip")]}, None, send)
+        )
+
+        headers = dict(messages[0]["headers"])
+        self.assertEqual(headers[b"content-encoding"], b"gzip")
+        self.assertNotIn(b"content-length", headers)
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        decoded = [decoder.decompress(message["body"]) for message in messages[1:]]
+        # every chunk can be decoded as soon as it arrives thanks to the flush
+        self.assertEqual(decoded[:len(chunks)], chunks)
+        self.assertEqual(b"".join(decoded), b"".join(chunks))
+        self.assertTrue(decoder.eof)
+
+    def test_streamed_response_below_the_threshold(self):
+        chunks = [b'{"id":1}\n', b'{"id":2}\n']
+        response = TestClient(streaming_app(chunks)).get(
+            "/stream", headers={"Accept-Encoding": "gzip"}
+        )
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.content, b"".join(chunks))
+
+    def test_route_options(self):
+        client = TestClient(streaming_app([], min_size=1024))
+        with client.stream("GET", "/small", headers={"Accept-Encoding": "gzip"}) as response:
+            raw = b"".join(response.iter_raw())
+        # min_size=0 compresses even this, level 0 only wraps it in a gzip container
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(gzip.decompress(raw), b'{"message":"tiny"}')
+        self.assertGreater(len(raw), len(b'{"message":"tiny"}'))
+
+    def test_other_content_types_are_sent_as_is(self):
+        response = TestClient(streaming_app([])).get("/binary", headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertNotIn("vary", response.headers)
+        self.assertEqual(len(response.content), 4096)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import SQLModel
+
+import app.api.models.nemo
+from app.api.config.database_sqlite import async_engine, engine
+from app.api.crud.nemo import DASHBOARD_FIELDS, NemoDeta
+from app.api.utils.nemo import create_access_token
+from main import app
+
+GOOGLE_ID = "dashboard_google_id"
+
+
+class TestDashboard(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        SQLModel.metadata.create_all(engine)
+        asyncio.run(
+            NemoDeta.upsert_user(
+                {
+                    "google_id": GOOGLE_ID,
+                    "email": "dashboard@example.com",
+                    "given_name": "Dash",
+                    "profile_pic": "https://example.com/dash.png",
+                    "created_at": datetime.now(),
+                }
+            )
+        )
+        now = datetime.now()
+        for days_ago, duration in ((0, 1500), (0, 600), (2, 2400), (3, 300)):
+            created_at = now - timedelta(days=days_ago)
+            asyncio.run(
+                NemoDeta.insert_analytic(
+                    {
+                        "google_id": GOOGLE_ID,
+                        "created_at": created_at,
+                        "duration": duration,
+                        "full_date": created_at,
+                    }
+                )
+            )
+            asyncio.run(
+                NemoDeta.insert_new_task(
+                    {"google_id": GOOGLE_ID, "created_at": created_at, "task_date": created_at,
+                     "task_description": f"task {days_ago}", "duration": duration}
+                )
+            )
+        cls.headers = {
+            "x-auth-token": create_access_token(
+                data={"email": "dashboard@example.com", "google_id": GOOGLE_ID}
+            )
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        SQLModel.metadata.drop_all(engine)
+        engine.dispose()
+        sqlite_file_name = os.getenv("TEST_SQLITE_FILE_NAME")
+        if os.path.exists(sqlite_file_name):
+            os.remove(sqlite_file_name)
+
+    def setUp(self):
+        self.client = TestClient(app)
+        self.statements = []
+        self.version_lookups = 0
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self.count_statement)
+
+    def tearDown(self):
+        event.remove(async_engine.sync_engine, "before_cursor_execute", self.count_statement)
+
+    def count_statement(self, conn, cursor, statement, *args):
+        # the ETag check's version lookup is counted on its own
+        if "FROM nemo_user_versions" in statement:
+            self.version_lookups += 1
+            return
+        self.statements.append(statement)
+
+    def get(self, url):
+        response = self.client.get(url, headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
+
+    def test_dashboard_matches_individual_routes(self):
+        dashboard = self.get("/nemo/dashboard")
+        self.assertEqual(set(dashboard), set(DASHBOARD_FIELDS))
+        self.assertLessEqual(len(self.statements), 3)
+        self.assertEqual(self.version_lookups, 1)
+
+        self.assertEqual(dashboard["settings"], self.get("/nemo/settings"))
+        self.assertEqual(dashboard["account"], self.get("/nemo/account"))
+        self.assertEqual(dashboard["user_image"], self.get("/nemo/user-image"))
+        self.assertEqual(dashboard["analytics"], self.get("/nemo/analytics"))
+        self.assertEqual(dashboard["best_day"], self.get("/nemo/statistics/best-day"))
+        self.assertEqual(dashboard["current_goal"], self.get("/nemo/statistics/current-goal"))
+        self.assertEqual(dashboard["tasks"], self.get("/nemo/get-tasks"))
+        self.assertEqual(dashboard["current_goal"], {"current_goal": 2100})
+
+    def test_fields_filter(self):
+        dashboard = self.get("/nemo/dashboard?fields=account,current_goal")
+        self.assertEqual(set(dashboard), {"account", "current_goal"})
+        self.assertEqual(len(self.statements), 2)
+
+        response = self.client.get("/nemo/dashboard?fields=account,nope", headers=self.headers)
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,162 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import asyncio
+import unittest
+from datetime import date, datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import SQLModel
+
+import app.api.models.nemo
+from app.api.config.database_sqlite import async_engine, engine
+from app.api.crud.nemo import NemoDeta
+from app.api.utils.etag import encoded_etag, etag_matches, make_etag
+from app.api.utils.nemo import create_access_token
+from main import app
+
+GOOGLE_ID = "etag_google_id"
+ROUTES = (
+    "/nemo/settings",
+    "/nemo/account",
+    "/nemo/user-image",
+    "/nemo/analytics",
+    "/nemo/statistics/best-day",
+    "/nemo/get-tasks",
+    "/nemo/tasks/history",
+    "/nemo/dashboard",
+)
+
+
+class TestETag(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        SQLModel.metadata.create_all(engine)
+        asyncio.run(
+            NemoDeta.upsert_user(
+                {
+                    "google_id": GOOGLE_ID,
+                    "email": "etag@example.com",
+                    "given_name": "ETag",
+                    "created_at": datetime.now(),
+                }
+            )
+        )
+        cls.headers = {
+            "x-auth-token": create_access_token(
+                data={"email": "etag@example.com", "google_id": GOOGLE_ID}
+            )
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        SQLModel.metadata.drop_all(engine)
+        engine.dispose()
+        sqlite_file_name = os.getenv("TEST_SQLITE_FILE_NAME")
+        if os.path.exists(sqlite_file_name):
+            os.remove(sqlite_file_name)
+
+    def setUp(self):
+        self.client = TestClient(app)
+        self.statements = []
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self.count_statement)
+
+    def tearDown(self):
+        event.remove(async_engine.sync_engine, "before_cursor_execute", self.count_statement)
+
+    def count_statement(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def get(self, path, etag=None):
+        headers = dict(self.headers)
+        if etag is not None:
+            headers["If-None-Match"] = etag
+        return self.client.get(path, headers=headers)
+
+    def test_matching_etag_skips_the_query(self):
+        for path in ROUTES:
+            with self.subTest(path=path):
+                response = self.get(path)
+                self.assertEqual(response.status_code, 200)
+                etag = response.headers["etag"]
+                self.assertTrue(etag.startswith('"'))
+                self.assertEqual(response.headers["cache-control"], "private, no-cache")
+
+                self.statements.clear()
+                response = self.get(path, etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b"")
+                self.assertEqual(response.headers["etag"], etag)
+                self.assertEqual(len(self.statements), 1)
+                self.assertIn("FROM nemo_user_versions", self.statements[0])
+
+    def test_writes_change_only_their_etags(self):
+        settings_etag = self.get("/nemo/settings").headers["etag"]
+        account_etag = self.get("/nemo/account").headers["etag"]
+        tasks_etag = self.get("/nemo/get-tasks").headers["etag"]
+
+        response = self.client.post(
+            "/nemo/create_task",
+            json={"task_description": "write", "duration": 60},
+            headers=self.headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get("/nemo/settings", settings_etag).status_code, 304)
+        response = self.get("/nemo/get-tasks", tasks_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["etag"], tasks_etag)
+
+        self.client.post("/nemo/settings", json={"daily_goal": 7}, headers=self.headers)
+        response = self.get("/nemo/settings", settings_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["daily_goal"], 7)
+        self.assertEqual(self.get("/nemo/account", account_etag).status_code, 304)
+
+        self.client.post("/nemo/account", json={"username": "etag_user"}, headers=self.headers)
+        self.assertEqual(self.get("/nemo/account", account_etag).status_code, 200)
+
+    def test_returning_login_keeps_the_account_etag(self):
+        account_etag = self.get("/nemo/account").headers["etag"]
+        asyncio.run(
+            NemoDeta.upsert_user(
+                {
+                    "google_id": GOOGLE_ID,
+                    "email": "etag@example.com",
+                    "given_name": "ETag",
+                    "created_at": datetime.now(),
+                }
+            )
+        )
+        self.assertEqual(self.get("/nemo/account", account_etag).status_code, 304)
+
+    def test_unknown_statistics_category_gets_no_etag(self):
+        etag = self.get("/nemo/statistics/best-day").headers["etag"]
+        for if_none_match in (etag, "*"):
+            with self.subTest(if_none_match=if_none_match):
+                response = self.get("/nemo/statistics/worst-day", if_none_match)
+                self.assertEqual(response.status_code, 204)
+                self.assertEqual(
+                    response.json(), {"message": "Invalid category or category not found"}
+                )
+                self.assertNotIn("etag", response.headers)
+
+    def test_etag_matching(self):
+        etag = make_etag(GOOGLE_ID, {"analytics": 3}, ("analytics",), date(2024, 1, 1))
+        self.assertNotEqual(
+            etag, make_etag(GOOGLE_ID, {"analytics": 3}, ("analytics",), date(2024, 1, 2))
+        )
+        self.assertNotEqual(
+            etag, make_etag("other_google_id", {"analytics": 3}, ("analytics",), date(2024, 1, 1))
+        )
+        self.assertTrue(etag_matches(etag, etag))
+        self.assertTrue(etag_matches(f'"stale", W/{etag}', etag))
+        self.assertTrue(etag_matches("*", etag))
+        self.assertFalse(etag_matches('"stale"', etag))
+        self.assertEqual(encoded_etag(etag, "br"), etag[:-1] + '-br"')
+        self.assertTrue(etag_matches(encoded_etag(etag, "gzip"), etag))
+        self.assertFalse(etag_matches(encoded_etag('"stale"', "gzip"), etag))
+        self.assertFalse(etag_matches(None, etag))
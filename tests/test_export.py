@@ -0,0 +1,161 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import asyncio
+import csv
+import io
+import json
+import tracemalloc
+import unittest
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel
+
+import app.api.models.nemo
+from app.api.config.database_sqlite import engine
+from app.api.crud.export import CSV_COLUMNS, export_user
+from app.api.crud.nemo import NemoDeta
+from app.api.models.nemo import NemoAnalytics, NemoTasks
+from app.api.utils.nemo import create_access_token
+from main import app
+
+GOOGLE_ID = "export_google_id"
+BIG_GOOGLE_ID = "export_big_google_id"
+BIG_USER_ROWS = 1_000_000
+PEAK_MEMORY_BOUND = 8 * 1024 * 1024  # bytes
+
+
+def _create_user(google_id):
+    asyncio.run(
+        NemoDeta.upsert_user(
+            {
+                "google_id": google_id,
+                "email": f"{google_id}@example.com",
+                "given_name": "Export",
+                "created_at": datetime(2024, 1, 1),
+            }
+        )
+    )
+
+
+class TestExport(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        SQLModel.metadata.create_all(engine)
+        _create_user(GOOGLE_ID)
+        with Session(engine) as session:
+            for i in range(3):
+                created_at = datetime(2024, 1, 1 + i, 9)
+                session.add(
+                    NemoAnalytics(
+                        google_id=GOOGLE_ID,
+                        created_at=created_at,
+                        full_date=created_at,
+                        duration=60 * (i + 1),
+                    )
+                )
+            session.add(
+                NemoTasks(
+                    google_id=GOOGLE_ID,
+                    created_at=datetime(2024, 1, 2),
+                    task_date=datetime(2024, 1, 2),
+                    task_description='a, "quoted"\ntask',
+                    duration=30,
+                )
+            )
+            session.commit()
+
+        _create_user(BIG_GOOGLE_ID)
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "WITH RECURSIVE seq(n) AS "
+                    "(SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :rows) "
+                    "INSERT INTO nemo_analytics (google_id, created_at, duration, full_date) "
+                    "SELECT :google_id, datetime('2020-01-01', '+' || n || ' minutes'), 1500, "
+                    "datetime('2020-01-01', '+' || n || ' minutes') FROM seq"
+                ),
+                {"rows": BIG_USER_ROWS, "google_id": BIG_GOOGLE_ID},
+            )
+        cls.headers = {
+            "x-auth-token": create_access_token(
+                data={"email": "export@example.com", "google_id": GOOGLE_ID}
+            )
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        SQLModel.metadata.drop_all(engine)
+        engine.dispose()
+        sqlite_file_name = os.getenv("TEST_SQLITE_FILE_NAME")
+        if os.path.exists(sqlite_file_name):
+            os.remove(sqlite_file_name)
+
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_ndjson_export(self):
+        response = self.client.get(
+            "/nemo/export", params={"format": "ndjson"}, headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("application/x-ndjson"))
+        self.assertIn("nemo-export.ndjson", response.headers["content-disposition"])
+
+        records = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual(
+            [record["type"] for record in records],
+            ["account", "settings", "analytics", "analytics", "analytics", "task"],
+        )
+        self.assertEqual(records[0]["email"], f"{GOOGLE_ID}@example.com")
+        self.assertEqual(records[1]["daily_goal"], 4)
+        self.assertEqual([record["duration"] for record in records[2:5]], [60, 120, 180])
+        self.assertEqual(records[2]["created_at"], "2024-01-01T09:00:00")
+        self.assertEqual(records[5]["task_description"], "a, \"quoted\"\ntask")
+
+    def test_csv_export(self):
+        response = self.client.get("/nemo/export", params={"format": "csv"}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/csv"))
+
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        self.assertEqual(list(rows[0].keys()), CSV_COLUMNS)
+        self.assertEqual(
+            [row["type"] for row in rows],
+            ["account", "settings", "analytics", "analytics", "analytics", "task"],
+        )
+        self.assertEqual(rows[5]["task_description"], "a, \"quoted\"\ntask")
+        self.assertEqual(rows[4]["duration"], "180")
+
+    def test_unknown_format(self):
+        response = self.client.get("/nemo/export", params={"format": "xml"}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_requires_token(self):
+        response = self.client.get("/nemo/export")
+        self.assertEqual(response.status_code, 404)
+
+    def test_memory_stays_flat_for_a_large_history(self):
+        async def consume():
+            lines, size = 0, 0
+            async for chunk in export_user(BIG_GOOGLE_ID, "ndjson"):
+                lines += chunk.count(b"\n")
+                size += len(chunk)
+            return lines, size
+
+        tracemalloc.start()
+        try:
+            lines, size = asyncio.run(consume())
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(lines, BIG_USER_ROWS + 2)
+        # the export is several times larger than what was ever held in memory
+        self.assertGreater(size, 5 * PEAK_MEMORY_BOUND)
+        self.assertLess(peak, PEAK_MEMORY_BOUND)
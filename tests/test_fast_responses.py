@@ -0,0 +1,123 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, select
+
+import app.api.models.nemo
+from app.api.config.database_sqlite import engine
+from app.api.config.settings import get_setting
+from app.api.crud.nemo import NemoDeta, _short_date
+from app.api.utils.nemo import create_access_token
+from main import app
+
+GOOGLE_ID = "fast_responses_google_id"
+ROUTES = (
+    "/nemo/settings",
+    "/nemo/account",
+    "/nemo/analytics",
+    "/nemo/get-tasks",
+    "/nemo/tasks/history?limit=2",
+    "/nemo/dashboard",
+)
+
+
+class TestFastResponses(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        SQLModel.metadata.create_all(engine)
+        asyncio.run(
+            NemoDeta.upsert_user(
+                {
+                    "google_id": GOOGLE_ID,
+                    "email": "fast@example.com",
+                    "given_name": "Fäst",
+                    "profile_pic": "https://example.com/fast.png",
+                    "created_at": datetime.now(),
+                }
+            )
+        )
+        now = datetime.now().replace(microsecond=0)
+        for days_ago, duration in ((0, 1500), (0, 600), (2, 2400), (9, 300)):
+            created_at = now - timedelta(days=days_ago, microseconds=days_ago * 1234)
+            asyncio.run(
+                NemoDeta.insert_analytic(
+                    {
+                        "google_id": GOOGLE_ID,
+                        "created_at": created_at,
+                        "duration": duration,
+                        "full_date": created_at,
+                    }
+                )
+            )
+            asyncio.run(
+                NemoDeta.insert_new_task(
+                    {"google_id": GOOGLE_ID, "created_at": created_at, "task_date": created_at,
+                     "task_description": f"tâche \"{days_ago}\" 📝", "duration": duration}
+                )
+            )
+        cls.headers = {
+            "x-auth-token": create_access_token(
+                data={"email": "fast@example.com", "google_id": GOOGLE_ID}
+            )
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        SQLModel.metadata.drop_all(engine)
+        engine.dispose()
+        sqlite_file_name = os.getenv("TEST_SQLITE_FILE_NAME")
+        if os.path.exists(sqlite_file_name):
+            os.remove(sqlite_file_name)
+
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        get_setting().FAST_RESPONSES_ENABLED = False
+
+    def get(self, url, fast, headers=None):
+        get_setting().FAST_RESPONSES_ENABLED = fast
+        return self.client.get(url, headers={**self.headers, **(headers or {})})
+
+    def test_same_bytes_as_the_default_path(self):
+        for url in ROUTES:
+            with self.subTest(url=url):
+                default = self.get(url, fast=False)
+                fast = self.get(url, fast=True)
+                self.assertEqual(default.status_code, 200)
+                self.assertEqual(fast.status_code, 200)
+                self.assertEqual(fast.content, default.content)
+                self.assertEqual(fast.headers["content-type"], default.headers["content-type"])
+                self.assertEqual(fast.headers["content-length"], default.headers["content-length"])
+
+    def test_keeps_the_etag(self):
+        for url in ROUTES:
+            with self.subTest(url=url):
+                response = self.get(url, fast=True)
+                self.assertEqual(
+                    response.headers["etag"], self.get(url, fast=False).headers["etag"]
+                )
+                self.assertEqual(response.headers["cache-control"], "private, no-cache")
+                revalidated = self.get(
+                    url, fast=True, headers={"If-None-Match": response.headers["etag"]}
+                )
+                self.assertEqual(revalidated.status_code, 304)
+
+    def test_short_date_matches_strftime(self):
+        days = [datetime(2023, month, month * 2, 13, 5) for month in range(1, 13)]
+        with Session(engine) as session:
+            for day in days:
+                formatted = session.exec(select(_short_date(day))).one()
+                self.assertEqual(formatted, day.strftime("%b %d %Y"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import json
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt
+from google.auth import jwt as google_jwt
+
+from app.api.utils.google_certs import GoogleCertCache
+
+AUDIENCE = "test-client-id"
+
+
+def create_key_and_cert():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "test")])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.TraditionalOpenSSL,
+        serialization.NoEncryption(),
+    )
+    return private_pem, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+class CertServer:
+    """Local stand-in for Google's certificate endpoint that counts fetches."""
+
+    def __init__(self, certs, max_age=3600):
+        self.certs = certs
+        self.max_age = max_age
+        self.hits = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.hits += 1
+                body = json.dumps(server.certs).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", f"public, max-age={server.max_age}")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/certs"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class TestGoogleCertCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.private_pem, cls.cert_pem = create_key_and_cert()
+        cls.other_private_pem, cls.other_cert_pem = create_key_and_cert()
+
+    def setUp(self):
+        self.server = CertServer({"kid-1": self.cert_pem})
+
+    def tearDown(self):
+        self.server.close()
+
+    def make_token(self, sub, kid="kid-1", private_pem=None):
+        signer = crypt.RSASigner.from_string(private_pem or self.private_pem, key_id=kid)
+        now = int(time.time())
+        payload = {
+            "iss": "https://accounts.google.com",
+            "aud": AUDIENCE,
+            "sub": sub,
+            "email": f"{sub}@example.com",
+            "email_verified": True,
+            "iat": now,
+            "exp": now + 3600,
+        }
+        return google_jwt.encode(signer, payload).decode()
+
+    def test_many_logins_fetch_certs_once(self):
+        cache = GoogleCertCache(certs_url=self.server.url)
+        for i in range(25):
+            payload = cache.verify_token(self.make_token(f"user-{i}"), audience=AUDIENCE)
+            self.assertEqual(payload["sub"], f"user-{i}")
+        self.assertEqual(self.server.hits, 1)
+        self.assertEqual(cache.fetch_count, 1)
+
+    def test_verified_token_is_reused(self):
+        cache = GoogleCertCache(certs_url=self.server.url)
+        token = self.make_token("user")
+        cache.verify_token(token, audience=AUDIENCE)
+        # stale certificates are not needed for a token that was already verified
+        cache._expires_at = 0
+        self.assertEqual(cache.verify_token(token, audience=AUDIENCE)["sub"], "user")
+        self.assertEqual(self.server.hits, 1)
+
+    def test_verified_token_is_checked_against_the_audience(self):
+        cache = GoogleCertCache(certs_url=self.server.url)
+        token = self.make_token("user")
+        cache.verify_token(token, audience=AUDIENCE)
+        with self.assertRaises(ValueError):
+            cache.verify_token(token, audience="other-client-id")
+
+    def test_expired_max_age_refetches(self):
+        self.server.max_age = 0
+        cache = GoogleCertCache(certs_url=self.server.url)
+        cache.verify_token(self.make_token("a"), audience=AUDIENCE)
+        cache.verify_token(self.make_token("b"), audience=AUDIENCE)
+        self.assertEqual(self.server.hits, 2)
+
+    def test_unknown_kid_triggers_refresh(self):
+        cache = GoogleCertCache(certs_url=self.server.url, min_refresh_interval=0)
+        cache.verify_token(self.make_token("a"), audience=AUDIENCE)
+
+        # Google rotated its keys
+        self.server.certs = {"kid-1": self.cert_pem, "kid-2": self.other_cert_pem}
+        token = self.make_token("b", kid="kid-2", private_pem=self.other_private_pem)
+        self.assertEqual(cache.verify_token(token, audience=AUDIENCE)["sub"], "b")
+        self.assertEqual(self.server.hits, 2)
+
+    def test_invalid_token_raises_value_error(self):
+        cache = GoogleCertCache(certs_url=self.server.url)
+        token = self.make_token("a", private_pem=self.other_private_pem)
+        with self.assertRaises(ValueError):
+            cache.verify_token(token, audience=AUDIENCE)
+        with self.assertRaises(ValueError):
+            cache.verify_token("not-a-token", audience=AUDIENCE)
+
+    def test_cache_file_is_shared_between_instances(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_file = os.path.join(tmp_dir, "google_certs.json")
+            GoogleCertCache(certs_url=self.server.url, cache_file=cache_file).get_certs()
+            cache = GoogleCertCache(certs_url=self.server.url, cache_file=cache_file)
+            cache.verify_token(self.make_token("a"), audience=AUDIENCE)
+        self.assertEqual(self.server.hits, 1)
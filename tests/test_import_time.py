@@ -0,0 +1,67 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import sys
+import unittest
+
+from tests.import_time import best_of, format_report, load_budget, parse_importtime
+
+# only needed by rarely used routes, imported on first use
+LAZY_MODULES = ("google.auth", "requests", "boto3")
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _json
+import time:       800 |        920 | json
+import time:      1500 |       2420 | main
+"""
+
+
+class TestImportTime(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.budget = load_budget()
+        cls.profile = best_of(3)
+
+    def check_budget_python(self):
+        python = f"{sys.version_info.major}.{sys.version_info.minor}"
+        if self.budget["python"] != python:
+            self.skipTest(f"the import budget was recorded with python {self.budget['python']}")
+
+    def test_handler_module_count_within_budget(self):
+        self.check_budget_python()
+        report = format_report(self.profile)
+        self.assertLessEqual(
+            self.profile.module_count, self.budget["modules"], f"too many modules\n{report}"
+        )
+
+    # wall clock depends on the machine and its load, run it where the budget was recorded
+    @unittest.skipUnless(
+        os.getenv("IMPORT_TIME_BUDGET"), "set IMPORT_TIME_BUDGET=1 to check the import time"
+    )
+    def test_handler_import_within_budget(self):
+        self.check_budget_python()
+        report = format_report(self.profile)
+        self.assertLessEqual(
+            self.profile.cumulative_ms("main"), self.budget["import_ms"], f"too slow\n{report}"
+        )
+
+    def test_rarely_used_modules_are_lazy(self):
+        for name in LAZY_MODULES:
+            with self.subTest(module=name):
+                self.assertFalse(self.profile.imported(name))
+
+    def test_parse_importtime(self):
+        profile = parse_importtime(IMPORTTIME_OUTPUT)
+        self.assertEqual(profile.module_count, 3)
+        self.assertEqual(profile.cumulative_ms("main"), 2.42)
+        self.assertEqual(profile.modules[0].depth, 1)
+        self.assertEqual(profile.top_packages(1), [("main", 1500)])
+        self.assertEqual([module.name for module in profile.top_modules(2)], ["main", "json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
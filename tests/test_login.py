@@ -0,0 +1,100 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import asyncio
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func
+from sqlmodel import Session, SQLModel, select
+
+import app.api.models.nemo
+from app.api.config.database_sqlite import async_engine, engine
+from app.api.crud.nemo import NemoDeta
+from app.api.models.nemo import NemoSettings, NemoUserInformation
+from app.api.utils.nemo import create_dict_from_payload
+from main import app
+
+GOOGLE_PAYLOAD = {
+    "iss": "https://accounts.google.com",
+    "sub": "concurrent_google_id",
+    "email": "concurrent@example.com",
+    "given_name": "Con",
+    "family_name": "Current",
+    "picture": "https://example.com/picture.png",
+    "email_verified": True,
+}
+
+
+class TestLoginUpsert(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        SQLModel.metadata.create_all(engine)
+
+    @classmethod
+    def tearDownClass(cls):
+        SQLModel.metadata.drop_all(engine)
+        engine.dispose()
+        sqlite_file_name = os.getenv("TEST_SQLITE_FILE_NAME")
+        if os.path.exists(sqlite_file_name):
+            os.remove(sqlite_file_name)
+
+    def setUp(self):
+        asyncio.run(NemoDeta.remove_user(GOOGLE_PAYLOAD["sub"]))
+
+    def count_rows(self, model):
+        with Session(engine) as session:
+            statement = (
+                select(func.count())
+                .select_from(model)
+                .where(model.google_id == GOOGLE_PAYLOAD["sub"])
+            )
+            return session.exec(statement).one()
+
+    def test_upsert_is_a_single_statement(self):
+        statements = []
+
+        def count_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(async_engine.sync_engine, "before_cursor_execute", count_statement)
+        try:
+            new_user = asyncio.run(NemoDeta.upsert_user(create_dict_from_payload(GOOGLE_PAYLOAD)))
+            returning_user = asyncio.run(
+                NemoDeta.upsert_user(create_dict_from_payload(GOOGLE_PAYLOAD))
+            )
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", count_statement)
+
+        self.assertEqual(len(statements), 2)
+        self.assertEqual(new_user.google_id, GOOGLE_PAYLOAD["sub"])
+        self.assertEqual(returning_user.created_at, new_user.created_at)
+        self.assertEqual(self.count_rows(NemoSettings), 1)
+
+    def test_upsert_keeps_edited_profile(self):
+        asyncio.run(NemoDeta.upsert_user(create_dict_from_payload(GOOGLE_PAYLOAD)))
+        asyncio.run(NemoDeta.update_user_account(GOOGLE_PAYLOAD["sub"], {"given_name": "Edited"}))
+        user = asyncio.run(NemoDeta.upsert_user(create_dict_from_payload(GOOGLE_PAYLOAD)))
+        self.assertEqual(user.given_name, "Edited")
+
+    @patch("app.api.routers.nemo.get_user_payload")
+    def test_parallel_first_logins(self, mock_get_user_payload):
+        mock_get_user_payload.return_value = GOOGLE_PAYLOAD
+        client = TestClient(app)
+
+        def login(_):
+            return client.post("/nemo/login", json={"google_token": "dummy_google_token"})
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(login, range(16)))
+
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("access_token", response.json())
+        self.assertEqual(self.count_rows(NemoUserInformation), 1)
+        self.assertEqual(self.count_rows(NemoSettings), 1)
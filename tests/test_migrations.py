@@ -0,0 +1,191 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import asyncio
+import re
+import unittest
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, inspect, text
+from sqlmodel import Session, SQLModel, delete
+
+import app.api.models.nemo
+from app.api.config.database_sqlite import async_engine, async_session, engine
+from app.api.config.migrations import LATEST_VERSION, check_schema_version, current_version, migrate
+from app.api.config.settings import get_setting
+from app.api.crud.analytics_rollup import check_consistency
+from app.api.crud.nemo import NemoDeta
+from app.api.models.nemo import NemoAnalyticsDaily, NemoSchemaVersion
+from main import app
+
+GOOGLE_IDS = [f"migrations_google_id_{i}" for i in range(5)]
+
+
+def schema():
+    """Columns and foreign keys of every table, the DDL of every index and trigger."""
+    with engine.connect() as connection:
+        objects = connection.execute(
+            text("SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL")
+        ).all()
+        result = {}
+        for kind, name, sql in objects:
+            if kind == "table":
+                # an added column is appended to the stored DDL after the table constraints
+                result[name] = [
+                    connection.execute(text(f"PRAGMA {pragma}({name})")).all()
+                    for pragma in ("table_info", "foreign_key_list")
+                ]
+            else:
+                result[name] = re.sub(r"\s*([(),;])\s*", r"\1", re.sub(r"\s+", " ", sql))
+        return result
+
+
+def version():
+    with engine.connect() as connection:
+        return current_version(connection)
+
+
+async def rollup_mismatches():
+    async with async_session() as session:
+        return await check_consistency(session)
+
+
+class TestMigrations(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = get_setting()
+        self.batch_size = self.settings.MIGRATION_BATCH_SIZE
+        self.settings.MIGRATION_BATCH_SIZE = 2
+        SQLModel.metadata.drop_all(engine)
+
+    def tearDown(self):
+        self.settings.MIGRATION_BATCH_SIZE = self.batch_size
+        self.settings.SCHEMA_VERSION_CHECK = True
+
+    @classmethod
+    def tearDownClass(cls):
+        SQLModel.metadata.drop_all(engine)
+        engine.dispose()
+        sqlite_file_name = os.getenv("TEST_SQLITE_FILE_NAME")
+        if os.path.exists(sqlite_file_name):
+            os.remove(sqlite_file_name)
+
+    def create_pre_migration_database(self):
+        """What `create_all` on startup left: no version table, old indexes, a partial rollup."""
+        SQLModel.metadata.create_all(engine)
+        NemoSchemaVersion.__table__.drop(engine)
+        with engine.begin() as connection:
+            connection.execute(
+                text("CREATE INDEX ix_analytics_google_id ON nemo_analytics (google_id)")
+            )
+            connection.execute(text("CREATE INDEX ix_tasks_google_id ON nemo_tasks (google_id)"))
+
+        now = datetime.now().replace(hour=12)
+        for i, google_id in enumerate(GOOGLE_IDS):
+            asyncio.run(
+                NemoDeta.upsert_user(
+                    {
+                        "google_id": google_id,
+                        "email": f"{i}@example.com",
+                        "given_name": "Migration",
+                        "created_at": now,
+                    }
+                )
+            )
+            analytics = [
+                {
+                    "created_at": now - timedelta(days=day),
+                    "duration": 600 * (i + 1),
+                    "full_date": now,
+                }
+                for day in range(3)
+            ]
+            asyncio.run(NemoDeta.insert_analytics_batch(google_id, analytics))
+        # sessions recorded before the rollup table existed
+        with Session(engine) as session:
+            session.exec(delete(NemoAnalyticsDaily).where(NemoAnalyticsDaily.day < now.date()))
+            session.commit()
+
+    def index_names(self):
+        inspector = inspect(engine)
+        return {
+            index["name"]
+            for table in ("nemo_analytics", "nemo_tasks")
+            for index in inspector.get_indexes(table)
+        }
+
+    def test_migrate_empty_database(self):
+        applied = migrate(engine)
+        self.assertEqual(
+            [migration.version for migration in applied], list(range(1, LATEST_VERSION + 1))
+        )
+        self.assertEqual(version(), LATEST_VERSION)
+        self.assertTrue(set(SQLModel.metadata.tables) <= set(inspect(engine).get_table_names()))
+        self.assertEqual(
+            self.index_names(),
+            {"ix_analytics_google_id_created_at", "ix_tasks_google_id_created_at"},
+        )
+        self.assertEqual(migrate(engine), [])
+
+    def test_migrations_match_the_models(self):
+        # a model change without its migration shows up here
+        migrate(engine)
+        migrated = schema()
+        SQLModel.metadata.drop_all(engine)
+        SQLModel.metadata.create_all(engine)
+        self.assertEqual(migrated, schema())
+
+    def test_migrate_pre_migration_database(self):
+        self.create_pre_migration_database()
+        self.assertEqual(version(), 0)
+        self.assertIn("ix_analytics_google_id", self.index_names())
+        self.assertTrue(asyncio.run(rollup_mismatches()))
+
+        self.assertEqual([migration.version for migration in migrate(engine, target=1)], [1])
+        self.assertEqual(version(), 1)
+        migrate(engine)
+        self.assertEqual(version(), LATEST_VERSION)
+        self.assertNotIn("ix_analytics_google_id", self.index_names())
+        self.assertNotIn("ix_tasks_google_id", self.index_names())
+        # rebuilt two users at a time
+        self.assertEqual(asyncio.run(rollup_mismatches()), [])
+
+    def test_startup_check_is_a_single_query(self):
+        migrate(engine, target=LATEST_VERSION - 1)
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+        try:
+            with self.assertRaises(RuntimeError):
+                asyncio.run(check_schema_version(async_engine))
+            migrate(engine)
+            self.assertEqual(asyncio.run(check_schema_version(async_engine)), LATEST_VERSION)
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+        self.assertEqual(len(statements), 2)
+
+    def test_startup_fails_on_an_outdated_schema(self):
+        with self.assertRaises(RuntimeError):
+            with TestClient(app):
+                pass
+
+        # with the check turned off startup doesn't touch the database at all
+        self.settings.SCHEMA_VERSION_CHECK = False
+        with TestClient(app) as client:
+            self.assertEqual(client.get("/health").status_code, 200)
+        self.assertEqual(inspect(engine).get_table_names(), [])
+
+    def test_startup_with_a_migrated_schema(self):
+        migrate(engine)
+        with TestClient(app) as client:
+            self.assertEqual(client.get("/health").status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import importlib.util
+import tempfile
+import unittest
+from pathlib import Path
+
+import package_lambda
+
+
+def write(path: Path, content: str = "") -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+class TestPackageLambda(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.package_dir = Path(self.tmp_dir.name)
+        for name in (
+            "main.py",
+            "app/api/tests/helpers.py",
+            "fastapi/__init__.py",
+            "fastapi/__init__.pyi",
+            "fastapi/py.typed",
+            "fastapi/tests/test_routing.py",
+            "fastapi/__pycache__/__init__.cpython-313.pyc",
+            "fastapi/docs/index.md",
+            "fastapi-0.115.5.dist-info/METADATA",
+            "fastapi-0.115.5.dist-info/RECORD",
+            "fastapi-0.115.5.dist-info/WHEEL",
+            "fastapi-0.115.5.dist-info/entry_points.txt",
+            "fastapi-0.115.5.dist-info/licenses/LICENSE",
+            "certifi/cacert.pem",
+            "boto3/__init__.py",
+            "boto3-1.35.0.dist-info/METADATA",
+        ):
+            write(self.package_dir / name, "VALUE = 1\n" if name.endswith(".py") else "")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def remaining(self):
+        return {
+            str(path.relative_to(self.package_dir))
+            for path in self.package_dir.rglob("*")
+            if path.is_file()
+        }
+
+    def test_prune(self):
+        package_lambda.prune(self.package_dir)
+        self.assertEqual(
+            self.remaining(),
+            {
+                "main.py",
+                "app/api/tests/helpers.py",
+                "fastapi/__init__.py",
+                "fastapi-0.115.5.dist-info/METADATA",
+                "fastapi-0.115.5.dist-info/entry_points.txt",
+                "fastapi-0.115.5.dist-info/licenses/LICENSE",
+                "certifi/cacert.pem",
+            },
+        )
+
+    def test_precompile_writes_unchecked_bytecode(self):
+        package_lambda.prune(self.package_dir)
+        package_lambda.precompile(self.package_dir)
+        source = self.package_dir / "fastapi" / "__init__.py"
+        pyc = Path(importlib.util.cache_from_source(str(source)))
+        self.assertTrue(pyc.exists())
+        # bit 0: hash based, bit 1: check the source, see PEP 552
+        flags = int.from_bytes(pyc.read_bytes()[4:8], "little")
+        self.assertEqual(flags, 0b01)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,220 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import asyncio
+import unittest
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import SQLModel
+
+import app.api.models.nemo
+from app.api.config.database_sqlite import async_engine, async_session, engine
+from app.api.crud.account_deletion import revoked_users
+from app.api.crud.nemo import NemoDeta
+from app.api.utils.nemo import create_access_token
+from app.api.utils.read_cache import (
+    ACCOUNT,
+    IMAGE_URL,
+    SETTINGS,
+    InMemoryBackend,
+    ReadCache,
+    invalidate_pending,
+    set_read_cache,
+)
+from main import app
+
+GOOGLE_ID = "read_cache_google_id"
+
+
+def _create_user(google_id):
+    asyncio.run(
+        NemoDeta.upsert_user(
+            {
+                "google_id": google_id,
+                "email": f"{google_id}@example.com",
+                "given_name": "Cached",
+                "profile_pic": "https://example.com/pic.png",
+                "created_at": datetime.now(),
+            }
+        )
+    )
+
+
+def _headers(google_id):
+    return {
+        "x-auth-token": create_access_token(
+            data={"email": f"{google_id}@example.com", "google_id": google_id}
+        )
+    }
+
+
+class TestReadCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        SQLModel.metadata.create_all(engine)
+        _create_user(GOOGLE_ID)
+
+    @classmethod
+    def tearDownClass(cls):
+        SQLModel.metadata.drop_all(engine)
+        engine.dispose()
+        sqlite_file_name = os.getenv("TEST_SQLITE_FILE_NAME")
+        if os.path.exists(sqlite_file_name):
+            os.remove(sqlite_file_name)
+
+    def setUp(self):
+        self.client = TestClient(app)
+        self.backend = InMemoryBackend(maxsize=100)
+        self.cache = ReadCache(self.backend, ttl=60)
+        set_read_cache(self.cache)
+        self.statements = []
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self.record_statement)
+
+    def tearDown(self):
+        event.remove(async_engine.sync_engine, "before_cursor_execute", self.record_statement)
+        set_read_cache(None)
+
+    def record_statement(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def reads_of(self, table):
+        return [
+            statement
+            for statement in self.statements
+            if statement.startswith("SELECT") and f"FROM {table}" in statement
+        ]
+
+    def test_repeated_reads_are_served_from_the_cache(self):
+        for path in ("/nemo/settings", "/nemo/account", "/nemo/user-image"):
+            first = self.client.get(path, headers=_headers(GOOGLE_ID))
+            second = self.client.get(path, headers=_headers(GOOGLE_ID))
+            self.assertEqual(first.status_code, 200)
+            self.assertEqual(first.json(), second.json())
+
+        self.assertEqual(len(self.reads_of("nemo_settings")), 1)
+        self.assertEqual(len(self.reads_of("nemo_user_information")), 2)
+        self.assertEqual(self.cache.stats()[SETTINGS], {"hits": 1, "misses": 1, "hit_rate": 0.5})
+        self.assertEqual(self.cache.stats()[ACCOUNT]["hits"], 1)
+        self.assertEqual(self.cache.stats()[IMAGE_URL]["hits"], 1)
+
+        stats = self.client.get("/health/read-cache").json()
+        self.assertTrue(stats["enabled"])
+        self.assertEqual(stats["reads"][SETTINGS]["hit_rate"], 0.5)
+
+    def test_updates_invalidate_their_entries(self):
+        self.client.get("/nemo/settings", headers=_headers(GOOGLE_ID))
+        self.client.get("/nemo/account", headers=_headers(GOOGLE_ID))
+        self.client.get("/nemo/user-image", headers=_headers(GOOGLE_ID))
+
+        response = self.client.post(
+            "/nemo/settings", json={"daily_goal": 9}, headers=_headers(GOOGLE_ID)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.client.get("/nemo/settings", headers=_headers(GOOGLE_ID)).json()["daily_goal"], 9
+        )
+        # the account entries weren't touched by the settings update
+        self.client.get("/nemo/account", headers=_headers(GOOGLE_ID))
+        self.assertEqual(self.cache.stats()[ACCOUNT]["hits"], 1)
+
+        response = self.client.post(
+            "/nemo/account", json={"username": "cached_user"}, headers=_headers(GOOGLE_ID)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.client.get("/nemo/account", headers=_headers(GOOGLE_ID)).json()["username"],
+            "cached_user",
+        )
+        self.assertEqual(self.cache.stats()[ACCOUNT], {"hits": 1, "misses": 2, "hit_rate": 0.3333})
+        self.client.get("/nemo/user-image", headers=_headers(GOOGLE_ID))
+        self.assertEqual(self.cache.stats()[IMAGE_URL]["misses"], 2)
+
+    def test_entries_older_than_the_etag_are_not_served(self):
+        first = self.client.get("/nemo/settings", headers=_headers(GOOGLE_ID))
+        # written by another instance, this one's entry is still within its TTL
+        with engine.begin() as connection:
+            connection.exec_driver_sql(
+                "UPDATE nemo_settings SET daily_goal = daily_goal + 1 WHERE google_id = ?",
+                (GOOGLE_ID,),
+            )
+
+        second = self.client.get("/nemo/settings", headers=_headers(GOOGLE_ID))
+        self.assertNotEqual(second.headers["etag"], first.headers["etag"])
+        self.assertEqual(second.json()["daily_goal"], first.json()["daily_goal"] + 1)
+        self.assertEqual(self.cache.stats()[SETTINGS]["misses"], 2)
+        # the entry now carries the new version
+        third = self.client.get("/nemo/settings", headers=_headers(GOOGLE_ID))
+        self.assertEqual(third.json(), second.json())
+        self.assertEqual(self.cache.stats()[SETTINGS]["hits"], 1)
+
+    def test_a_request_reads_its_own_writes(self):
+        async def update_then_read():
+            async with async_session() as session:
+                before = (
+                    await NemoDeta.get_user_settings(GOOGLE_ID, session=session)
+                ).timer_sessions
+                await NemoDeta.update_settings(
+                    GOOGLE_ID, {"timer_sessions": before + 1}, session=session
+                )
+                own = await NemoDeta.get_user_settings(GOOGLE_ID, session=session)
+                # other sessions keep getting the committed row until the commit
+                other = await NemoDeta.get_user_settings(GOOGLE_ID)
+                await session.commit()
+            await invalidate_pending(session)
+            after = await NemoDeta.get_user_settings(GOOGLE_ID)
+            return before, own.timer_sessions, other.timer_sessions, after.timer_sessions
+
+        before, own, other, after = asyncio.run(update_then_read())
+        self.assertEqual(own, before + 1)
+        self.assertEqual(other, before)
+        self.assertEqual(after, before + 1)
+
+    def test_a_load_racing_an_invalidation_is_not_stored(self):
+        async def race():
+            async def load():
+                await self.cache.invalidate(GOOGLE_ID, SETTINGS)
+                return "loaded before the write"
+
+            first = await self.cache.get_or_load(GOOGLE_ID, SETTINGS, load)
+            second = await self.cache.get_or_load(GOOGLE_ID, SETTINGS, load)
+            return first, second
+
+        asyncio.run(race())
+        self.assertEqual(self.cache.stats()[SETTINGS]["misses"], 2)
+
+    def test_deleting_the_account_drops_its_entries(self):
+        google_id = "read_cache_deleted_google_id"
+        _create_user(google_id)
+        for path in ("/nemo/settings", "/nemo/account", "/nemo/user-image"):
+            self.client.get(path, headers=_headers(google_id))
+        self.assertEqual(len(self.backend), 3)
+
+        response = self.client.delete("/nemo/delete", headers=_headers(google_id))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(self.backend), 0)
+        self.assertIsNone(asyncio.run(NemoDeta.get_user_settings(google_id)))
+        revoked_users.discard(google_id)
+
+    def test_remove_user_drops_its_entries(self):
+        google_id = "read_cache_removed_google_id"
+        _create_user(google_id)
+        self.assertIsNotNone(asyncio.run(NemoDeta.get_user_profile(google_id)))
+        asyncio.run(NemoDeta.remove_user(google_id))
+        self.assertIsNone(asyncio.run(NemoDeta.get_user_profile(google_id)))
+
+    def test_in_memory_backend_evicts_and_expires(self):
+        async def exercise():
+            backend = InMemoryBackend(maxsize=2)
+            await backend.set("a", 1, ttl=60)
+            await backend.set("b", 2, ttl=60)
+            await backend.get("a")
+            await backend.set("c", 3, ttl=60)  # evicts b, the least recently used
+            await backend.set("d", 4, ttl=0)  # evicts a, and expires right away
+            return [await backend.get(key) for key in "abcd"]
+
+        self.assertEqual(asyncio.run(exercise()), [None, None, 3, None])
@@ -0,0 +1,252 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import asyncio
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+from sqlalchemy import event, update
+from sqlmodel import Session, SQLModel
+
+import app.api.models.nemo
+from app.api.config.database_sqlite import async_engine, engine
+from app.api.config.replica import (
+    DirectoryObjectStore,
+    LocalReplica,
+    publish_snapshot,
+    set_replica,
+)
+from app.api.crud.nemo import NemoDeta
+from app.api.models.nemo import NemoSettings, NemoTasks, NemoUserVersion
+
+GOOGLE_ID = "replica_google_id"
+SNAPSHOT_KEY = "nemo-test.sqlite"
+
+
+class TestLocalReplica(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        SQLModel.metadata.create_all(engine)
+        asyncio.run(
+            NemoDeta.upsert_user(
+                {
+                    "google_id": GOOGLE_ID,
+                    "email": "replica@example.com",
+                    "given_name": "Replica",
+                    "created_at": datetime.now(),
+                }
+            )
+        )
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.store = DirectoryObjectStore(os.path.join(cls.tmp_dir, "store"))
+        publish_snapshot(cls.store, SNAPSHOT_KEY, os.getenv("TEST_SQLITE_FILE_NAME"))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir)
+        SQLModel.metadata.drop_all(engine)
+        engine.dispose()
+        sqlite_file_name = os.getenv("TEST_SQLITE_FILE_NAME")
+        if os.path.exists(sqlite_file_name):
+            os.remove(sqlite_file_name)
+
+    def setUp(self):
+        self.replica_path = os.path.join(self.tmp_dir, "replica.db")
+        self.replica = LocalReplica(self.store, SNAPSHOT_KEY, self.replica_path, max_staleness=3600)
+        set_replica(self.replica)
+        self.primary_statements = []
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self.count_statement)
+
+    def tearDown(self):
+        event.remove(async_engine.sync_engine, "before_cursor_execute", self.count_statement)
+        set_replica(None)
+        asyncio.run(self.replica.dispose())
+        os.remove(self.replica_path)
+        os.remove(self.replica.synced_at_path)
+
+    def count_statement(self, conn, cursor, statement, *args):
+        self.primary_statements.append(statement)
+
+    def test_cold_start_pulls_snapshot_and_reads_locally(self):
+        self.assertTrue(os.path.exists(self.replica_path))
+        settings = asyncio.run(NemoDeta.get_user_settings(GOOGLE_ID))
+        profile = asyncio.run(NemoDeta.get_user_profile(GOOGLE_ID))
+
+        self.assertEqual(settings.google_id, GOOGLE_ID)
+        self.assertEqual(profile.email, "replica@example.com")
+        self.assertEqual(self.primary_statements, [])
+
+    def test_old_snapshot_is_synced_before_reading(self):
+        snapshot_path = os.path.join(self.store.root, SNAPSHOT_KEY)
+        published_at = os.path.getmtime(snapshot_path)
+        # published two hours ago, the download itself is brand new
+        os.utime(snapshot_path, (published_at - 7200, published_at - 7200))
+        asyncio.run(self.replica.dispose())
+        os.remove(self.replica_path)
+        try:
+            self.replica = LocalReplica(
+                self.store, SNAPSHOT_KEY, self.replica_path, max_staleness=3600
+            )
+            set_replica(self.replica)
+        finally:
+            os.utime(snapshot_path, (published_at, published_at))
+
+        self.assertEqual(self.replica.snapshot_synced_at, published_at - 7200)
+        self.assertFalse(self.replica.is_fresh(GOOGLE_ID))
+        asyncio.run(NemoDeta.get_user_settings(GOOGLE_ID))
+        self.assertGreater(len(self.primary_statements), 0)
+        self.assertTrue(self.replica.is_fresh(GOOGLE_ID))
+
+        # a warm container keeps the file and the snapshot's age along with it
+        warm = LocalReplica(self.store, SNAPSHOT_KEY, self.replica_path, max_staleness=3600)
+        self.assertEqual(warm.snapshot_synced_at, published_at - 7200)
+        asyncio.run(warm.dispose())
+
+    def test_writes_go_to_primary_and_refresh_replica(self):
+        asyncio.run(NemoDeta.update_settings(GOOGLE_ID, {"daily_goal": 9}))
+        now = datetime.now()
+        asyncio.run(
+            NemoDeta.insert_analytic(
+                {"google_id": GOOGLE_ID, "created_at": now, "duration": 1200, "full_date": now}
+            )
+        )
+        self.assertGreater(len(self.primary_statements), 0)
+
+        self.primary_statements.clear()
+        settings = asyncio.run(NemoDeta.get_user_settings(GOOGLE_ID))
+        goal = asyncio.run(NemoDeta.analytics_get_current_goal(GOOGLE_ID))
+        self.assertEqual(settings.daily_goal, 9)
+        self.assertEqual(goal, {"current_goal": 1200})
+        self.assertEqual(self.primary_statements, [])
+
+    def test_other_writers_are_visible_after_staleness_bound(self):
+        # a write made by another instance, straight to the primary
+        with Session(engine) as session:
+            session.exec(
+                update(NemoSettings)
+                .where(NemoSettings.google_id == GOOGLE_ID)
+                .values(timer_sessions=7)
+            )
+            session.commit()
+
+        settings = asyncio.run(NemoDeta.get_user_settings(GOOGLE_ID))
+        self.assertNotEqual(settings.timer_sessions, 7)
+
+        self.replica.max_staleness = 0
+        settings = asyncio.run(NemoDeta.get_user_settings(GOOGLE_ID))
+        self.assertEqual(settings.timer_sessions, 7)
+
+    def replica_task(self, task_id):
+        async def load():
+            async with self.replica.session() as session:
+                return await session.get(NemoTasks, task_id)
+
+        return asyncio.run(load())
+
+    def task_selects(self):
+        return [
+            statement
+            for statement in self.primary_statements
+            if statement.startswith("SELECT nemo_tasks.")
+        ]
+
+    def test_sync_pulls_only_what_changed(self):
+        # catch up with what the other tests wrote since the snapshot
+        asyncio.run(self.replica.sync_user(GOOGLE_ID))
+        now = datetime.now()
+        # written straight to the primary by another instance
+        with Session(engine) as session:
+            task = NemoTasks(
+                google_id=GOOGLE_ID,
+                created_at=now,
+                task_date=now,
+                task_description="elsewhere",
+                duration=60,
+            )
+            session.add(task)
+            session.commit()
+            session.refresh(task)
+
+        self.primary_statements.clear()
+        asyncio.run(self.replica.sync_user(GOOGLE_ID))
+        # the counters, then only the tasks past the replica's last one
+        self.assertEqual(len(self.primary_statements), 2)
+        self.assertIn("nemo_tasks.id >", self.task_selects()[0])
+        self.assertEqual(self.replica_task(task.id).task_description, "elsewhere")
+
+        self.primary_statements.clear()
+        asyncio.run(self.replica.sync_user(GOOGLE_ID))
+        self.assertEqual(len(self.primary_statements), 1)
+
+        # an edit by another instance can't be located, the user's tasks are replaced
+        with Session(engine) as session:
+            session.exec(
+                update(NemoTasks)
+                .where(NemoTasks.id == task.id)
+                .values(task_description="edited elsewhere")
+            )
+            session.commit()
+        self.primary_statements.clear()
+        asyncio.run(self.replica.sync_user(GOOGLE_ID))
+        self.assertEqual(len(self.task_selects()), 2)
+        self.assertNotIn("nemo_tasks.id >", self.task_selects()[1])
+        self.assertEqual(self.replica_task(task.id).task_description, "edited elsewhere")
+
+    def test_own_task_edits_sync_only_those_rows(self):
+        now = datetime.now()
+        tasks = asyncio.run(
+            NemoDeta.insert_tasks(
+                GOOGLE_ID,
+                [
+                    {
+                        "created_at": now,
+                        "task_date": now,
+                        "task_description": f"own {i}",
+                        "duration": 60,
+                    }
+                    for i in range(3)
+                ],
+            )
+        )
+        asyncio.run(self.replica.sync_user(GOOGLE_ID))
+        self.primary_statements.clear()
+        asyncio.run(
+            NemoDeta.update_tasks(GOOGLE_ID, [{"id": tasks[0].id, "task_description": "renamed"}])
+        )
+        asyncio.run(NemoDeta.delete_tasks(GOOGLE_ID, [tasks[1].id]))
+
+        self.assertEqual(len(self.task_selects()), 2)
+        for statement in self.task_selects():
+            self.assertIn("nemo_tasks.id >", statement)
+        self.assertEqual(self.replica_task(tasks[0].id).task_description, "renamed")
+        self.assertIsNone(self.replica_task(tasks[1].id))
+        self.assertEqual(self.replica_task(tasks[2].id).task_description, "own 2")
+
+    def test_versions_match_the_primary(self):
+        asyncio.run(NemoDeta.update_settings(GOOGLE_ID, {"timer_sessions": 5}))
+        now = datetime.now()
+        asyncio.run(
+            NemoDeta.insert_new_task(
+                {
+                    "google_id": GOOGLE_ID,
+                    "created_at": now,
+                    "task_date": now,
+                    "task_description": "sync",
+                    "duration": 60,
+                }
+            )
+        )
+
+        replica_versions = asyncio.run(NemoDeta.get_versions(GOOGLE_ID))
+        with Session(engine) as session:
+            primary_versions = session.get(NemoUserVersion, GOOGLE_ID).model_dump(
+                exclude={"google_id"}
+            )
+        # the replica's own triggers fire on every sync, its counters are overwritten by the
+        # primary's
+        self.assertEqual(replica_versions, primary_versions)
@@ -0,0 +1,99 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import asyncio
+import unittest
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel
+
+import app.api.models.nemo
+from app.api.config.database_sqlite import engine
+from app.api.config.session import CHECKOUTS_HEADER, get_session
+from app.api.crud.nemo import NemoDeta
+from app.api.utils.nemo import create_access_token
+from main import app
+
+GOOGLE_ID = "session_google_id"
+
+
+async def update_in_request(updated_setting, fail=False):
+    """Drive `get_session` the way FastAPI does for one request."""
+    dependency = get_session()
+    session = await dependency.__anext__()
+    await NemoDeta.update_settings(GOOGLE_ID, updated_setting, session=session)
+    settings = (await NemoDeta.get_user_settings(GOOGLE_ID, session=session)).model_dump()
+    if fail:
+        try:
+            await dependency.athrow(RuntimeError("request failed"))
+        except RuntimeError:
+            pass
+    else:
+        try:
+            await dependency.__anext__()
+        except StopAsyncIteration:
+            pass
+    return settings
+
+
+class TestRequestSession(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        SQLModel.metadata.create_all(engine)
+        asyncio.run(
+            NemoDeta.upsert_user(
+                {
+                    "google_id": GOOGLE_ID,
+                    "email": "session@example.com",
+                    "given_name": "Session",
+                    "created_at": datetime.now(),
+                }
+            )
+        )
+        cls.headers = {
+            "x-auth-token": create_access_token(
+                data={"email": "session@example.com", "google_id": GOOGLE_ID}
+            )
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        SQLModel.metadata.drop_all(engine)
+        engine.dispose()
+        sqlite_file_name = os.getenv("TEST_SQLITE_FILE_NAME")
+        if os.path.exists(sqlite_file_name):
+            os.remove(sqlite_file_name)
+
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_one_checkout_per_request(self):
+        for url in ("/nemo/dashboard", "/nemo/settings", "/nemo/statistics/best-day"):
+            response = self.client.get(url, headers=self.headers)
+            self.assertEqual(response.headers[CHECKOUTS_HEADER], "1", url)
+
+        response = self.client.post(
+            "/nemo/settings", json={"timer_sessions": 6}, headers=self.headers
+        )
+        self.assertEqual(response.headers[CHECKOUTS_HEADER], "1")
+        self.assertEqual(
+            self.client.get("/nemo/settings", headers=self.headers).json()["timer_sessions"], 6
+        )
+
+    def test_commit_once_at_the_end_of_the_request(self):
+        settings = asyncio.run(update_in_request({"daily_goal": 7}))
+        self.assertEqual(settings["daily_goal"], 7)
+        self.assertEqual(asyncio.run(NemoDeta.get_user_settings(GOOGLE_ID)).daily_goal, 7)
+
+    def test_rollback_when_the_request_fails(self):
+        asyncio.run(NemoDeta.update_settings(GOOGLE_ID, {"preference_shuffle_time": 10}))
+        settings = asyncio.run(update_in_request({"preference_shuffle_time": 99}, fail=True))
+        # the request saw its own write, but it was never committed
+        self.assertEqual(settings["preference_shuffle_time"], 99)
+        self.assertEqual(
+            asyncio.run(NemoDeta.get_user_settings(GOOGLE_ID)).preference_shuffle_time, 10
+        )
@@ -0,0 +1,133 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import asyncio
+import unittest
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel
+
+import app.api.models.nemo
+from app.api.config.database_sqlite import async_engine, engine
+from app.api.crud.nemo import NemoDeta
+from app.api.models.nemo import NemoTasks
+from app.api.utils.cursor import decode_cursor, encode_cursor
+from app.api.utils.nemo import create_access_token
+from main import app
+
+GOOGLE_ID = "history_google_id"
+
+
+class TestTaskHistory(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        SQLModel.metadata.create_all(engine)
+        asyncio.run(
+            NemoDeta.upsert_user(
+                {
+                    "google_id": GOOGLE_ID,
+                    "email": "history@example.com",
+                    "given_name": "History",
+                    "created_at": datetime.now(),
+                }
+            )
+        )
+        start = datetime(2024, 1, 1, 8)
+        with Session(engine) as session:
+            for i in range(250):
+                # pairs of tasks share a timestamp, so pages have to break ties on id
+                created_at = start + timedelta(hours=(i // 2) * 5)
+                session.add(
+                    NemoTasks(
+                        google_id=GOOGLE_ID,
+                        created_at=created_at,
+                        task_date=created_at,
+                        task_description=f"task {i}",
+                        duration=i,
+                    )
+                )
+            session.commit()
+            cls.totals = defaultdict(int)
+            for i in range(250):
+                cls.totals[(start + timedelta(hours=(i // 2) * 5)).strftime("%b %d %Y")] += i
+        cls.headers = {
+            "x-auth-token": create_access_token(
+                data={"email": "history@example.com", "google_id": GOOGLE_ID}
+            )
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        SQLModel.metadata.drop_all(engine)
+        engine.dispose()
+        sqlite_file_name = os.getenv("TEST_SQLITE_FILE_NAME")
+        if os.path.exists(sqlite_file_name):
+            os.remove(sqlite_file_name)
+
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_pages_cover_every_task_once(self):
+        seen, cursor, pages = [], None, 0
+        while True:
+            params = {"limit": 40, **({"cursor": cursor} if cursor else {})}
+            response = self.client.get("/nemo/tasks/history", params=params, headers=self.headers)
+            self.assertEqual(response.status_code, 200, response.text)
+            page = response.json()
+            pages += 1
+            seen.extend(task["id"] for task in page["tasks"])
+
+            dates = {task["date"] for task in page["tasks"]}
+            self.assertEqual({day["date"] for day in page["days"]}, dates)
+            for day in page["days"]:
+                # totals cover the whole day, also the tasks of that day on other pages
+                self.assertEqual(day["total_duration"], self.totals[day["date"]])
+
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(pages, 7)
+        self.assertEqual(len(seen), 250)
+        self.assertEqual(len(set(seen)), 250)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            "/nemo/tasks/history", params={"cursor": "not-a-cursor"}, headers=self.headers
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_round_trip(self):
+        key = (datetime(2024, 1, 2, 3, 4, 5, 6), 42)
+        self.assertEqual(decode_cursor(encode_cursor(*key)), key)
+
+    def test_deep_pages_search_the_index(self):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, *args):
+            statements.append((statement, parameters))
+
+        event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+        try:
+            asyncio.run(NemoDeta.get_task_history(GOOGLE_ID, (datetime(2024, 1, 5), 10), limit=20))
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+        with engine.connect() as conn:
+            for statement, parameters in statements:
+                plan = [
+                    row.detail
+                    for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                ]
+                self.assertRegex(
+                    " | ".join(plan),
+                    r"SEARCH nemo_tasks USING INDEX ix_tasks_google_id_created_at "
+                    r"\(google_id=\? AND created_at[<>]",
+                )
@@ -0,0 +1,127 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import asyncio
+import unittest
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, select
+
+import app.api.models.nemo
+from app.api.config.database_sqlite import async_engine, engine
+from app.api.crud.nemo import NemoDeta
+from app.api.models.nemo import NemoTasks
+from app.api.utils.nemo import create_access_token
+from main import app
+
+GOOGLE_ID = "tasks_batch_google_id"
+OTHER_GOOGLE_ID = "tasks_batch_other_google_id"
+
+
+class TestTasksBatch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        SQLModel.metadata.create_all(engine)
+        for google_id in (GOOGLE_ID, OTHER_GOOGLE_ID):
+            asyncio.run(
+                NemoDeta.upsert_user(
+                    {
+                        "google_id": google_id,
+                        "email": f"{google_id}@example.com",
+                        "given_name": "Tasks",
+                        "created_at": datetime.now(),
+                    }
+                )
+            )
+        cls.headers = {
+            "x-auth-token": create_access_token(
+                data={"email": "tasks@example.com", "google_id": GOOGLE_ID}
+            )
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        SQLModel.metadata.drop_all(engine)
+        engine.dispose()
+        sqlite_file_name = os.getenv("TEST_SQLITE_FILE_NAME")
+        if os.path.exists(sqlite_file_name):
+            os.remove(sqlite_file_name)
+
+    def setUp(self):
+        self.client = TestClient(app)
+        self.statements = []
+
+    def record_statement(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def batch(self, body):
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self.record_statement)
+        try:
+            response = self.client.post("/nemo/tasks/batch", json=body, headers=self.headers)
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", self.record_statement)
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
+
+    def test_create_edit_and_delete(self):
+        created = self.batch(
+            {"create": [{"task_description": f"task {i}", "duration": 60 * i} for i in range(1, 5)]}
+        )["created"]
+        self.assertEqual(
+            [task["task_description"] for task in created], ["task 1", "task 2", "task 3", "task 4"]
+        )
+        self.assertEqual(len(self.statements), 1)
+        ids = [task["id"] for task in created]
+
+        now = datetime.now()
+        other_task = asyncio.run(
+            NemoDeta.insert_new_task(
+                {
+                    "google_id": OTHER_GOOGLE_ID,
+                    "created_at": now,
+                    "task_date": now,
+                    "task_description": "not yours",
+                    "duration": 60,
+                }
+            )
+        )
+
+        self.statements.clear()
+        body = self.batch(
+            {
+                "update": [
+                    {"id": ids[0], "task_description": "renamed"},
+                    {"id": ids[1]},
+                    {"id": other_task.id, "duration": 1},
+                ],
+                "delete": [ids[2], ids[3], ids[3], other_task.id, 999999],
+            }
+        )
+        self.assertEqual(
+            body["updated"],
+            [
+                {"id": ids[0], "success": True},
+                {"id": ids[1], "success": False, "error": "No fields to update"},
+                {"id": other_task.id, "success": False, "error": "Task not found"},
+            ],
+        )
+        self.assertEqual(
+            [result["success"] for result in body["deleted"]], [True, True, False, False]
+        )
+        # two UPDATEs and a single DELETE ... IN for all ids, no SELECT
+        deletes = [statement for statement in self.statements if statement.startswith("DELETE")]
+        self.assertEqual(len(deletes), 1)
+        self.assertIn(" IN ", deletes[0])
+        self.assertFalse(any(statement.startswith("SELECT") for statement in self.statements))
+
+        with Session(engine) as session:
+            remaining = {task.id: task for task in session.exec(select(NemoTasks)).all()}
+        self.assertEqual(remaining[ids[0]].task_description, "renamed")
+        self.assertNotIn(ids[2], remaining)
+        self.assertNotIn(ids[3], remaining)
+        self.assertEqual(remaining[other_task.id].duration, 60)
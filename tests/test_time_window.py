@@ -0,0 +1,109 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import asyncio
+import unittest
+from datetime import date, datetime
+
+from sqlalchemy import event
+from sqlmodel import SQLModel, func, select
+
+import app.api.models.nemo
+from app.api.config.database_sqlite import async_engine, engine
+from app.api.crud.nemo import NemoDeta
+from app.api.models.nemo import NemoAnalytics
+from app.api.utils.time_window import TimeWindow
+
+GOOGLE_ID = "time_window_google_id"
+TABLES = ("nemo_analytics", "nemo_analytics_daily", "nemo_tasks")
+
+
+class TestTimeWindow(unittest.TestCase):
+
+    def test_last_days_is_half_open_on_whole_days(self):
+        window = TimeWindow.last_days(7, now=datetime(2024, 3, 10, 15, 30))
+        self.assertEqual(window, (datetime(2024, 3, 3), datetime(2024, 3, 11)))
+        self.assertEqual(window.days, (date(2024, 3, 3), date(2024, 3, 11)))
+
+    def test_today(self):
+        window = TimeWindow.today(now=datetime(2024, 12, 31, 23, 59))
+        self.assertEqual(window, (datetime(2024, 12, 31), datetime(2025, 1, 1)))
+
+    def test_between(self):
+        window = TimeWindow.between(datetime(2024, 3, 1, 8), datetime(2024, 3, 2, 8))
+        self.assertEqual(window.days, (date(2024, 3, 1), date(2024, 3, 3)))
+        with self.assertRaises(ValueError):
+            TimeWindow.between(datetime(2024, 3, 2), datetime(2024, 3, 1))
+
+
+class TestStatsQueryPlans(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        SQLModel.metadata.create_all(engine)
+
+    @classmethod
+    def tearDownClass(cls):
+        SQLModel.metadata.drop_all(engine)
+        engine.dispose()
+        sqlite_file_name = os.getenv("TEST_SQLITE_FILE_NAME")
+        if os.path.exists(sqlite_file_name):
+            os.remove(sqlite_file_name)
+
+    def setUp(self):
+        self.statements = []
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self.record_statement)
+
+    def tearDown(self):
+        event.remove(async_engine.sync_engine, "before_cursor_execute", self.record_statement)
+
+    def record_statement(self, conn, cursor, statement, parameters, *args):
+        self.statements.append((statement, parameters))
+
+    def query_plans(self):
+        with engine.connect() as conn:
+            for statement, parameters in self.statements:
+                rows = conn.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters
+                ).fetchall()
+                yield statement, [row.detail for row in rows]
+
+    def test_stats_queries_search_an_index(self):
+        for query in (
+            NemoDeta.get_analytics,
+            NemoDeta.analytics_get_best_day,
+            NemoDeta.analytics_get_current_goal,
+            NemoDeta.get_task_summary,
+        ):
+            asyncio.run(query(GOOGLE_ID))
+        self.assertEqual(len(self.statements), 5)
+
+        for statement, plan in self.query_plans():
+            details = " | ".join(plan)
+            # the window bounds are part of the index search, not a filter on top of it
+            self.assertRegex(
+                details,
+                r"SEARCH \w+ USING .*\("
+                r"(google_id=\? AND (created_at|day)>\? AND (created_at|day)<\?)\)",
+            )
+            for table in TABLES:
+                self.assertNotIn(f"SCAN {table}", details, statement)
+
+    def test_raw_analytics_window_searches_the_composite_index(self):
+        statement = (
+            select(func.sum(NemoAnalytics.duration))
+            .where(NemoAnalytics.google_id == GOOGLE_ID)
+            .where(TimeWindow.today().clause(NemoAnalytics.created_at))
+        )
+        compiled = statement.compile(engine)
+        with engine.connect() as conn:
+            plan = conn.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {compiled}", tuple(map(str, compiled.params.values()))
+            ).fetchall()
+        self.assertIn(
+            "SEARCH nemo_analytics USING INDEX ix_analytics_google_id_created_at "
+            "(google_id=? AND created_at>? AND created_at<?)",
+            [row.detail for row in plan],
+        )
@@ -0,0 +1,52 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import time
+import unittest
+
+from app.api.pydantic.nemo import User
+from app.api.utils.token_cache import TokenCache
+
+
+def make_user(google_id="google_id", exp=None):
+    return User(
+        email=f"{google_id}@example.com", google_id=google_id, exp=exp or int(time.time()) + 60
+    )
+
+
+class TestTokenCache(unittest.TestCase):
+
+    def test_get_returns_cached_user(self):
+        cache = TokenCache()
+        user = make_user()
+        cache.set("token", user)
+        self.assertIs(cache.get("token"), user)
+        self.assertIsNone(cache.get("other-token"))
+
+    def test_entry_expires_at_token_exp(self):
+        cache = TokenCache()
+        cache.set("token", make_user(exp=int(time.time()) - 1))
+        self.assertIsNone(cache.get("token"))
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = TokenCache(maxsize=2)
+        cache.set("a", make_user("a"))
+        cache.set("b", make_user("b"))
+        cache.get("a")
+        cache.set("c", make_user("c"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_invalidate_user_drops_all_their_tokens(self):
+        cache = TokenCache()
+        cache.set("a1", make_user("a"))
+        cache.set("a2", make_user("a"))
+        cache.set("b1", make_user("b"))
+        cache.invalidate_user("a")
+        self.assertIsNone(cache.get("a1"))
+        self.assertIsNone(cache.get("a2"))
+        self.assertIsNotNone(cache.get("b1"))
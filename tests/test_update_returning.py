@@ -0,0 +1,116 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import asyncio
+import unittest
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.exc import NoResultFound
+from sqlmodel import SQLModel
+
+import app.api.models.nemo
+from app.api.config.database_sqlite import async_engine, engine
+from app.api.crud.nemo import NemoDeta
+from app.api.utils.nemo import create_access_token
+from main import app
+
+GOOGLE_ID = "returning_google_id"
+
+
+class TestUpdateReturning(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        SQLModel.metadata.create_all(engine)
+        asyncio.run(
+            NemoDeta.upsert_user(
+                {
+                    "google_id": GOOGLE_ID,
+                    "email": "returning@example.com",
+                    "given_name": "Returning",
+                    "created_at": datetime.now(),
+                }
+            )
+        )
+        cls.headers = {
+            "x-auth-token": create_access_token(
+                data={"email": "returning@example.com", "google_id": GOOGLE_ID}
+            )
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        SQLModel.metadata.drop_all(engine)
+        engine.dispose()
+        sqlite_file_name = os.getenv("TEST_SQLITE_FILE_NAME")
+        if os.path.exists(sqlite_file_name):
+            os.remove(sqlite_file_name)
+
+    def setUp(self):
+        self.statements = []
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self.count_statement)
+
+    def tearDown(self):
+        event.remove(async_engine.sync_engine, "before_cursor_execute", self.count_statement)
+
+    def count_statement(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def test_update_settings_is_one_statement(self):
+        settings = asyncio.run(
+            NemoDeta.update_settings(GOOGLE_ID, {"timer_sessions": 3, "daily_goal": 5})
+        )
+        self.assertEqual(len(self.statements), 1)
+        self.assertTrue(
+            self.statements[0].startswith("UPDATE nemo_settings SET timer_sessions=?, daily_goal=?")
+        )
+        self.assertIn("RETURNING", self.statements[0])
+        self.assertEqual((settings.timer_sessions, settings.daily_goal), (3, 5))
+        # untouched columns come from the stored row
+        self.assertEqual(settings.preference_background_color, "rainbow")
+
+    def test_update_account_is_one_statement(self):
+        user = asyncio.run(NemoDeta.update_user_account(GOOGLE_ID, {"username": "returned"}))
+        self.assertEqual(len(self.statements), 1)
+        self.assertTrue(
+            self.statements[0].startswith("UPDATE nemo_user_information SET username=?")
+        )
+        self.assertEqual((user.username, user.email), ("returned", "returning@example.com"))
+
+    def test_routes_return_the_stored_row(self):
+        client = TestClient(app)
+        response = client.post(
+            "/nemo/settings", json={"timer_auto_start": True}, headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["timer_auto_start"], True)
+        self.assertEqual(response.json()["google_id"], GOOGLE_ID)
+
+        response = client.post("/nemo/account", json={"family_name": "Row"}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["family_name"], "Row")
+        self.assertEqual(response.json()["email"], "returning@example.com")
+        self.assertEqual(len(self.statements), 2)
+
+    def test_empty_update_returns_the_stored_row(self):
+        client = TestClient(app)
+        response = client.post("/nemo/settings", json={}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["google_id"], GOOGLE_ID)
+        self.assertEqual(response.json()["preference_background_color"], "rainbow")
+
+        response = client.post("/nemo/account", json={}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["email"], "returning@example.com")
+        # read, nothing written
+        self.assertFalse(any(s.startswith("UPDATE") for s in self.statements))
+
+    def test_missing_row(self):
+        with self.assertRaises(NoResultFound):
+            asyncio.run(NemoDeta.update_settings("missing_google_id", {"daily_goal": 1}))
+        with self.assertRaises(NoResultFound):
+            asyncio.run(NemoDeta.update_user_account("missing_google_id", {}))
@@ -0,0 +1,124 @@
+import os
+
+os.environ["ENV"] = "running_tests"
+os.environ["TEST_SQLITE_FILE_NAME"] = "test_database.db"
+
+import asyncio
+import unittest
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, SQLModel, delete, func, select
+
+import app.api.models.nemo
+from app.api.config.database_sqlite import async_session, engine
+from app.api.crud.analytics_rollup import check_consistency
+from app.api.crud.nemo import NemoDeta
+from app.api.crud.write_queue import WriteQueue, set_write_queue
+from app.api.models.nemo import NemoAnalytics, NemoAnalyticsDaily, NemoTasks
+
+GOOGLE_ID = "write_queue_google_id"
+
+
+def analytic(google_id=GOOGLE_ID, duration=600):
+    now = datetime.now()
+    return {"google_id": google_id, "created_at": now, "duration": duration, "full_date": now}
+
+
+def task(description, google_id=GOOGLE_ID):
+    now = datetime.now()
+    return {
+        "google_id": google_id,
+        "created_at": now,
+        "task_date": now,
+        "task_description": description,
+        "duration": 60,
+    }
+
+
+class TestWriteQueue(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        SQLModel.metadata.create_all(engine)
+        asyncio.run(
+            NemoDeta.upsert_user(
+                {
+                    "google_id": GOOGLE_ID,
+                    "email": "queue@example.com",
+                    "given_name": "Queue",
+                    "created_at": datetime.now(),
+                }
+            )
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        SQLModel.metadata.drop_all(engine)
+        engine.dispose()
+        sqlite_file_name = os.getenv("TEST_SQLITE_FILE_NAME")
+        if os.path.exists(sqlite_file_name):
+            os.remove(sqlite_file_name)
+
+    def setUp(self):
+        with Session(engine) as session:
+            for model in (NemoAnalytics, NemoAnalyticsDaily, NemoTasks):
+                session.exec(delete(model))
+            session.commit()
+        self.queue = WriteQueue(max_delay=0.05, max_batch=100)
+        set_write_queue(self.queue)
+
+    def tearDown(self):
+        set_write_queue(None)
+
+    def count(self, model):
+        with Session(engine) as session:
+            return session.exec(select(func.count()).select_from(model)).one()
+
+    def test_concurrent_inserts_are_group_committed(self):
+        async def write():
+            results = await asyncio.gather(
+                *(NemoDeta.insert_analytic(analytic(duration=100 + i)) for i in range(50)),
+                *(NemoDeta.insert_new_task(task(f"task {i}")) for i in range(50)),
+            )
+            await self.queue.close()
+            return results
+
+        results = asyncio.run(write())
+        self.assertEqual(self.queue.rows, 100)
+        self.assertLess(self.queue.batches, 10)
+        self.assertEqual(self.count(NemoAnalytics), 50)
+        self.assertEqual(self.count(NemoTasks), 50)
+
+        tasks = results[50:]
+        with Session(engine) as session:
+            stored = {row.id: row.task_description for row in session.exec(select(NemoTasks)).all()}
+        self.assertEqual({new_task.id: new_task.task_description for new_task in tasks}, stored)
+
+        async def check():
+            async with async_session() as session:
+                return await check_consistency(session, GOOGLE_ID)
+
+        self.assertEqual(asyncio.run(check()), [])
+        self.assertEqual(
+            asyncio.run(NemoDeta.analytics_get_current_goal(GOOGLE_ID)),
+            {"current_goal": sum(range(100, 150))},
+        )
+
+    def test_bad_row_only_fails_its_own_future(self):
+        async def write():
+            results = await asyncio.gather(
+                NemoDeta.insert_analytic(analytic()),
+                NemoDeta.insert_analytic(analytic(google_id="missing_google_id")),
+                NemoDeta.insert_new_task(task("fine")),
+                return_exceptions=True,
+            )
+            await self.queue.close()
+            return results
+
+        ok, failed, new_task = asyncio.run(write())
+        self.assertIsNone(ok)
+        self.assertIsInstance(failed, IntegrityError)
+        self.assertIsNotNone(new_task.id)
+        self.assertEqual(self.count(NemoAnalytics), 1)
+        self.assertEqual(self.count(NemoTasks), 1)